@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 from dotenv import load_dotenv
 import os
@@ -102,18 +103,110 @@ DATABASES = {
     }
 }
 
-"""
 # CACHE
-CACHES = {
-    "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": "redis://127.0.0.1:6379/1", # /1 indicates database 1
-        "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
-        },
+# Redis is used whenever REDIS_URL is set (e.g. redis://127.0.0.1:6379/1, where /1 indicates database 1).
+# Otherwise, as in tests, we fall back to the in-process local-memory cache.
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            },
+        }
     }
-}
-"""
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Number of seconds a cached post or comment listing page is kept (see core.abstract.cache).
+LISTING_CACHE_TIMEOUT = int(os.getenv("LISTING_CACHE_TIMEOUT", 60))
+
+# Number of seconds a user authenticated from a JWT is cached, sparing the user query of authenticated requests
+# (see core.auth.cache). Saving or updating the user drops it right away.
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", 60))
+
+# OBJECT CACHE
+# Optional read-through cache of the posts, comments and users looked up by public id (see core.abstract.object_cache):
+# a bounded LRU in each process in front of the shared cache, invalidated on every write and in every process.
+
+OBJECT_CACHE = os.getenv("OBJECT_CACHE", "false").lower() in ("1", "true", "yes")
+# Seconds an object is kept in the shared cache.
+OBJECT_CACHE_TIMEOUT = int(os.getenv("OBJECT_CACHE_TIMEOUT", 300))
+# Number of entries, and seconds they are kept, in the cache of each process. The short timeout bounds how long an
+# invalidation broadcast that got lost can leave a stale object behind.
+OBJECT_CACHE_LOCAL_SIZE = int(os.getenv("OBJECT_CACHE_LOCAL_SIZE", 10000))
+OBJECT_CACHE_LOCAL_TIMEOUT = int(os.getenv("OBJECT_CACHE_LOCAL_TIMEOUT", 5))
+OBJECT_CACHE_BROADCAST_BACKEND = (
+    "core.abstract.object_cache.RedisInvalidationBroadcast"
+    if os.getenv("REDIS_URL")
+    else "core.abstract.object_cache.LocalInvalidationBroadcast"
+)
+
+# SORTED SETS
+# Backend of the capped sorted sets of ids (e.g. the post timeline): Redis when available, else an in-process stand-in.
+
+SORTED_SET_BACKEND = (
+    "core.abstract.sorted_sets.RedisSortedSet"
+    if os.getenv("REDIS_URL")
+    else "core.abstract.sorted_sets.LocalSortedSet"
+)
+
+# Number of most recently updated posts kept in the materialized home timeline (see core.posts.timeline).
+POST_TIMELINE_SIZE = int(os.getenv("POST_TIMELINE_SIZE", 1000))
+
+# TRENDING POSTS
+# Ranking of the posts with the most time-decayed activity, precomputed by the refresh_trending command (see core.posts.trending).
+
+# Number of posts kept in the ranking.
+TRENDING_SIZE = int(os.getenv("TRENDING_SIZE", 100))
+# Number of scored posts kept between two refreshes: the ones below the TRENDING_SIZE best keep their score to climb back.
+TRENDING_CANDIDATES = int(os.getenv("TRENDING_CANDIDATES", 10 * TRENDING_SIZE))
+# Seconds after which the weight of a like or comment in the ranking is halved.
+TRENDING_HALF_LIFE = int(os.getenv("TRENDING_HALF_LIFE", 6 * 3600))
+# Only the posts created in the last TRENDING_WINDOW seconds are ranked.
+TRENDING_WINDOW = int(os.getenv("TRENDING_WINDOW", 3 * 24 * 3600))
+# Maximum number of posts with activity (or taken back activity) pending between two refreshes (the least active ones are dropped past it).
+TRENDING_ACTIVITY_SIZE = int(os.getenv("TRENDING_ACTIVITY_SIZE", 100000))
+
+# WRITE-BEHIND LIKES
+# When enabled, likes and unlikes are recorded in a buffer (Redis when available, else an in-process stand-in) that reads
+# overlay on the database, and folded into the like tables and counters by a periodic flusher (see core.users.like_buffer).
+
+LIKE_WRITE_BEHIND = os.getenv("LIKE_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+LIKE_BUFFER_BACKEND = (
+    "core.users.like_buffer.RedisLikeBuffer"
+    if os.getenv("REDIS_URL")
+    else "core.users.like_buffer.LocalLikeBuffer"
+)
+# Seconds between two flushes by the flusher thread of each web process. 0 disables the thread, e.g. when the
+# drain_like_buffer command is run on a schedule instead.
+LIKE_FLUSH_INTERVAL = float(os.getenv("LIKE_FLUSH_INTERVAL", 2))
+# Number of buffered likes written per batch of statements.
+LIKE_FLUSH_BATCH_SIZE = int(os.getenv("LIKE_FLUSH_BATCH_SIZE", 1000))
+# Seconds after which the lock of a flush that never finished (e.g. its process was killed) expires.
+LIKE_FLUSH_LOCK_TIMEOUT = int(os.getenv("LIKE_FLUSH_LOCK_TIMEOUT", 60))
+
+# LIKED SETS
+# Per-user cache of the ids of the posts and comments a user has liked, answering the `liked` field of a page of rows with
+# a single lookup (see core.users.liked_sets): Redis sets when available, else an in-process stand-in.
+
+LIKED_SET_BACKEND = (
+    "core.users.liked_sets.RedisLikedSets"
+    if os.getenv("REDIS_URL")
+    else "core.users.liked_sets.LocalLikedSets"
+)
+# Seconds a liked set is kept once loaded.
+LIKED_SET_TIMEOUT = int(os.getenv("LIKED_SET_TIMEOUT", 3600))
+# Users who liked more targets than this get a Bloom filter of their likes instead of the exact set.
+LIKED_SET_MAX_SIZE = int(os.getenv("LIKED_SET_MAX_SIZE", 10000))
+# False positive rate of those Bloom filters; every false positive is checked against the like table.
+LIKED_SET_BLOOM_ERROR_RATE = float(os.getenv("LIKED_SET_BLOOM_ERROR_RATE", 0.01))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -134,6 +227,22 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# The password of a login is verified in the bounded password hashing pool (see core.auth.hashing), which also
+# upgrades the hashes made with an older hasher in PASSWORD_HASHERS (or fewer iterations) as users log in.
+AUTHENTICATION_BACKENDS = ["core.auth.backends.PooledModelBackend"]
+
+# Number of threads hashing passwords in each process, and number of passwords hashed at once across all of them
+# (by default half the cores, leaving the others to the rest of the API). A login or registration finding every slot
+# taken is answered with a 429 right away.
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+PASSWORD_HASHING_CONCURRENCY = int(os.getenv("PASSWORD_HASHING_CONCURRENCY", max(1, (os.cpu_count() or 2) // 2)))
+# Seconds after which the slot of a process that died while hashing is freed.
+PASSWORD_HASHING_SLOT_LEASE = int(os.getenv("PASSWORD_HASHING_SLOT_LEASE", 30))
+PASSWORD_HASHING_SLOTS_BACKEND = (
+    "core.auth.hashing.RedisHashingSlots" if os.getenv("REDIS_URL") else "core.auth.hashing.LocalHashingSlots"
+)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -178,13 +287,71 @@ CORS_ALLOWED_ORIGINS = os.getenv("CORS_ALLOW_ORIGINS").split(" ")
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.auth.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 15,
+    # Exports stream a whole table or thread (see core.abstract.streaming), so each client may only start a few of them.
+    "DEFAULT_THROTTLE_RATES": {
+        "export": os.getenv("EXPORT_THROTTLE_RATE", "10/hour"),
+    },
+    # JSON is encoded with orjson when it is installed, and MessagePack is offered (through "Accept: application/msgpack")
+    # when the optional msgpack package is (see core.abstract.renderers).
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.abstract.renderers.FastJSONRenderer",
+        *(["core.abstract.renderers.MessagePackRenderer"] if find_spec("msgpack") else []),
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
+SIMPLE_JWT = {
+    # The token endpoint issues tokens carrying the "updated" claim of their user, like the login endpoint (see core.auth.cache).
+    "TOKEN_OBTAIN_SERIALIZER": "core.auth.serializers.login.TokenSerializer",
+    # Refreshing checks the blacklist through the blacklist filter (see core.auth.blacklist).
+    "TOKEN_REFRESH_SERIALIZER": "core.auth.serializers.login.RefreshSerializer",
+}
+
+# TOKEN BLACKLIST
+# Bloom filter of the blacklisted refresh tokens, so that refreshing a valid token skips the blacklist tables
+# (see core.auth.blacklist). Expired tokens are purged from those tables by the `purge_expired_tokens` command.
+
+TOKEN_BLACKLIST_BACKEND = (
+    "core.auth.blacklist.RedisTokenBlacklist" if os.getenv("REDIS_URL") else "core.auth.blacklist.LocalTokenBlacklist"
+)
+# Seconds after which the filter expires, unless the `rebuild_blacklist_filter` job rebuilt it from the database
+# meanwhile (leaving the expired tokens out). Without a filter, every refresh checks the blacklist tables.
+TOKEN_BLACKLIST_FILTER_TIMEOUT = int(os.getenv("TOKEN_BLACKLIST_FILTER_TIMEOUT", 86400))
+# Share of the valid tokens the filter wrongly matches (which costs them the database check), and the least number
+# of tokens it is sized for.
+TOKEN_BLACKLIST_BLOOM_ERROR_RATE = float(os.getenv("TOKEN_BLACKLIST_BLOOM_ERROR_RATE", 0.001))
+TOKEN_BLACKLIST_MIN_CAPACITY = int(os.getenv("TOKEN_BLACKLIST_MIN_CAPACITY", 10000))
+# Number of blacklisted tokens read at a time when the filter is built.
+TOKEN_BLACKLIST_CHUNK_SIZE = int(os.getenv("TOKEN_BLACKLIST_CHUNK_SIZE", 5000))
+
+# Number of rows read and serialized at a time by the streamed JSON/NDJSON exports (see core.abstract.streaming).
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 500))
+
+# Maximum number of posts accepted by a single request to the bulk post creation endpoint.
+BULK_CREATE_MAX_POSTS = int(os.getenv("BULK_CREATE_MAX_POSTS", 100))
+
+# Maximum number of public ids accepted by the "?ids=" multi-get of the posts endpoint.
+MULTI_GET_MAX_IDS = int(os.getenv("MULTI_GET_MAX_IDS", 100))
+
+# Maximum number of comments returned by the "?preview=N" listing of the comments of a post (e.g. for feed cards).
+COMMENT_PREVIEW_MAX_SIZE = int(os.getenv("COMMENT_PREVIEW_MAX_SIZE", 20))
+
+# "wsgi" (gunicorn sync workers) or "asgi" (gunicorn with uvicorn workers, see docker-compose.yaml). Under ASGI the read
+# endpoints are served by native async views (see core.abstract.asynchronous).
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+ASYNC_READ_VIEWS = SERVER_MODE == "asgi"
+
+# Full-text search engine (see core.abstract.search). When unset, Postgres full-text search is used on PostgreSQL
+# and the in-process inverted index on any other database.
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", None)
+# Text search configuration used to build and query the tsvector columns.
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "english")
+
 # AWS CONFIGURATIONS
 
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
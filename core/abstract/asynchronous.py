@@ -0,0 +1,83 @@
+import functools
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+from core.abstract.renderers import get_async_renderer_classes
+from core.auth.authentication import AsyncJWTAuthentication
+
+
+# Native async read endpoints. DRF views are synchronous, so under ASGI every one of them holds a thread for as long as
+# its queries take. The async views below are plain Django async views that reuse the DRF building blocks which don't
+# do any I/O (serializers, paginators, exceptions, Response), while their queries go through the async ORM.
+
+
+def async_api_view(view):
+    """
+    Turn an async function view serving GET requests into an endpoint that behaves like a DRF `@api_view`:
+    the view receives a DRF `Request` authenticated from its JWT, API exceptions become error responses and
+    the returned `Response` is rendered in the format negotiated from the Accept header (JSON by default).
+    """
+    authenticator = AsyncJWTAuthentication()
+    negotiator = DefaultContentNegotiation()
+
+    @csrf_exempt
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # The request is authenticated below, so the DRF request doesn't need any authenticator of its own.
+        drf_request = Request(request, authenticators=())
+        renderers = [renderer() for renderer in get_async_renderer_classes()]
+        try:
+            if request.method not in ("GET", "HEAD"):
+                raise exceptions.MethodNotAllowed(request.method)
+            drf_request.accepted_renderer, drf_request.accepted_media_type = negotiator.select_renderer(drf_request, renderers)
+            authenticated = await authenticator.aauthenticate(drf_request)
+            drf_request.user, drf_request.auth = authenticated if authenticated is not None else (AnonymousUser(), None)
+            response = await view(drf_request, *args, **kwargs)
+        except Exception as exc:
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                exc.auth_header = authenticator.authenticate_header(drf_request)
+            response = exception_handler(exc, {"request": drf_request})
+            if response is None:
+                raise
+        if isinstance(response, Response) and not getattr(response, "accepted_renderer", None):
+            # Like DRF, errors raised before the negotiation (e.g. 406 Not Acceptable) are rendered with the first renderer.
+            response.accepted_renderer = getattr(drf_request, "accepted_renderer", renderers[0])
+            response.accepted_media_type = getattr(drf_request, "accepted_media_type", renderers[0].media_type)
+            response.renderer_context = {"request": drf_request, "response": response}
+        return response
+
+    return wrapper
+
+
+def dispatch_by_method(sync_view, async_read_view):
+    """
+    Serve GET and HEAD requests with the native `async_read_view` and every other method with the DRF `sync_view`,
+    run in a worker thread, so that a URL can have an async read path while its writes stay as they are.
+    """
+    sync_handler = sync_to_async(sync_view)
+
+    @csrf_exempt
+    @functools.wraps(sync_view)
+    async def view(request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            return await async_read_view(request, *args, **kwargs)
+        return await sync_handler(request, *args, **kwargs)
+
+    return view
+
+
+def read_view(sync_view, async_read_view):
+    """
+    Return the URL handler of an endpoint: split between `async_read_view` and `sync_view` when the project is served
+    under ASGI (the ASYNC_READ_VIEWS setting), else the sync view alone, since a WSGI worker would only run
+    the async view through an extra event loop per request.
+    """
+    if settings.ASYNC_READ_VIEWS:
+        return dispatch_by_method(sync_view, async_read_view)
+    return sync_view
@@ -0,0 +1,42 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    Bloom filter of integer ids, stored in `bits` (numbered from the most significant bit of the first byte, like Redis
+    bit offsets). `in` never misses an added id, and wrongly matches other ids with a probability of about `error_rate`.
+    """
+
+    def __init__(self, bits, num_hashes):
+        self.bits = bytearray(bits)
+        self.num_hashes = num_hashes
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate):
+        """Return an empty filter sized for `capacity` ids with a false positive rate of `error_rate`."""
+        size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        return cls(bytes((size + 7) // 8), bloom_hashes(error_rate))
+
+    @staticmethod
+    def hashes(member):
+        """Return the two hashes of `member` every bit position is derived from (with double hashing)."""
+        digest = hashlib.blake2b(member.to_bytes(8, "little", signed=True), digest_size=8).digest()
+        return int.from_bytes(digest[:4], "little"), int.from_bytes(digest[4:], "little") | 1
+
+    def positions(self, member):
+        first, second = self.hashes(member)
+        size = len(self.bits) * 8
+        return [(first + index * second) % size for index in range(self.num_hashes)]
+
+    def add(self, member):
+        for position in self.positions(member):
+            self.bits[position >> 3] |= 0x80 >> (position & 7)
+
+    def __contains__(self, member):
+        return all(self.bits[position >> 3] & (0x80 >> (position & 7)) for position in self.positions(member))
+
+
+def bloom_hashes(error_rate):
+    """Return the number of hashes that minimizes the false positives of a Bloom filter with `error_rate`."""
+    return max(1, round(-math.log2(error_rate)))
@@ -0,0 +1,87 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from django.core.cache import cache
+from django.db import transaction
+
+
+# Listing pages are cached under versioned namespaces (e.g. "post" or "comments:<post pk>").
+# A write never deletes cached keys: it bumps the version of the namespaces it affects, which makes every key built from the
+# previous version unreachable. The orphaned entries simply expire, so invalidation is O(1) whatever the number of cached pages.
+VERSION_KEY = "cache_version:{namespace}"
+
+# Hit and miss counts of the listing cache. They are kept by each process, so recording them costs no round trip to the cache.
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _initial_version():
+    # The first version of a namespace is time-based, so that a version key evicted from the cache never comes back
+    # with a value that was already used (which would make entries cached under it reachable again).
+    return time.time_ns() // 1000
+
+
+def get_namespace_versions(namespaces):
+    """Return the current version of each namespace, fetched in one round trip."""
+    keys = {namespace: VERSION_KEY.format(namespace=namespace) for namespace in namespaces}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for namespace, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _initial_version(), timeout=None)
+            version = cache.get(key)
+        versions[namespace] = version
+    return versions
+
+
+def bump_namespace_versions(*namespaces):
+    """Move the given namespaces to a new version, invalidating everything cached under the previous one."""
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace=namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The version key was never set (or has been evicted).
+            cache.add(key, _initial_version(), timeout=None)
+
+
+def invalidate_namespaces(*namespaces):
+    """
+    Bump the given namespaces now and once more when the current transaction commits.
+    The first bump stops the writer's own later reads from hitting stale pages, the second one discards pages that
+    a concurrent reader may have cached from the pre-commit state of the database in between.
+    """
+    if not namespaces:
+        return
+    bump_namespace_versions(*namespaces)
+    transaction.on_commit(lambda: bump_namespace_versions(*namespaces))
+
+
+def record_cache_outcome(label, outcome):
+    with _stats_lock:
+        _stats[(label, outcome)] += 1
+
+
+def get_cache_stats(*labels):
+    """Return the hit and miss counts recorded by this process for each label, e.g. `{"post": {"hits": 3, "misses": 1}}`."""
+    with _stats_lock:
+        return {label: {outcome: _stats[(label, outcome)] for outcome in ("hits", "misses")} for label in labels}
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def build_listing_key(request, namespaces):
+    """
+    Build the cache key of a listing page from the versions of its namespaces, the full request path (which includes the
+    cursor and filters) and the viewer, since the `liked` field of the representation depends on who is asking.
+    """
+    versions = get_namespace_versions(namespaces)
+    version_part = ":".join(f"{namespace}={versions[namespace]}" for namespace in namespaces)
+    path_hash = hashlib.md5(request.get_full_path().encode("utf-8")).hexdigest()
+    viewer = "anon" if request.user.is_anonymous else request.user.pk
+    return f"listing:{version_part}:{path_hash}:{viewer}"
@@ -0,0 +1,208 @@
+import hashlib
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from core.abstract.cache import build_listing_key, record_cache_outcome
+
+
+# Conditional GET support. The validators of a response are computed from the rows it is built from (their public ids,
+# `updated` timestamps and counters, see AbstractModel.get_validator_parts) before anything is serialized,
+# so a client that already holds the current representation gets a 304 without the body ever being built.
+# Note that likes don't move `updated`, so a client relying on If-Modified-Since alone may keep a stale like count
+# until the next edit; If-None-Match (which takes precedence when both are sent) always reflects the counters.
+# Cached listings hold everything but those counters and the `liked` states (the volatile keys of their ValuesSerializer),
+# which are read again on every hit. Likes and comments thus never invalidate the cached listings, which only change when
+# a row is added, edited or removed.
+
+
+# Functions returning the version of some state that representations depend on besides their rows (e.g. the buffered likes,
+# see core.users.like_buffer), or None when there is no such state. They are registered by the apps owning that state.
+validator_versions = []
+
+
+def register_validator_version(function):
+    """Make the validators of every response depend on what `function()` returns."""
+    if function not in validator_versions:
+        validator_versions.append(function)
+
+
+def get_validator_versions():
+    return [version for version in (function() for function in validator_versions) if version is not None]
+
+
+def compute_validators(request, rows, extra=(), row_serializer=None):
+    """
+    Return the `(etag, last_modified)` pair of a response built from `rows`, as seen by the requesting user.
+    Model instances provide their own validators, `.values()` rows get theirs from the `row_serializer` they are serialized with.
+    """
+    # The `liked` field depends on who is asking, so the viewer is part of the ETag.
+    parts = ["anon" if request.user.is_anonymous else request.user.pk, *extra, *get_validator_versions()]
+    last_modified = None
+    for row in rows:
+        if row_serializer is None:
+            parts.extend(row.get_validator_parts())
+            row_last_modified = row.get_last_modified()
+        else:
+            parts.extend(row_serializer.get_validator_parts(row))
+            row_last_modified = row_serializer.get_last_modified(row)
+        if last_modified is None or row_last_modified > last_modified:
+            last_modified = row_last_modified
+    etag = quote_etag(hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest())
+    return etag, None if last_modified is None else int(last_modified.timestamp())
+
+
+def negotiated_etag(request, etag):
+    """
+    Return the strong `etag` of a representation, specific to the media type it is rendered in: the JSON and the MessagePack
+    bodies of one resource differ byte for byte, so they mustn't share an ETag (see core.abstract.renderers).
+    """
+    media_type = getattr(request, "accepted_media_type", None)
+    if not media_type:
+        return etag
+    return quote_etag(hashlib.sha1(f"{etag}|{media_type}".encode("utf-8")).hexdigest())
+
+
+def set_validators(response, etag, last_modified):
+    # The body may be JSON or MessagePack (see core.abstract.renderers), so shared caches must key it on Accept as well.
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_vary_headers(response, ("Authorization", "Accept"))
+    return response
+
+
+def not_modified_response(request, etag, last_modified):
+    """Return a 304 response if the request's If-None-Match/If-Modified-Since headers match the validators, else None."""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def conditional_object_response(request, instance, serialize):
+    """Return a 304 when the client's copy of `instance` is current, else the `serialize()`d instance with its validators."""
+    etag, last_modified = compute_validators(request, [instance])
+    etag = negotiated_etag(request, etag)
+    return not_modified_response(request, etag, last_modified) or set_validators(
+        Response(serialize(), status=status.HTTP_200_OK), etag, last_modified
+    )
+
+
+def volatile_etag(etag, rows, row_serializer):
+    """Return the ETag of a cached listing, mixing the volatile columns of its current `rows` into the `etag` of the rest of it."""
+    parts = [etag, *get_validator_versions()]
+    columns = row_serializer.get_volatile_columns()
+    for row in rows:
+        parts.extend(row[column] for column in columns)
+    return quote_etag(hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest())
+
+
+def load_volatile_rows(row_serializer, ids):
+    """Return the current volatile columns of the rows with primary keys `ids`, in that order, or None if one of them is gone."""
+    if not ids:
+        return []
+    rows = {
+        row["id"]: row
+        for row in row_serializer.model.objects.filter(pk__in=ids).values(*dict.fromkeys(["id", *row_serializer.get_volatile_columns()]))
+    }
+    if len(rows) < len(set(ids)):
+        return None
+    return [rows[pk] for pk in ids]
+
+
+def refresh_listing_entry(request, entry, row_serializer):
+    """
+    Bring the volatile keys of a cached listing `entry` up to date, with a single query by primary key, and return it
+    with its final ETag. Return None when one of its rows has been deleted, which makes the entry a miss.
+    """
+    rows = load_volatile_rows(row_serializer, entry["ids"])
+    if rows is None:
+        return None
+    data = entry["data"]
+    type(row_serializer)({"request": request}).refresh(data["results"] if isinstance(data, dict) else data, rows)
+    return {**entry, "etag": volatile_etag(entry["etag"], rows, row_serializer)}
+
+
+def cached_listing_response(request, entry):
+    """Answer a listing request from a cache `entry`, with a 304 when the client's copy is current."""
+    etag = negotiated_etag(request, entry["etag"])
+    return not_modified_response(request, etag, entry["last_modified"]) or set_validators(
+        Response(entry["data"], status=status.HTTP_200_OK), etag, entry["last_modified"]
+    )
+
+
+def listing_validators(request, loaded, row_serializer=None):
+    """Return the `(etag, last_modified)` pair of a listing page loaded as a `(rows, paginator)` pair."""
+    rows, paginator = loaded
+    # The links of a page depend on the cursor and on whether there are rows around it, so they are part of its validators.
+    extra = [request.get_full_path()]
+    if paginator is not None:
+        extra += [paginator.has_next, paginator.has_previous]
+    return compute_validators(request, rows, extra, row_serializer)
+
+
+def conditional_listing_response(request, load, serialize, namespaces=None, label=None, row_serializer=None):
+    """
+    Build a listing response that honours If-None-Match/If-Modified-Since.
+    `load()` returns the `(rows, paginator)` pair of the page (the paginator being None for an unpaginated listing) and
+    `serialize(loaded)` turns it into the response body. Listings loaded as `.values()` rows pass the `row_serializer`
+    (a ValuesSerializer) their validators are computed with. When cache `namespaces` are given as well, the body is cached
+    together with its validators (see core.abstract.cache), so a cache hit is answered, or even turned into a 304, with just
+    the query refreshing its volatile keys.
+    """
+    key = None
+    if namespaces:
+        key = build_listing_key(request, namespaces)
+        entry = cache.get(key)
+        if entry is not None:
+            entry = refresh_listing_entry(request, entry, row_serializer)
+        if entry is not None:
+            record_cache_outcome(label, "hits")
+            return cached_listing_response(request, entry)
+        record_cache_outcome(label, "misses")
+    loaded = load()
+    etag, last_modified = listing_validators(request, loaded, row_serializer)
+    entry_etag = etag
+    if key is not None:
+        etag = volatile_etag(entry_etag, loaded[0], row_serializer)
+    etag = negotiated_etag(request, etag)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    data = serialize(loaded)
+    if key is not None:
+        entry = {"data": data, "etag": entry_etag, "last_modified": last_modified, "ids": [row["id"] for row in loaded[0]]}
+        cache.set(key, entry, timeout=settings.LISTING_CACHE_TIMEOUT)
+    return set_validators(Response(data, status=status.HTTP_200_OK), etag, last_modified)
+
+
+async def aconditional_listing_response(request, load, serialize, namespaces=None, label=None, row_serializer=None):
+    """Async counterpart of `conditional_listing_response`, where `load()` and `serialize(loaded)` are coroutine functions."""
+    key = None
+    if namespaces:
+        key = await sync_to_async(build_listing_key)(request, namespaces)
+        entry = await cache.aget(key)
+        if entry is not None:
+            entry = await sync_to_async(refresh_listing_entry)(request, entry, row_serializer)
+        if entry is not None:
+            record_cache_outcome(label, "hits")
+            return cached_listing_response(request, entry)
+        record_cache_outcome(label, "misses")
+    loaded = await load()
+    etag, last_modified = listing_validators(request, loaded, row_serializer)
+    entry_etag = etag
+    if key is not None:
+        etag = volatile_etag(entry_etag, loaded[0], row_serializer)
+    etag = negotiated_etag(request, etag)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    data = await serialize(loaded)
+    if key is not None:
+        entry = {"data": data, "etag": entry_etag, "last_modified": last_modified, "ids": [row["id"] for row in loaded[0]]}
+        await cache.aset(key, entry, timeout=settings.LISTING_CACHE_TIMEOUT)
+    return set_validators(Response(data, status=status.HTTP_200_OK), etag, last_modified)
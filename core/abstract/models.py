@@ -1,44 +1,99 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, Max, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 import uuid
 from django.http import Http404
-from django.core.cache import cache
+from core.abstract.cache import invalidate_namespaces
+from core.abstract.object_cache import get_cached_object, invalidate_objects
+
+def count_subquery(queryset, field, outer_field="pk"):
+    """
+    Return an expression counting the rows of `queryset` whose `field` matches the outer row's `outer_field`.
+    Each count is computed in its own correlated subquery, so several of them can be annotated onto the same queryset
+    without the row multiplication that chaining `Count()` over different joins would cause.
+    """
+    counts = queryset.filter(**{field: OuterRef(outer_field)}).order_by().values(field).annotate(count=Count("*")).values("count")
+    return Coalesce(Subquery(counts), 0)
+
+def reconcile_counter(model, field, expression, chunk_size=1000, on_repaired=None):
+    """
+    Update the rows of `model` whose counter `field` differs from `expression`, one primary-key range at a time, and
+    return the number of rows repaired. Each chunk runs in its own short transaction, so only `chunk_size` rows are
+    locked at a time; `on_repaired(start, stop)` is called in it for every primary-key range that had rows repaired.
+    Used by the `reconcile_counters` command and by the migrations backfilling the counters.
+    """
+    bounds = model.objects.aggregate(low=Min("pk"), high=Max("pk"))
+    if bounds["low"] is None:
+        return 0
+    repaired = 0
+    for start in range(bounds["low"], bounds["high"] + 1, chunk_size):
+        with transaction.atomic():
+            chunk_repaired = (
+                model.objects.filter(pk__gte=start, pk__lt=start + chunk_size)
+                .filter(~Q(**{field: expression}))
+                .update(**{field: expression})
+            )
+            if chunk_repaired and on_repaired is not None:
+                on_repaired(start, start + chunk_size)
+            repaired += chunk_repaired
+    return repaired
+
+def invalidate_deleted_object(sender, instance, **kwargs):
+    """
+    Invalidate the cached listings and objects embedding a deleted object. As a post_delete receiver, this also runs for
+    objects deleted by a queryset or along with a related object, which never go through `delete`.
+    """
+    instance.invalidate_cached_objects()
 
 class AbstractManager(models.Manager):
     def get_object_by_public_id(self, public_id):
         try:
+            # With OBJECT_CACHE, the object is read through the per-process and shared caches (see core.abstract.object_cache).
+            if settings.OBJECT_CACHE:
+                return get_cached_object(self, public_id)
             instance = self.get(public_id=public_id)
             return instance
         except (ValueError, TypeError):
             return Http404
 
-    def _delete_cached_objects(app_label):
-        if app_label == "core_post":
-            cache.delete("post_objects")
-        elif app_label == "core_comment":
-            cache.delete("comment_objects")
-        else:
-            raise NotImplementedError
-
 class AbstractModel(models.Model):
     public_id = models.UUIDField(db_index=True, unique=True, default=uuid.uuid4, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
     objects = AbstractManager()
+    # Fields left out of the object cache (see core.abstract.object_cache), and loaded from the database when accessed.
+    uncached_fields = ()
 
-    # In the following code, we retrieve app_label from the _meta attribute on the model.
-    # If it corresponds to either core_post or core_comment, we invalidate the cache, and the rest of the instructions can proceed.
-    def save(self, force_insert=False, force_update=False,using=None, update_fields=None):
-        app_label = self._meta.app_label
-        if app_label in ["core_post", "core_comment"]:
-            _delete_cached_objects(app_label)
-        return super(AbstractModel, self).save(force_insert=force_insert,force_update=force_update,using=using,update_fields=update_fields)
+    def get_cache_namespaces(self, update_fields=None):
+        """
+        Return the cache namespaces whose cached listings embed this object, and which must therefore be invalidated when it is saved or deleted.
+        Models override this; by default an object isn't part of any cached listing.
+        """
+        return []
 
-    def delete(self, using=None, keep_parents=False):
-        app_label = self._meta.app_label
-        if app_label in ["core_post", "core_comment"]:
-            _delete_cached_objects(app_label)
-        return super(AbstractModel, self).delete(using=using, keep_parents=keep_parents)
+    def get_validator_parts(self):
+        """
+        Return the values the representation of this object depends on. They make up its ETag (see core.abstract.conditional),
+        so models whose representation embeds counters or related objects extend them.
+        """
+        return [self.public_id.hex, self.updated.timestamp()]
+
+    def get_last_modified(self):
+        return self.updated
+
+    def invalidate_cached_objects(self, update_fields=None):
+        invalidate_namespaces(*self.get_cache_namespaces(update_fields))
+        invalidate_objects(type(self), [self.pk])
+
+    # The cached listings and objects embedding this object are invalidated once it is written, within the transaction
+    # of the write, so that a reader can't cache its previous state again in between (they are invalidated once more
+    # on commit). Deletions are handled by the `invalidate_deleted_object` receiver, which also sees cascade deletes.
+    def save(self, force_insert=False, force_update=False,using=None, update_fields=None):
+        with transaction.atomic(using=using, savepoint=False):
+            super(AbstractModel, self).save(force_insert=force_insert,force_update=force_update,using=using,update_fields=update_fields)
+            self.invalidate_cached_objects(update_fields)
 
     class Meta:
         abstract = True # Django will ignore this class model and won’t generate migrations for this.
@@ -48,3 +103,4 @@ class AbstractModel(models.Model):
 # It’s the interface through which database query operations are provided to Django models and is used to retrieve the
 # instances from the database. If no custom Manager is defined, the default name is objects.
 # Managers are only accessible via model classes, not the model instances.
+
@@ -0,0 +1,266 @@
+import json
+import logging
+import pickle
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+# Read-through cache of the objects looked up by public id (see AbstractManager.get_object_by_public_id), enabled with
+# OBJECT_CACHE. The first level is a bounded LRU in each process with a short TTL, the second one the shared Django cache.
+# Objects are cached under their primary key, next to the public id -> primary key mapping (which never changes), so that
+# a write that only knows the key of a row (e.g. a counter update) can invalidate it. Both levels hold a pickled snapshot
+# of the column values of the object, without its `uncached_fields` (e.g. password hashes), which are loaded lazily when
+# needed; every caller gets its own instance, rebuilt from the snapshot as if it was read from the database.
+# A write drops the object from both levels, now and once more when the transaction commits, and broadcasts its key to
+# the other processes so that they drop it from their first level too. Every drop also moves the generation of the
+# object, and an object loaded from the database is only kept if its generation didn't move meanwhile, so that a write
+# committed during the load can't leave the state it replaced behind (a first lookup, which doesn't know the primary key
+# yet, checks the generation of the whole model instead).
+OBJECT_KEY = "object:{label}:{pk}"
+PUBLIC_ID_KEY = "object_pk:{label}:{public_id}"
+GENERATION_KEY = "object_generation:{label}:{pk}"
+MODEL_GENERATION_KEY = "object_generation:{label}"
+
+
+class LocalObjectCache:
+    """Bounded LRU of pickled object snapshots, whose entries expire `timeout` seconds after they were stored."""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class LocalInvalidationBroadcast:
+    """In-process stand-in for the Redis broadcast, used in tests and single-process development: there is no one to tell."""
+
+    def publish(self, keys):
+        pass
+
+    def listen(self, callback):
+        pass
+
+
+class RedisInvalidationBroadcast:
+    """Broadcast of the invalidated keys through a Redis pub/sub channel (of the django-redis connection of the default cache)."""
+    channel = "object_cache:invalidate"
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection("default")
+
+    def publish(self, keys):
+        self.client.publish(self.channel, json.dumps(keys))
+
+    def listen(self, callback):
+        """Call `callback(keys)` for every broadcast invalidation, forever."""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            callback(json.loads(message["data"]))
+
+
+_local_cache = None
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def get_local_object_cache():
+    """Return the first level of the object cache of this process."""
+    global _local_cache
+    if _local_cache is None:
+        _local_cache = LocalObjectCache(settings.OBJECT_CACHE_LOCAL_SIZE, settings.OBJECT_CACHE_LOCAL_TIMEOUT)
+    return _local_cache
+
+
+def get_invalidation_broadcast():
+    """Return the invalidation broadcast of the backend selected by the OBJECT_CACHE_BROADCAST_BACKEND setting."""
+    return import_string(settings.OBJECT_CACHE_BROADCAST_BACKEND)()
+
+
+def ensure_invalidation_listener():
+    """Start the thread dropping the keys invalidated by other processes from the first level, unless it is running already."""
+    global _listener
+    if _listener is not None:
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = threading.Thread(target=listen_for_invalidations, name="object-cache-invalidations", daemon=True)
+            _listener.start()
+
+
+def listen_for_invalidations():
+    while True:
+        try:
+            get_invalidation_broadcast().listen(lambda keys: get_local_object_cache().delete(*keys))
+            return
+        except Exception:
+            # Until the connection is back, the first level entries simply expire after OBJECT_CACHE_LOCAL_TIMEOUT.
+            logger.exception("Listening for object cache invalidations failed")
+            time.sleep(1)
+
+
+def snapshot_object(instance):
+    """Return the pickled `(attnames, values)` of the columns of `instance`, except for its model's `uncached_fields`."""
+    fields = [field for field in instance._meta.concrete_fields if field.name not in instance.uncached_fields]
+    values = [getattr(instance, field.attname) for field in fields]
+    # A file is stored by name, as in its column, rather than along with the instance it is attached to.
+    values = [value.name if isinstance(value, FieldFile) else value for value in values]
+    return pickle.dumps(([field.attname for field in fields], values))
+
+
+def restore_object(manager, data):
+    """Rebuild the instance of `manager`'s model from its snapshot, with the fields left out of it deferred."""
+    attnames, values = pickle.loads(data)
+    return manager.model.from_db(manager.db, attnames, values)
+
+
+def get_generations(keys):
+    generations = cache.get_many(keys)
+    return [generations.get(key, 0) for key in keys]
+
+
+def move_generations(keys):
+    for key in keys:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_cached_object(manager, public_id):
+    """
+    Return the object of `manager` with `public_id`, from the first cache level that has it, else from the database
+    (raising DoesNotExist as `get` does) and store it in both levels.
+    """
+    try:
+        public_id = uuid.UUID(str(public_id))
+    except ValueError:
+        # Let the database lookup raise the usual error.
+        return manager.get(public_id=public_id)
+    ensure_invalidation_listener()
+    label = manager.model._meta.label
+    local_cache = get_local_object_cache()
+    public_id_key = PUBLIC_ID_KEY.format(label=label, public_id=public_id.hex)
+    pk = local_cache.get(public_id_key)
+    if pk is None:
+        pk = cache.get(public_id_key)
+    if pk is not None:
+        local_cache.set(public_id_key, pk)
+        object_key = OBJECT_KEY.format(label=label, pk=pk)
+        data = local_cache.get(object_key)
+        if data is not None:
+            record_object_cache_outcome(label, "local_hits")
+            return restore_object(manager, data)
+        data = cache.get(object_key)
+        if data is not None:
+            local_cache.set(object_key, data)
+            record_object_cache_outcome(label, "shared_hits")
+            return restore_object(manager, data)
+    record_object_cache_outcome(label, "misses")
+    generation_keys = [MODEL_GENERATION_KEY.format(label=label) if pk is None else GENERATION_KEY.format(label=label, pk=pk)]
+    generations = get_generations(generation_keys)
+    instance = manager.get(public_id=public_id)
+    object_key = OBJECT_KEY.format(label=label, pk=instance.pk)
+    data = snapshot_object(instance)
+    cache.set(public_id_key, instance.pk, timeout=None)
+    cache.set(object_key, data, timeout=settings.OBJECT_CACHE_TIMEOUT)
+    local_cache.set(public_id_key, instance.pk)
+    local_cache.set(object_key, data)
+    # A write invalidating the object during the load moved its generation after we read it: what we stored may be
+    # the state it replaced, so it goes. Every later write finds the stored object and drops it itself.
+    if get_generations(generation_keys) != generations:
+        local_cache.delete(object_key)
+        cache.delete(object_key)
+    return instance
+
+
+def drop_objects(keys, generation_keys):
+    move_generations(generation_keys)
+    get_local_object_cache().delete(*keys)
+    cache.delete_many(keys)
+    get_invalidation_broadcast().publish(keys)
+
+
+def invalidate_objects(model, pks):
+    """
+    Drop the objects of `model` with primary keys `pks` from the object cache, now and once more when the current
+    transaction commits (in case a concurrent reader cached the state it had before), in every process.
+    """
+    if not settings.OBJECT_CACHE:
+        return
+    label = model._meta.label
+    pks = [pk for pk in pks if pk is not None]
+    if not pks:
+        return
+    keys = [OBJECT_KEY.format(label=label, pk=pk) for pk in pks]
+    generation_keys = [MODEL_GENERATION_KEY.format(label=label)] + [GENERATION_KEY.format(label=label, pk=pk) for pk in pks]
+    drop_objects(keys, generation_keys)
+    transaction.on_commit(lambda: drop_objects(keys, generation_keys))
+
+
+def record_object_cache_outcome(label, outcome):
+    with _stats_lock:
+        _stats[label][outcome] += 1
+
+
+def get_object_cache_stats():
+    """
+    Return the hits of each level and the misses of the object cache of this process by model label, with the share of
+    lookups answered without a query, e.g. `{"core_posts.Post": {"local_hits": 3, "shared_hits": 1, "misses": 1, "hit_rate": 0.8}}`.
+    """
+    with _stats_lock:
+        counts_by_label = {label: counts.copy() for label, counts in _stats.items()}
+    stats = {}
+    for label, counts in counts_by_label.items():
+        lookups = counts["local_hits"] + counts["shared_hits"] + counts["misses"]
+        stats[label] = {
+            "local_hits": counts["local_hits"],
+            "shared_hits": counts["shared_hits"],
+            "misses": counts["misses"],
+            "hit_rate": (counts["local_hits"] + counts["shared_hits"]) / lookups if lookups else 0,
+        }
+    return stats
+
+
+def reset_object_cache_stats():
+    with _stats_lock:
+        _stats.clear()
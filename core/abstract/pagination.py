@@ -0,0 +1,184 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import datetime
+from urllib import parse
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def order_by_keyset(queryset, fields, position=None, reverse=False):
+    """
+    Order `queryset` on the `(key, tiebreaker)` pair of `fields`, highest first (lowest first when `reverse` is True),
+    and keep only the rows that come strictly after `position`, a `(key, tiebreaker)` pair of values.
+    """
+    key, tiebreaker = fields
+    # The redundant bound on the key alone is what lets the database start the index scan at the position: without it,
+    # the OR is only applied as a filter on the rows read from the start of the index, so deep pages get slower and slower.
+    if reverse:
+        queryset = queryset.order_by(key, tiebreaker)
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(Q(**{f"{key}__gte": value}), Q(**{f"{key}__gt": value}) | Q(**{f"{tiebreaker}__gt": pk}))
+    else:
+        queryset = queryset.order_by(f"-{key}", f"-{tiebreaker}")
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(Q(**{f"{key}__lte": value}), Q(**{f"{key}__lt": value}) | Q(**{f"{tiebreaker}__lt": pk}))
+    return queryset
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination over the `(updated, id)` pair, newest first.
+    Every page is fetched with a range condition on the ordering key rather than an OFFSET,
+    so a deep page costs the same as the first one and rows inserted at the head don't shift the pages already handed out.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    @classmethod
+    def is_requested(cls, request):
+        """Return True if the client asked for the cursor-paginated representation of a listing."""
+        return cls.cursor_query_param in request.query_params or cls.page_size_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_rows(request, lambda position, reverse, limit: self.fetch_rows(queryset, position, reverse, limit))
+
+    def paginate_rows(self, request, fetch):
+        """
+        Paginate using `fetch(position, reverse, limit)` to load the rows that follow `position` in the requested direction.
+        This lets a listing be served from somewhere other than a queryset (e.g. a precomputed list of ids).
+        """
+        position, reverse = self.start_page(request)
+        # We fetch one extra row to find out whether there is another page after this one.
+        return self.finish_page(list(fetch(position, reverse, self.page_size + 1)), position, reverse)
+
+    async def apaginate_rows(self, request, fetch):
+        """Async counterpart of `paginate_rows`, where `fetch(position, reverse, limit)` is a coroutine function."""
+        position, reverse = self.start_page(request)
+        return self.finish_page(list(await fetch(position, reverse, self.page_size + 1)), position, reverse)
+
+    def start_page(self, request):
+        """Read the page size and cursor of `request` and return the `(position, reverse)` pair the page starts from."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        return self.decode_cursor(request)
+
+    def finish_page(self, rows, position, reverse):
+        """Trim the `page_size + 1` rows fetched after `position` down to the page and work out its links."""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, position is not None
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+
+    def fetch_rows(self, queryset, position, reverse, limit):
+        return order_by_keyset(queryset, ("updated", "id"), position, reverse)[:limit]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_position(self, row):
+        # Listings are paginated as model instances or as `.values()` rows (see core.abstract.serializers.ValuesSerializer).
+        if isinstance(row, dict):
+            return row["updated"], row["id"]
+        return row.updated, row.pk
+
+    def position_from_tokens(self, tokens):
+        return datetime.fromisoformat(tokens["u"][0]), int(tokens["i"][0])
+
+    def position_to_tokens(self, position):
+        return {"u": position[0].isoformat(), "i": position[1]}
+
+    def decode_cursor(self, request):
+        """Return the `(position, reverse)` pair encoded in the request's cursor, or `(None, False)` for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            position = self.position_from_tokens(tokens)
+            reverse = tokens.get("r", ["0"])[0] == "1"
+        except (TypeError, ValueError, KeyError, IndexError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        tokens = self.position_to_tokens(position)
+        if reverse:
+            tokens["r"] = "1"
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ])
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class RankedKeysetPagination(KeysetPagination):
+    """
+    Cursor pagination over the `(search_rank, id)` pair of ranked search results, best match first.
+    The rank is written into the cursor with `repr` so that it reads back as exactly the same float.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_rows(
+            request,
+            lambda position, reverse, limit: order_by_keyset(queryset, ("search_rank", "id"), position, reverse)[:limit],
+        )
+
+    def get_position(self, row):
+        return row.search_rank, row.pk
+
+    def position_from_tokens(self, tokens):
+        return float(tokens["k"][0]), int(tokens["i"][0])
+
+    def position_to_tokens(self, position):
+        return {"k": repr(position[0]), "i": position[1]}
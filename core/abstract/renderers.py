@@ -0,0 +1,84 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional: without it, JSON is encoded by the stdlib encoder.
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    # MessagePack is only offered when msgpack is installed.
+    msgpack = None
+
+
+# Response rendering. Serializers already turn most values into JSON types, so what is left to the renderer is walking
+# large lists of plain dicts, which is where the stdlib encoder (and the DRF encoder's `default`, called for every UUID
+# and datetime) spends its time. orjson encodes those natively, in C; anything else still goes through the DRF encoder.
+drf_default = JSONEncoder().default
+
+
+def encode_json(data):
+    """
+    Encode `data` as compact UTF-8 JSON bytes, exactly as DRF's `JSONRenderer` does with the default settings,
+    with orjson when it is installed and with the stdlib encoder otherwise.
+    """
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(data, default=drf_default, option=orjson.OPT_UTC_Z)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which only the stdlib encoder handles.
+            pass
+        else:
+            # Like DRF, we escape the line and paragraph separators so that the output is a strict JavaScript subset.
+            if b"\xe2\x80\xa8" in encoded or b"\xe2\x80\xa9" in encoded:
+                encoded = encoded.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+            return encoded
+    return JSONRenderer().render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement of DRF's `JSONRenderer` encoding with orjson when it is installed (see `encode_json`).
+    Indented output (e.g. `Accept: application/json; indent=4` or the browsable API) and non-default UNICODE_JSON/COMPACT_JSON
+    settings are left to the stdlib encoder, which is the only one to support them.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        if self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return encode_json(data)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Compact binary rendering, selected with `Accept: application/msgpack`.
+    It is only offered when the optional msgpack package is installed (see the DEFAULT_RENDERER_CLASSES setting).
+    """
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if msgpack is None:
+            raise ImproperlyConfigured("MessagePackRenderer requires the msgpack package.")
+        if data is None:
+            return b""
+        # UUIDs and datetimes are packed as the strings the JSON renderers produce, so both formats carry the same values.
+        return msgpack.packb(data, default=drf_default, use_bin_type=True, datetime=False)
+
+
+def get_async_renderer_classes():
+    """
+    Return the renderer classes the native async views negotiate between: the configured ones, except the browsable API,
+    which needs a DRF view to render its page.
+    """
+    return [renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES if not issubclass(renderer, BrowsableAPIRenderer)]
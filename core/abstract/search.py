@@ -0,0 +1,195 @@
+import math
+import re
+import threading
+from collections import Counter
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.utils.module_loading import import_string
+from core.abstract.pagination import order_by_keyset
+
+
+# Searchable models declare the text fields they are searched on with a `search_fields` attribute.
+# On PostgreSQL they also carry a `search_vector` tsvector column (with a GIN index) that the engine keeps in sync on save.
+DEFAULT_ENGINES = {"postgresql": "core.abstract.search.PostgresSearchEngine"}
+FALLBACK_ENGINE = "core.abstract.search.InvertedIndexSearchEngine"
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def get_search_text(instance):
+    return " ".join(getattr(instance, field) or "" for field in instance.search_fields)
+
+
+class PostgresSearchEngine:
+    """
+    Full-text search on the `search_vector` column of the searchable models.
+    Matches are found through the column's GIN index (never by scanning the table) and ranked with `ts_rank`.
+    """
+
+    def get_vector(self, model):
+        return SearchVector(*model.search_fields, config=settings.SEARCH_CONFIG)
+
+    def index(self, instances):
+        """Recompute the search vector of `instances`, in the current transaction."""
+        pks_per_model = {}
+        for instance in instances:
+            pks_per_model.setdefault(instance._meta.concrete_model, []).append(instance.pk)
+        for model, pks in pks_per_model.items():
+            model._base_manager.filter(pk__in=pks).update(search_vector=self.get_vector(model))
+
+    def remove(self, instances):
+        # The vector of a row goes away with the row itself.
+        pass
+
+    def rebuild(self, model):
+        """Recompute the search vector of every row of `model` and return the number of rows indexed."""
+        return model._base_manager.update(search_vector=self.get_vector(model))
+
+    def filter(self, queryset, terms):
+        """Return the rows of `queryset` whose search vector matches `terms`, annotated with their `search_rank`."""
+        query = SearchQuery(terms, config=settings.SEARCH_CONFIG, search_type="websearch")
+        # ts_rank returns a `real`; we widen it to a double so that the rank read back from a cursor compares equal to it.
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+
+    def search(self, queryset, terms, position=None, reverse=False, limit=10):
+        """
+        Return up to `limit` rows of `queryset` matching `terms`, annotated with their `search_rank`,
+        that follow the `(search_rank, id)` position, best match first (or last when `reverse` is True).
+        """
+        queryset = self.filter(queryset, terms)
+        return list(order_by_keyset(queryset, ("search_rank", "id"), position, reverse)[:limit])
+
+
+class InvertedIndexSearchEngine:
+    """
+    Portable in-process inverted index, used in tests and single-process development where Postgres isn't available.
+    Every instance shares the same data; the index of a model is built from the database on its first search
+    and kept in step with the rows saved or deleted by this process afterwards.
+    """
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def get_index(self, model):
+        with self._registry_lock:
+            return self._registry.setdefault(
+                model._meta.label,
+                {"postings": {}, "lengths": {}, "tokens": {}, "built": False, "lock": threading.Lock()},
+            )
+
+    def index(self, instances):
+        entries = [(instance._meta.concrete_model, instance.pk, get_search_text(instance)) for instance in instances]
+
+        def update():
+            for model, pk, text in entries:
+                data = self.get_index(model)
+                with data["lock"]:
+                    self._add(data, pk, text)
+
+        # Rows written by a transaction that is rolled back never reach the index.
+        transaction.on_commit(update)
+
+    def remove(self, instances):
+        entries = [(instance._meta.concrete_model, instance.pk) for instance in instances]
+
+        def update():
+            for model, pk in entries:
+                data = self.get_index(model)
+                with data["lock"]:
+                    self._discard(data, pk)
+
+        transaction.on_commit(update)
+
+    def rebuild(self, model):
+        """Rebuild the index of `model` from the database and return the number of rows indexed."""
+        rebuilt = {"postings": {}, "lengths": {}, "tokens": {}}
+        rows = model._base_manager.values_list("pk", *model.search_fields).iterator(chunk_size=2000)
+        for pk, *values in rows:
+            self._add(rebuilt, pk, " ".join(value or "" for value in values))
+        data = self.get_index(model)
+        with data["lock"]:
+            data.update(rebuilt, built=True)
+        return len(rebuilt["lengths"])
+
+    def clear(self):
+        with self._registry_lock:
+            self._registry.clear()
+
+    def search(self, queryset, terms, position=None, reverse=False, limit=10):
+        """
+        Return up to `limit` rows of `queryset` matching every term of `terms`, annotated with their `search_rank`,
+        that follow the `(search_rank, id)` position, best match first (or last when `reverse` is True).
+        """
+        tokens = set(tokenize(terms))
+        if not tokens:
+            return []
+        data = self.get_index(queryset.model)
+        if not data["built"]:
+            self.rebuild(queryset.model)
+        with data["lock"]:
+            postings = [data["postings"].get(token, {}) for token in tokens]
+            if not all(postings):
+                return []
+            total = len(data["lengths"])
+            ranked = []
+            for pk in set.intersection(*(set(posting) for posting in postings)):
+                # tf-idf of the matched terms, damped by the length of the document.
+                score = sum(posting[pk] * (1 + math.log(total / len(posting))) for posting in postings)
+                ranked.append((score / math.sqrt(data["lengths"][pk]), pk))
+        if position is not None:
+            position = tuple(position)
+            ranked = [entry for entry in ranked if (entry > position if reverse else entry < position)]
+        ranked.sort(reverse=not reverse)
+        # The ranked ids are hydrated one page-sized chunk at a time, skipping the rows the queryset filters out.
+        rows = []
+        for start in range(0, len(ranked), limit):
+            chunk = ranked[start:start + limit]
+            found = queryset.in_bulk([pk for _, pk in chunk])
+            for score, pk in chunk:
+                if pk in found:
+                    found[pk].search_rank = score
+                    rows.append(found[pk])
+            if len(rows) >= limit:
+                break
+        return rows[:limit]
+
+    def _add(self, data, pk, text):
+        self._discard(data, pk)
+        counts = Counter(tokenize(text))
+        for token, count in counts.items():
+            data["postings"].setdefault(token, {})[pk] = count
+        data["lengths"][pk] = max(sum(counts.values()), 1)
+        data["tokens"][pk] = list(counts)
+
+    def _discard(self, data, pk):
+        for token in data["tokens"].pop(pk, ()):
+            posting = data["postings"][token]
+            posting.pop(pk, None)
+            if not posting:
+                del data["postings"][token]
+        data["lengths"].pop(pk, None)
+
+
+def get_search_engine():
+    """
+    Return the engine selected by the SEARCH_ENGINE setting, or by default Postgres full-text search on PostgreSQL
+    and the in-process inverted index on any other database.
+    """
+    path = settings.SEARCH_ENGINE or DEFAULT_ENGINES.get(connection.vendor, FALLBACK_ENGINE)
+    return import_string(path)()
+
+
+def update_search_index(*instances, deleted=False):
+    """Add `instances` to (or remove them from) the search index."""
+    engine = get_search_engine()
+    if deleted:
+        engine.remove(instances)
+    else:
+        engine.index(instances)
@@ -1,6 +1,158 @@
+from operator import attrgetter, itemgetter
 from rest_framework import serializers
 
 class AbstractSerializer(serializers.ModelSerializer):
     id = serializers.UUIDField(source='public_id', read_only=True, format='hex')
     created = serializers.DateTimeField(read_only=True)
     updated = serializers.DateTimeField(read_only=True)
+
+
+# Converters reproducing the output of the DRF fields used by the model serializers.
+format_hex = attrgetter('hex')
+format_datetime = serializers.DateTimeField().to_representation
+
+class ValuesSerializer:
+    """
+    Read-only fast path for listings: builds exactly the representation of a model serializer, but straight from `.values()`
+    rows holding only the columns it needs. `fields` lists `(key, column, converter)` triples in the order of the
+    representation's keys and is compiled once per serializer into `(key, getter)` pairs, so serializing a row is a single
+    dict comprehension, without any field binding or per-field method dispatch.
+    A converter given by name is a method of the serializer called with the whole row (for nested or computed values),
+    any other converter is called with the value of the column.
+    """
+    fields = ()
+    # Nested serializers by the prefix of their columns, e.g. {"author__": UserValuesSerializer}.
+    nested = {}
+    # Keys of the representation holding counters or per-viewer state. They move too often to be cached with the rest of it,
+    # so a cached listing refreshes them from the current rows of `model` instead (see `refresh` and core.abstract.conditional).
+    volatile = ()
+    model = None
+
+    def __init__(self, context=None, prefix=""):
+        self.context = {} if context is None else context
+        self.prefix = prefix
+        self.plan = self.compile()
+
+    @classmethod
+    def get_columns(cls, prefix=""):
+        columns = [prefix + column for _, column, _ in cls.fields if column is not None]
+        for nested_prefix, serializer_class in cls.nested.items():
+            columns += serializer_class.get_columns(prefix + nested_prefix)
+        return list(dict.fromkeys(columns))
+
+    @classmethod
+    def get_volatile_columns(cls, prefix=""):
+        columns = [prefix + column for key, column, _ in cls.fields if key in cls.volatile and column is not None]
+        for nested_prefix, serializer_class in cls.nested.items():
+            columns += serializer_class.get_volatile_columns(prefix + nested_prefix)
+        return list(dict.fromkeys(columns))
+
+    @classmethod
+    def values(cls, queryset):
+        """Return `queryset` as `.values()` rows holding the columns the serializer needs."""
+        return queryset.values(*cls.get_columns())
+
+    def compile(self):
+        plan = []
+        for key, column, converter in self.fields:
+            if isinstance(converter, str):
+                getter = getattr(self, converter)
+            elif converter is None:
+                getter = itemgetter(self.prefix + column)
+            else:
+                getter = (lambda read, convert: lambda row: convert(read(row)))(itemgetter(self.prefix + column), converter)
+            plan.append((key, getter))
+        return plan
+
+    def to_representation(self, row):
+        return {key: getter(row) for key, getter in self.plan}
+
+    def prepare(self, rows):
+        """Look up what the representations of a whole page of `rows` need, before they are serialized or refreshed."""
+
+    def serialize(self, rows):
+        rows = list(rows)
+        self.prepare(rows)
+        return [self.to_representation(row) for row in rows]
+
+    def refresh_volatile(self, representation, row):
+        for key, getter in self.plan:
+            if key in self.volatile:
+                representation[key] = getter(row)
+
+    def refresh(self, representations, rows):
+        """
+        Overwrite the volatile keys of cached `representations` with the values of the current `rows`, given in the same order
+        and holding the columns of `get_volatile_columns()` plus the key.
+        """
+        rows = list(rows)
+        self.prepare(rows)
+        for representation, row in zip(representations, rows):
+            self.refresh_volatile(representation, row)
+        return representations
+
+    def get_validator_parts(self, row):
+        """Return the parts of the validators of a row, the same as `AbstractModel.get_validator_parts` for its instance."""
+        return [row[self.prefix + "public_id"].hex, row[self.prefix + "updated"].timestamp()]
+
+    def get_last_modified(self, row):
+        return row[self.prefix + "updated"]
+
+
+class AuthoredValuesSerializer(ValuesSerializer):
+    """
+    ValuesSerializer of the objects that users write and like (posts and comments). The author of every row is serialized
+    once per page by the serializer nested under "author__", and the `liked` states and buffered like counts of a page are
+    looked up for all of its rows at once.
+    Subclasses set `like_kind` (the target of the like relation, e.g. "post"), `buffered_like_deltas` (the lookup of the
+    likes not written to the counters yet) and the `counter_columns` their validators depend on.
+    """
+    like_kind = None
+    buffered_like_deltas = None
+    counter_columns = ('likes_count',)
+
+    def __init__(self, context=None, prefix=""):
+        super().__init__(context, prefix)
+        self.author_serializer = self.nested['author__'](self.context, prefix=self.prefix + 'author__')
+        self.authors = {}
+        self.liked_ids = None
+        self.like_deltas = {}
+
+    def prepare(self, rows):
+        self.liked_ids = self.get_liked_ids(rows)
+        self.like_deltas = self.buffered_like_deltas(self.like_kind, [row[self.prefix + 'id'] for row in rows])
+
+    def refresh_volatile(self, representation, row):
+        super().refresh_volatile(representation, row)
+        self.author_serializer.refresh_volatile(representation['author'], row)
+
+    def get_liked_ids(self, rows):
+        """Return the ids of the objects of `rows` liked by the requesting user (None for an anonymous one), with a single lookup."""
+        request = self.context.get('request', None)
+        if request is None or request.user.is_anonymous:
+            return None
+        # The async views look the likes up themselves, through the async ORM.
+        liked_ids = self.context.get('liked_ids', None)
+        if liked_ids is None:
+            liked_ids = getattr(request.user, f'liked_{self.like_kind}_ids')([row[self.prefix + 'id'] for row in rows])
+        return liked_ids
+
+    def get_author(self, row):
+        # Each distinct author is serialized once per page, however many rows they wrote.
+        author_id = row[self.prefix + 'author_id']
+        if author_id not in self.authors:
+            self.authors[author_id] = self.author_serializer.to_representation(row)
+        return self.authors[author_id]
+
+    def get_liked(self, row):
+        return self.liked_ids is not None and row[self.prefix + 'id'] in self.liked_ids
+
+    def get_likes_count(self, row):
+        return row[self.prefix + 'likes_count'] + self.like_deltas.get(row[self.prefix + 'id'], 0)
+
+    def get_validator_parts(self, row):
+        parts = super().get_validator_parts(row) + [row[self.prefix + column] for column in self.counter_columns]
+        return parts + self.author_serializer.get_validator_parts(row)
+
+    def get_last_modified(self, row):
+        return max(super().get_last_modified(row), self.author_serializer.get_last_modified(row))
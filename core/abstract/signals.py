@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent when something happens on posts, with `post_ids` and the kind of `activity` ("post", "like" or "comment") and its
+# `count` (negative when it is taken back, e.g. an unlike). The posts app ranks trending posts from it (see
+# core.posts.trending), which lets the users and comments apps report their activity without depending on it.
+post_activity = Signal()
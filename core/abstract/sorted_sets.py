@@ -0,0 +1,223 @@
+import bisect
+import threading
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class LocalSortedSet:
+    """
+    In-process stand-in for a Redis sorted set of integer ids, used in tests and single-process development.
+    Every instance created with the same name shares the same data, like keys on a Redis server do, but only within the process.
+    """
+    # Whether the set is seen by every process, e.g. a management command writing it and the web processes reading it.
+    shared = False
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.capacity = capacity
+        with self._registry_lock:
+            self._data = self._registry.setdefault(name, {"scores": {}, "entries": [], "flags": set(), "lock": threading.Lock()})
+
+    def add(self, member, score, create=True):
+        """Set the score of `member`. Unless `create` is True, nothing is done while the set is empty (see RedisSortedSet.add)."""
+        with self._data["lock"]:
+            if create or self._data["entries"]:
+                self._set(member, score)
+
+    def increment(self, member, amount):
+        """Add `amount` to the score of `member` (which starts from 0 when it isn't in the set)."""
+        with self._data["lock"]:
+            self._set(member, self._data["scores"].get(member, 0) + amount)
+
+    def remove(self, *members):
+        with self._data["lock"]:
+            for member in members:
+                self._discard(member)
+
+    def score(self, member):
+        return self._data["scores"].get(member)
+
+    def __len__(self):
+        return len(self._data["entries"])
+
+    def page(self, position=None, reverse=False, limit=10):
+        """
+        Return up to `limit` `(member, score)` pairs that come strictly after `position` (a `(score, member)` pair),
+        from the highest score down, or from the lowest score up when `reverse` is True.
+        """
+        with self._data["lock"]:
+            entries = self._data["entries"]
+            if reverse:
+                start = 0 if position is None else bisect.bisect_right(entries, tuple(position))
+                selected = entries[start:start + limit]
+            else:
+                end = len(entries) if position is None else bisect.bisect_left(entries, tuple(position))
+                selected = entries[max(0, end - limit):end][::-1]
+            return [(member, score) for score, member in selected]
+
+    def replace(self, items):
+        """Atomically replace the whole set with the `(member, score)` pairs of `items`."""
+        entries = sorted((score, member) for member, score in items)[-self.capacity:] if self.capacity else []
+        with self._data["lock"]:
+            self._data["entries"] = entries
+            self._data["scores"] = {member: score for score, member in entries}
+
+    def pop_all(self):
+        """Atomically empty the set and return its `(member, score)` pairs."""
+        with self._data["lock"]:
+            entries = self._data["entries"]
+            self._data["entries"] = []
+            self._data["scores"] = {}
+        return [(member, score) for score, member in entries]
+
+    def set_flag(self, flag):
+        self._data["flags"].add(flag)
+
+    def has_flag(self, flag):
+        return flag in self._data["flags"]
+
+    def clear(self):
+        with self._data["lock"]:
+            self._data["entries"] = []
+            self._data["scores"] = {}
+            self._data["flags"] = set()
+
+    def _set(self, member, score):
+        self._discard(member)
+        self._data["scores"][member] = score
+        bisect.insort(self._data["entries"], (score, member))
+        # Only the `capacity` highest scores are kept.
+        while len(self._data["entries"]) > self.capacity:
+            _, lowest = self._data["entries"].pop(0)
+            del self._data["scores"][lowest]
+
+    def _discard(self, member):
+        score = self._data["scores"].pop(member, None)
+        if score is not None:
+            index = bisect.bisect_left(self._data["entries"], (score, member))
+            del self._data["entries"][index]
+
+
+class RedisSortedSet:
+    """
+    Sorted set of integer ids stored in Redis (through the django-redis connection of the default cache).
+    Members are zero-padded so that Redis' lexicographic ordering of equal scores matches their numeric ordering.
+    """
+    shared = True
+    member_width = 20
+    # ZADD into an existing set only, trimmed to its capacity.
+    add_existing_script = """
+    if redis.call("EXISTS", KEYS[1]) == 0 then
+        return 0
+    end
+    redis.call("ZADD", KEYS[1], ARGV[1], ARGV[2])
+    redis.call("ZREMRANGEBYRANK", KEYS[1], 0, -(tonumber(ARGV[3]) + 1))
+    return 1
+    """
+
+    def __init__(self, name, capacity):
+        from django_redis import get_redis_connection
+
+        self.name = name
+        self.key = f"sorted_set:{name}"
+        self.capacity = capacity
+        self.client = get_redis_connection("default")
+
+    def add(self, member, score, create=True):
+        """
+        Set the score of `member`. Unless `create` is True, nothing is done when the set doesn't exist: a set that was
+        evicted (or never built) then stays missing instead of coming back with a single member.
+        """
+        if not create:
+            self.client.eval(self.add_existing_script, 1, self.key, score, self._encode(member), self.capacity)
+            return
+        pipeline = self.client.pipeline()
+        pipeline.zadd(self.key, {self._encode(member): score})
+        # Only the `capacity` highest scores are kept.
+        pipeline.zremrangebyrank(self.key, 0, -(self.capacity + 1))
+        pipeline.execute()
+
+    def increment(self, member, amount):
+        pipeline = self.client.pipeline()
+        pipeline.zincrby(self.key, amount, self._encode(member))
+        pipeline.zremrangebyrank(self.key, 0, -(self.capacity + 1))
+        pipeline.execute()
+
+    def remove(self, *members):
+        if members:
+            self.client.zrem(self.key, *[self._encode(member) for member in members])
+
+    def score(self, member):
+        return self.client.zscore(self.key, self._encode(member))
+
+    def __len__(self):
+        return self.client.zcard(self.key)
+
+    def page(self, position=None, reverse=False, limit=10):
+        """
+        Return up to `limit` `(member, score)` pairs that come strictly after `position` (a `(score, member)` pair),
+        from the highest score down, or from the lowest score up when `reverse` is True.
+        """
+        if position is None:
+            if reverse:
+                entries = self.client.zrangebyscore(self.key, "-inf", "+inf", start=0, num=limit, withscores=True)
+            else:
+                entries = self.client.zrevrangebyscore(self.key, "+inf", "-inf", start=0, num=limit, withscores=True)
+            return [(self._decode(member), score) for member, score in entries]
+        score, member = position
+        encoded = self._encode(member)
+        # Members sharing the position's score are ordered lexicographically; we exclude those on the wrong side of it.
+        if reverse:
+            entries = self.client.zrangebyscore(self.key, score, "+inf", withscores=True, start=0, num=limit + self._ties(score))
+            entries = [(m, s) for m, s in entries if s > score or m.decode() > encoded]
+        else:
+            entries = self.client.zrevrangebyscore(self.key, score, "-inf", withscores=True, start=0, num=limit + self._ties(score))
+            entries = [(m, s) for m, s in entries if s < score or m.decode() < encoded]
+        return [(self._decode(member), score) for member, score in entries[:limit]]
+
+    def replace(self, items):
+        """Atomically replace the whole set with the `(member, score)` pairs of `items`."""
+        mapping = {self._encode(member): score for member, score in items}
+        staging_key = f"{self.key}:staging"
+        pipeline = self.client.pipeline()
+        pipeline.delete(staging_key)
+        if mapping:
+            pipeline.zadd(staging_key, mapping)
+            pipeline.zremrangebyrank(staging_key, 0, -(self.capacity + 1))
+            pipeline.rename(staging_key, self.key)
+        else:
+            pipeline.delete(self.key)
+        pipeline.execute()
+
+    def pop_all(self):
+        # The pipeline runs in a MULTI/EXEC transaction, so no increment can slip in between the read and the delete.
+        pipeline = self.client.pipeline()
+        pipeline.zrange(self.key, 0, -1, withscores=True)
+        pipeline.delete(self.key)
+        entries, _ = pipeline.execute()
+        return [(self._decode(member), score) for member, score in entries]
+
+    def set_flag(self, flag):
+        self.client.set(f"{self.key}:flag:{flag}", 1)
+
+    def has_flag(self, flag):
+        return bool(self.client.exists(f"{self.key}:flag:{flag}"))
+
+    def clear(self):
+        self.client.delete(self.key, *self.client.scan_iter(match=f"{self.key}:flag:*"))
+
+    def _ties(self, score):
+        return self.client.zcount(self.key, score, score)
+
+    def _encode(self, member):
+        return str(member).zfill(self.member_width)
+
+    def _decode(self, member):
+        return int(member)
+
+
+def get_sorted_set(name, capacity):
+    """Return the sorted set called `name`, stored in the backend selected by the SORTED_SET_BACKEND setting."""
+    return import_string(settings.SORTED_SET_BACKEND)(name, capacity)
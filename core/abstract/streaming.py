@@ -0,0 +1,106 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import Throttled, ValidationError
+from rest_framework.throttling import UserRateThrottle
+from core.abstract.renderers import encode_json
+
+
+EXPORT_CONTENT_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def requested_export_format(request):
+    """Return the export format asked for with `?export=json|ndjson`, or None when the client wants a regular listing."""
+    export_format = request.query_params.get("export", None)
+    if export_format is None:
+        return None
+    if export_format not in EXPORT_CONTENT_TYPES:
+        raise ValidationError(f'"{export_format}" is not a valid export format. Use one of: {", ".join(EXPORT_CONTENT_TYPES)}.')
+    return export_format
+
+
+class ExportRateThrottle(UserRateThrottle):
+    """Limits how often a user (or an anonymous client, by address) may start an export, at the "export" throttle rate."""
+    scope = "export"
+
+
+def check_export_throttle(request):
+    """Raise Throttled when the client started too many exports lately: each of them reads a whole table or thread."""
+    throttle = ExportRateThrottle()
+    if not throttle.allow_request(request, None):
+        raise Throttled(wait=throttle.wait(), detail="Too many exports were started, try again later.")
+
+
+def encode_export(batches, export_format):
+    """Encode the serialized `batches` of an export as a JSON array or as newline-delimited JSON, one chunk per batch."""
+    # Each row is encoded on its own by the same encoder as the API responses (orjson when it is installed).
+    if export_format == "ndjson":
+        for items in batches:
+            yield b"".join(encode_json(item) + b"\n" for item in items)
+        return
+    yield b"["
+    separator = b""
+    for items in batches:
+        yield separator + b",".join(encode_json(item) for item in items)
+        separator = b","
+    yield b"]"
+
+
+async def aencode_export(batches, export_format):
+    """Async counterpart of `encode_export`, for the async iterable `batches`."""
+    if export_format == "ndjson":
+        async for items in batches:
+            yield b"".join(encode_json(item) + b"\n" for item in items)
+        return
+    yield b"["
+    separator = b""
+    async for items in batches:
+        yield separator + b",".join(encode_json(item) for item in items)
+        separator = b","
+    yield b"]"
+
+
+def streaming_export_response(queryset, serialize_batch, export_format, chunk_size=None):
+    """
+    Stream `queryset` as a JSON array or as newline-delimited JSON.
+    Rows are read with `.iterator(chunk_size=...)` and serialized one batch at a time by `serialize_batch(rows)`,
+    so neither the queryset nor the serialized list is ever held in memory as a whole, whatever the size of the table.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+
+    def batches():
+        batch = []
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            batch.append(instance)
+            if len(batch) >= chunk_size:
+                yield serialize_batch(batch)
+                batch = []
+        if batch:
+            yield serialize_batch(batch)
+
+    return StreamingHttpResponse(encode_export(batches(), export_format), content_type=EXPORT_CONTENT_TYPES[export_format])
+
+
+def astreaming_export_response(queryset, serialize_batch, export_format, chunk_size=None):
+    """
+    Async counterpart of `streaming_export_response` for the async views. The rows are read with `.aiterator()` and the
+    body is an async generator: under ASGI, Django buffers a sync iterator in full before sending it, which an export can't afford.
+    `serialize_batch(rows)` stays synchronous and runs in a worker thread.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    serialize = sync_to_async(serialize_batch)
+
+    async def batches():
+        batch = []
+        async for instance in queryset.aiterator(chunk_size=chunk_size):
+            batch.append(instance)
+            if len(batch) >= chunk_size:
+                yield await serialize(batch)
+                batch = []
+        if batch:
+            yield await serialize(batch)
+
+    return StreamingHttpResponse(aencode_export(batches(), export_format), content_type=EXPORT_CONTENT_TYPES[export_format])
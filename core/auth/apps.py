@@ -1,7 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class AuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core.auth'
     label = 'core_auth'
+
+    def ready(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+        from core.auth.blacklist import blacklist_token
+
+        # Tokens can be blacklisted by the logout endpoint as well as the admin, so the filter follows the model itself.
+        post_save.connect(blacklist_token, sender=BlacklistedToken, dispatch_uid="blacklist_token")
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+from core.auth.hashing import PasswordHashingBusy, hash_password, verify_password
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend verifying passwords in the bounded hashing pool (see core.auth.hashing) instead of the request thread,
+    and upgrading outdated password hashes as users log in. When every hashing slot is taken, the login is denied and
+    the request is marked with `password_hashing_busy`, which the login endpoints answer with a 429 (see
+    core.auth.serializers.login).
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            try:
+                user = user_model._default_manager.get_by_natural_key(username)
+            except user_model.DoesNotExist:
+                # Hash the password anyway, so that unknown emails take as long to reject as wrong passwords.
+                hash_password(password)
+                return None
+            valid = verify_password(user, password)
+        except PasswordHashingBusy:
+            if request is not None:
+                request.password_hashing_busy = True
+            # No other backend is tried either.
+            raise PermissionDenied("Too many logins are in progress.")
+        if valid and self.user_can_authenticate(user):
+            return user
+        return None
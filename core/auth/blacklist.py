@@ -0,0 +1,158 @@
+import hashlib
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from core.abstract.bloom import BloomFilter, bloom_hashes
+
+# Blacklist filter. Refreshing a token (and logging out) checks that its jti isn't blacklisted, which is a query on the
+# blacklist tables. Instead, the jtis of the unexpired blacklisted tokens are kept in a Bloom filter, built from the
+# database by the `rebuild_blacklist_filter` command when the application starts (and again periodically, which sheds the
+# expired ones, before the filter expires after TOKEN_BLACKLIST_FILTER_TIMEOUT seconds): a jti the filter doesn't contain
+# is not blacklisted, and only the few it may contain are checked in the database, like every jti while there is no filter.
+# Every blacklisted token is added to the filter once committed (see `blacklist_token`), and the tokens blacklisted while
+# it was being rebuilt are added again right after, so the filter never misses a blacklisted token it was built for.
+# Deleting blacklist rows (see the `purge_expired_tokens` command) leaves them in the filter, as mere false positives.
+REBUILD_MARGIN = timedelta(minutes=5)
+
+
+def jti_member(jti):
+    """Return the integer the Bloom filter hashes for `jti`."""
+    return int.from_bytes(hashlib.blake2b(jti.encode(), digest_size=8).digest(), "little", signed=True)
+
+
+class LocalTokenBlacklist:
+    """In-process stand-in for the Redis blacklist filter, used in tests and single-process development."""
+    # Whether the filter is seen by every process, e.g. the command building it and the web processes reading it.
+    shared = False
+    _data = {"filter": None, "expires": 0}
+    _lock = threading.Lock()
+
+    def lookup(self, jti):
+        """Return None if the filter isn't built, else whether it may contain `jti`."""
+        with self._lock:
+            bloom = self._data["filter"]
+            if bloom is None or self._data["expires"] < time.monotonic():
+                return None
+            return jti_member(jti) in bloom
+
+    def store(self, bloom):
+        with self._lock:
+            self._data["filter"] = bloom
+            self._data["expires"] = time.monotonic() + settings.TOKEN_BLACKLIST_FILTER_TIMEOUT
+
+    def add(self, jtis):
+        with self._lock:
+            bloom = self._data["filter"]
+            # Without a filter there is nothing to keep up to date: the next rebuild reads the token from the database.
+            if bloom is not None:
+                for jti in jtis:
+                    bloom.add(jti_member(jti))
+
+    def clear(self):
+        with self._lock:
+            self._data["filter"] = None
+
+
+class RedisTokenBlacklist:
+    """
+    Blacklist filter stored in Redis as a string of bits (through the django-redis connection of the default cache),
+    shared by every web process. The bit positions are computed by the Lua scripts from the two hashes of every jti,
+    like those of the liked sets (see core.users.liked_sets).
+    """
+    shared = True
+    key = "token_blacklist:filter"
+    lookup_script = """
+        local size = redis.call('STRLEN', KEYS[1]) * 8
+        if size == 0 then return -1 end
+        for hash = 0, tonumber(ARGV[1]) - 1 do
+            if redis.call('GETBIT', KEYS[1], (tonumber(ARGV[2]) + hash * tonumber(ARGV[3])) % size) == 0 then return 0 end
+        end
+        return 1
+    """
+    add_script = """
+        local size = redis.call('STRLEN', KEYS[1]) * 8
+        if size == 0 then return 0 end
+        for index = 2, #ARGV, 2 do
+            for hash = 0, tonumber(ARGV[1]) - 1 do
+                redis.call('SETBIT', KEYS[1], (tonumber(ARGV[index]) + hash * tonumber(ARGV[index + 1])) % size, 1)
+            end
+        end
+        return 1
+    """
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection("default")
+        self.num_hashes = bloom_hashes(settings.TOKEN_BLACKLIST_BLOOM_ERROR_RATE)
+
+    def lookup(self, jti):
+        found = self.client.eval(self.lookup_script, 1, self.key, self.num_hashes, *BloomFilter.hashes(jti_member(jti)))
+        return None if found == -1 else bool(found)
+
+    def store(self, bloom):
+        self.client.set(self.key, bytes(bloom.bits), ex=settings.TOKEN_BLACKLIST_FILTER_TIMEOUT)
+
+    def add(self, jtis):
+        hashes = [value for jti in jtis for value in BloomFilter.hashes(jti_member(jti))]
+        self.client.eval(self.add_script, 1, self.key, self.num_hashes, *hashes)
+
+    def clear(self):
+        self.client.delete(self.key)
+
+
+def get_token_blacklist():
+    """Return the blacklist filter of the backend selected by the TOKEN_BLACKLIST_BACKEND setting."""
+    return import_string(settings.TOKEN_BLACKLIST_BACKEND)()
+
+
+def blacklisted_tokens(since=None):
+    """Return the unexpired blacklisted tokens (blacklisted after `since`, if given)."""
+    tokens = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+    if since is not None:
+        tokens = tokens.filter(blacklisted_at__gte=since)
+    return tokens
+
+
+def blacklisted_jtis(since=None):
+    """Return an iterator over the jtis of the unexpired blacklisted tokens (blacklisted after `since`, if given)."""
+    tokens = blacklisted_tokens(since)
+    return tokens.values_list("token__jti", flat=True).iterator(chunk_size=settings.TOKEN_BLACKLIST_CHUNK_SIZE)
+
+
+def rebuild_blacklist_filter(blacklist=None):
+    """Build the blacklist filter from the database, store it and return the number of blacklisted tokens it holds."""
+    blacklist = blacklist or get_token_blacklist()
+    started = timezone.now()
+    # The filter is sized from a count, so that the jtis are streamed into it a chunk at a time rather than loaded first.
+    # It is sized for twice the current blacklist, so that the tokens blacklisted later don't degrade it too fast.
+    capacity = max(2 * blacklisted_tokens().count(), settings.TOKEN_BLACKLIST_MIN_CAPACITY)
+    bloom = BloomFilter.for_capacity(capacity, settings.TOKEN_BLACKLIST_BLOOM_ERROR_RATE)
+    added = 0
+    for jti in blacklisted_jtis():
+        bloom.add(jti_member(jti))
+        added += 1
+    blacklist.store(bloom)
+    # Tokens blacklisted while the filter was built may have missed both the query and the filter.
+    blacklist.add(list(blacklisted_jtis(since=started - REBUILD_MARGIN)))
+    return added
+
+
+def is_blacklisted(jti):
+    """Return whether the token with `jti` is blacklisted, checking the database only when the filter may contain it."""
+    if get_token_blacklist().lookup(jti) is False:
+        return False
+    # The filter may contain the token, or it isn't built (see the `rebuild_blacklist_filter` command).
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def blacklist_token(sender, instance, created, **kwargs):
+    """Add every new blacklisted token to the blacklist filter once committed, whichever way it was blacklisted."""
+    if created:
+        jti = instance.token.jti
+        transaction.on_commit(lambda: get_token_blacklist().add([jti]))
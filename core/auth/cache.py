@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from core.abstract.object_cache import restore_object, snapshot_object
+
+
+# Users authenticated from a JWT are cached for AUTH_USER_CACHE_TIMEOUT seconds under their id, so that an authenticated
+# request doesn't need to load its user from the database (see core.auth.authentication.CachedJWTAuthentication).
+# A cached user is only reused for tokens that aren't newer than it: tokens carry the `updated` time of their user when
+# they were issued (see core.auth.tokens), so a token issued after a change the cache missed reloads the user.
+# Any save, queryset update or deletion of a user (including deactivations and password changes) drops its entry, once
+# the change is written and once more when it is committed. Only active users are cached, as snapshots of their columns
+# without their `uncached_fields` (see core.abstract.object_cache), so that no password hash ends up in the shared cache.
+AUTH_USER_KEY = "auth_user:{user_id}"
+UPDATED_CLAIM = "updated"
+
+
+def get_authenticated_user(user_id, updated=None):
+    """Return the cached user with `user_id`, unless there is none or it is older than the `updated` token claim."""
+    return restore_authenticated_user(cache.get(AUTH_USER_KEY.format(user_id=user_id)), updated)
+
+
+async def aget_authenticated_user(user_id, updated=None):
+    """Async counterpart of `get_authenticated_user`."""
+    return restore_authenticated_user(await cache.aget(AUTH_USER_KEY.format(user_id=user_id)), updated)
+
+
+def restore_authenticated_user(data, updated):
+    if data is None:
+        return None
+    user = restore_object(get_user_model()._default_manager, data)
+    if updated is not None and user.updated.timestamp() < updated:
+        return None
+    return user
+
+
+def cache_authenticated_user(user):
+    cache.set(AUTH_USER_KEY.format(user_id=user.pk), snapshot_object(user), timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+
+
+async def acache_authenticated_user(user):
+    await cache.aset(AUTH_USER_KEY.format(user_id=user.pk), snapshot_object(user), timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+
+
+def forget_authenticated_user(*user_ids):
+    """
+    Drop the cached users with `user_ids` now and once more when the current transaction commits, in case a concurrent
+    request cached the state they had before.
+    """
+    keys = [AUTH_USER_KEY.format(user_id=user_id) for user_id in user_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
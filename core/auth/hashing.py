@@ -0,0 +1,131 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.utils.module_loading import import_string
+
+# Password hashing pool. Hashing a password (PBKDF2 by default) takes a core for a long while, so a burst of logins or
+# registrations could take every web worker away from the other endpoints. Passwords are hashed and verified in a pool
+# of PASSWORD_HASHING_WORKERS threads per process (hashlib releases the GIL while it hashes), and at most
+# PASSWORD_HASHING_CONCURRENCY of them run at once across all the processes: a request that finds every slot taken fails
+# right away, without holding its worker while it waits for one, and the login and registration endpoints answer it
+# with a 429, leaving the other cores to the rest of the API.
+# Only the hashing runs in the pool: the database work stays in the request thread.
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when every password hashing slot is taken."""
+
+
+class LocalHashingSlots:
+    """In-process stand-in for the Redis hashing slots, used in tests and single-process development."""
+    _semaphores = {}
+    _lock = threading.Lock()
+
+    def semaphore(self):
+        with self._lock:
+            size = settings.PASSWORD_HASHING_CONCURRENCY
+            if size not in self._semaphores:
+                self._semaphores[size] = threading.BoundedSemaphore(size)
+            return self._semaphores[size]
+
+    def acquire(self):
+        """Take a hashing slot if one is free and return its token, else return None right away."""
+        semaphore = self.semaphore()
+        return semaphore if semaphore.acquire(blocking=False) else None
+
+    def release(self, token):
+        token.release()
+
+
+class RedisHashingSlots:
+    """
+    Hashing slots shared by every process through Redis (the django-redis connection of the default cache): a sorted set
+    of the slots in use, scored by the time they were taken, so that the slots of a crashed process free up after
+    PASSWORD_HASHING_SLOT_LEASE seconds.
+    """
+    key = "password_hashing:slots"
+    acquire_script = """
+        redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]) - tonumber(ARGV[2]))
+        if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then return 0 end
+        redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+        redis.call('EXPIRE', KEYS[1], ARGV[2])
+        return 1
+    """
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection("default")
+
+    def acquire(self):
+        token = uuid.uuid4().hex
+        arguments = [time.time(), settings.PASSWORD_HASHING_SLOT_LEASE, settings.PASSWORD_HASHING_CONCURRENCY, token]
+        return token if self.client.eval(self.acquire_script, 1, self.key, *arguments) else None
+
+    def release(self, token):
+        self.client.zrem(self.key, token)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hashing_slots():
+    """Return the hashing slots of the backend selected by the PASSWORD_HASHING_SLOTS_BACKEND setting."""
+    return import_string(settings.PASSWORD_HASHING_SLOTS_BACKEND)()
+
+
+def get_hashing_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASHING_WORKERS, thread_name_prefix="password-hashing")
+    return _executor
+
+
+def run_password_hashing(function, *args):
+    """
+    Run `function(*args)` in the hashing pool with a hashing slot and return its result.
+    Raise PasswordHashingBusy when every slot is taken.
+    """
+    slots = get_hashing_slots()
+    token = slots.acquire()
+    if token is None:
+        raise PasswordHashingBusy()
+    try:
+        return get_hashing_executor().submit(function, *args).result()
+    finally:
+        slots.release(token)
+
+
+def hash_password(raw_password):
+    """Return the hash of `raw_password` with the preferred hasher (see PASSWORD_HASHERS), computed in the hashing pool."""
+    return run_password_hashing(make_password, raw_password)
+
+
+def check_password_hash(raw_password, encoded):
+    """
+    Return whether `raw_password` matches the `encoded` hash, and the new hash of the password when that one should be
+    upgraded (else None). Both are computed in the same call, so that an upgrade doesn't need a hashing slot of its own.
+    """
+    upgraded = []
+    # The setter is only called for a correct password whose hash uses an older hasher or fewer iterations.
+    valid = check_password(raw_password, encoded, setter=lambda password: upgraded.append(make_password(password)))
+    return valid, upgraded[0] if upgraded else None
+
+
+def verify_password(user, raw_password):
+    """
+    Return whether `raw_password` is the password of `user`, verified in the hashing pool. A correct password hashed
+    with anything but the preferred hasher and its current iterations is hashed again, within the same hashing slot,
+    and saved, so that changing PASSWORD_HASHERS (or upgrading Django) migrates every user at their next login.
+    """
+    valid, upgraded = run_password_hashing(check_password_hash, raw_password, user.password)
+    if valid and upgraded is not None:
+        user.password = upgraded
+        user.save(update_fields=["password"])
+    return valid
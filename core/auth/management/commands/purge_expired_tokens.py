@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from core.auth.blacklist import rebuild_blacklist_filter
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the expired blacklisted and outstanding tokens in small batches, each in its own short transaction, "
+        "then rebuild the blacklist filter without them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of rows deleted per statement.")
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to wait between two batches.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        # Blacklisted tokens go first, so that deleting the outstanding ones doesn't cascade to many rows at once.
+        blacklisted = self.purge(BlacklistedToken.objects.filter(token__expires_at__lte=now), options["batch_size"], options["pause"])
+        outstanding = self.purge(OutstandingToken.objects.filter(expires_at__lte=now), options["batch_size"], options["pause"])
+        self.stdout.write(f"Purged {blacklisted} blacklisted and {outstanding} outstanding expired token(s)")
+        if blacklisted:
+            kept = rebuild_blacklist_filter()
+            self.stdout.write(f"Blacklist filter rebuilt with {kept} token(s)")
+
+    def purge(self, queryset, batch_size, pause):
+        """Delete the rows of `queryset` `batch_size` at a time, walking the primary key so that no batch rescans the previous ones."""
+        purged, last_pk = 0, 0
+        while True:
+            pks = list(queryset.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                return purged
+            # Outside of any transaction, each delete commits on its own and only locks its batch.
+            queryset.model.objects.filter(pk__in=pks).delete()
+            purged += len(pks)
+            last_pk = pks[-1]
+            if pause:
+                time.sleep(pause)
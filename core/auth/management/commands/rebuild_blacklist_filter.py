@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from core.auth.blacklist import get_token_blacklist, rebuild_blacklist_filter
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the blacklist filter from the blacklisted tokens that haven't expired. "
+        "Runs once, e.g. when the application starts, or forever every --interval seconds as a background job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0, help="Seconds between two rebuilds (0 rebuilds once).")
+
+    def handle(self, *args, **options):
+        blacklist = get_token_blacklist()
+        # A process-local filter would be built here and never seen by the web processes.
+        if not blacklist.shared:
+            raise CommandError("The blacklist filter is stored in-process (see TOKEN_BLACKLIST_BACKEND), set REDIS_URL to share it.")
+        while True:
+            kept = rebuild_blacklist_filter(blacklist)
+            self.stdout.write(f"Blacklist filter rebuilt with {kept} token(s)")
+            if options["interval"] <= 0:
+                return
+            time.sleep(options["interval"])
+            close_old_connections()
@@ -1,10 +1,32 @@
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from rest_framework_simplejwt.settings import api_settings
+from rest_framework.exceptions import AuthenticationFailed, Throttled
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from core.auth.tokens import UserRefreshToken
 from core.users.serializers import UserSerializer
 from typing import Any, Dict
 
 
-class LoginSerializer(TokenObtainPairSerializer):
+class TokenSerializer(TokenObtainPairSerializer):
+    """Serializer of the token endpoint, issuing the same tokens as the login endpoint (see LoginSerializer)."""
+    token_class = UserRefreshToken
+
+    def validate(self, attrs):
+        try:
+            return super().validate(attrs)
+        except AuthenticationFailed:
+            # The password couldn't be checked because every hashing slot was taken (see core.auth.backends).
+            if getattr(self.context.get("request"), "password_hashing_busy", False):
+                raise Throttled(detail="Too many logins are in progress.")
+            raise
+
+
+class RefreshSerializer(TokenRefreshSerializer):
+    """Serializer of the token refresh endpoint, checking the blacklist through its filter (see core.auth.blacklist)."""
+    token_class = UserRefreshToken
+
+
+class LoginSerializer(TokenSerializer):
+    # The issued tokens carry the "updated" claim the cached user resolution relies on (see core.auth.cache).
+
     # The "is_valid" method will call this method, passing the request.data as an argument to the "attrs" parameter.
     def validate(self, attrs):
         # We validate the data in the parent class.
@@ -13,8 +35,6 @@ class LoginSerializer(TokenObtainPairSerializer):
         # The ".user" attribute becomes available to this serializer the moment the data is validated.
         # Below, we update the data to include the serialized user object.
         data["user"] = UserSerializer(self.user, context=self.context).data
-
-        if api_settings.UPDATE_LAST_LOGIN:
-            update_last_login(None, self.user)
+        # The parent class already records the login in "last_login" when the UPDATE_LAST_LOGIN setting is on.
         # The data is then returned and stored as the value of the ".validated_data" attribute of the serializer.
         return data
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from rest_framework.exceptions import Throttled
+from core.auth.hashing import PasswordHashingBusy
 from core.users.serializers import UserSerializer
 from core.abstract.serializers import AbstractSerializer
 from core.users.models import User
@@ -18,4 +20,7 @@ class RegisterSerializer(AbstractSerializer):
     def create(self, validated_data):
         # Use the `create_user` method we wrote earlier for the UserManager to create a new user.
         # This method would have still run automatically. We just made it explicit.
-        return User.objects.create_user(**validated_data)
+        try:
+            return User.objects.create_user(**validated_data)
+        except PasswordHashingBusy:
+            raise Throttled(detail="Too many registrations are in progress.")
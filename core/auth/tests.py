@@ -1,5 +1,23 @@
-from rest_framework.test import APITestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import PermissionDenied
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework import status
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from core.auth.authentication import CachedJWTAuthentication
+from core.auth.backends import PooledModelBackend
+from core.auth.blacklist import LocalTokenBlacklist, get_token_blacklist, rebuild_blacklist_filter
+from core.auth.cache import AUTH_USER_KEY, cache_authenticated_user
+from core.auth.hashing import LocalHashingSlots, get_hashing_slots
+from core.auth.tokens import UserRefreshToken
 from core.users.models import User
 
 # Create your tests here.
@@ -81,3 +99,190 @@ class AuthenticationViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.authenticator = CachedJWTAuthentication()
+
+    def authenticate(self, token=None):
+        token = token or UserRefreshToken.for_user(self.user).access_token
+        request = APIRequestFactory().get("/api/core/users/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return self.authenticator.authenticate(request)[0]
+
+    def test_the_user_is_only_loaded_once(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(token), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(token), self.user)
+
+    def test_saves_deactivations_and_password_changes_reach_the_cached_user(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        self.authenticate(token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("new_password")
+            self.user.save(update_fields=["password"])
+        self.assertTrue(self.authenticate(token).check_password("new_password"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_the_cached_user_has_no_password_hash(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        self.authenticate(token)
+        self.assertNotIn(self.user.password.encode(), cache.get(AUTH_USER_KEY.format(user_id=self.user.pk)))
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+        self.assertEqual(user.get_deferred_fields(), {"password"})
+
+    def test_queryset_updates_reach_the_cached_user(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        self.authenticate(token)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(posts_count=F("posts_count") + 1)
+        self.assertEqual(self.authenticate(token).posts_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_inactive_users_are_not_cached(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        for _ in range(2):
+            with self.assertNumQueries(1), self.assertRaises(AuthenticationFailed):
+                self.authenticate(token)
+
+    def test_a_cached_user_older_than_the_token_is_reloaded(self):
+        stale = User.objects.get(pk=self.user.pk)
+        stale.first_name, stale.updated = "Stale", stale.updated - timedelta(minutes=1)
+        cache_authenticated_user(stale)
+        token = UserRefreshToken.for_user(self.user).access_token
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(token).first_name, "Test")
+
+
+class TokenBlacklistTests(APITestCase):
+    def setUp(self):
+        get_token_blacklist().clear()
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.refresh = str(UserRefreshToken.for_user(self.user))
+
+    def tearDown(self):
+        get_token_blacklist().clear()
+
+    def test_valid_tokens_skip_the_blacklist_tables(self):
+        # without a filter, the token is checked in the database, and a refresh doesn't build the filter itself.
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                UserRefreshToken(self.refresh)
+        rebuild_blacklist_filter()
+        with self.assertNumQueries(0):
+            UserRefreshToken(self.refresh)
+        response = self.client.post("/api/core/auth/token/refresh/", data={"refresh": self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_blacklisted_tokens_are_rejected_before_and_after_a_rebuild(self):
+        rebuild_blacklist_filter()
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/core/auth/logout/", data={"refresh": self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.post("/api/core/auth/token/refresh/", data={"refresh": self.refresh}).status_code, status.HTTP_401_UNAUTHORIZED)
+        get_token_blacklist().clear()
+        with self.assertRaises(TokenError):
+            UserRefreshToken(self.refresh)
+
+    def test_rebuild_blacklist_filter_command(self):
+        UserRefreshToken(self.refresh).blacklist()
+        # the web processes couldn't see a process-local filter built by the command.
+        with self.assertRaises(CommandError):
+            call_command("rebuild_blacklist_filter", stdout=StringIO())
+        out = StringIO()
+        with mock.patch.object(LocalTokenBlacklist, "shared", True):
+            call_command("rebuild_blacklist_filter", stdout=out)
+        self.assertIn("Blacklist filter rebuilt with 1 token(s)", out.getvalue())
+        self.assertTrue(get_token_blacklist().lookup(UserRefreshToken(self.refresh, verify=False)["jti"]))
+
+    def test_purge_expired_tokens_command(self):
+        expired = timezone.now() - timedelta(days=1)
+        for index in range(3):
+            token = OutstandingToken.objects.create(user=self.user, jti=f"expired-{index}", token="expired", expires_at=expired)
+            if index:
+                BlacklistedToken.objects.create(token=token)
+        UserRefreshToken(self.refresh).blacklist()
+        out = StringIO()
+        call_command("purge_expired_tokens", batch_size=1, stdout=out)
+        self.assertIn("Purged 2 blacklisted and 3 outstanding expired token(s)", out.getvalue())
+        self.assertIn("Blacklist filter rebuilt with 1 token(s)", out.getvalue())
+        self.assertEqual(list(BlacklistedToken.objects.values_list("token__jti", flat=True)), [UserRefreshToken(self.refresh, verify=False)["jti"]])
+
+
+class PooledPasswordHashingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+
+    def login(self, email="test@gmail.com", password="test_password"):
+        return self.client.post("/api/core/auth/login/", data={"email": email, "password": password})
+
+    def test_wrong_passwords_and_unknown_emails_are_rejected(self):
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.login(password="wrong_password").status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.login(email="unknown@gmail.com").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.PBKDF2PasswordHasher", "django.contrib.auth.hashers.MD5PasswordHasher"])
+    def test_outdated_hashes_are_upgraded_at_login(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password("test_password", hasher="md5"))
+        self.assertEqual(self.login(password="wrong_password").status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("md5$"))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertTrue(self.user.check_password("test_password"))
+
+    @override_settings(
+        PASSWORD_HASHERS=["django.contrib.auth.hashers.PBKDF2PasswordHasher", "django.contrib.auth.hashers.MD5PasswordHasher"],
+        PASSWORD_HASHING_CONCURRENCY=1,
+    )
+    def test_outdated_hashes_are_upgraded_within_the_slot_of_the_check(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password("test_password", hasher="md5"))
+        release, taken = LocalHashingSlots.release, []
+
+        def release_then_fill(slots, token):
+            # another login takes the only slot as soon as the password check gives it back.
+            release(slots, token)
+            if not taken:
+                taken.append(slots.acquire())
+
+        with mock.patch.object(LocalHashingSlots, "release", release_then_fill):
+            response = self.login()
+        release(get_hashing_slots(), taken[0])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+    @override_settings(PASSWORD_HASHING_CONCURRENCY=1)
+    def test_logins_are_throttled_when_every_hashing_slot_is_taken(self):
+        slots = get_hashing_slots()
+        token = slots.acquire()
+        try:
+            # the login fails right away instead of waiting for the slot.
+            self.assertIsNone(slots.acquire())
+            response = self.login()
+            # the backend itself denies the login, the 429 is the endpoint's answer.
+            with self.assertRaises(PermissionDenied):
+                PooledModelBackend().authenticate(None, username="test@gmail.com", password="test_password")
+            registration = self.client.post(
+                "/api/core/auth/register/",
+                data={"email": "other@gmail.com", "username": "other_user", "password": "other_password", "first_name": "Other", "last_name": "User"},
+            )
+        finally:
+            slots.release(token)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(registration.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
@@ -0,0 +1,24 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.auth.blacklist import is_blacklisted
+from core.auth.cache import UPDATED_CLAIM
+
+
+class UserRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the `updated` time of its user, which the access tokens issued from it copy.
+    It tells the cached user resolution which state of the user the token has at least seen (see core.auth.cache).
+    Its blacklist check goes through the blacklist filter (see core.auth.blacklist).
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[UPDATED_CLAIM] = user.updated.timestamp()
+        return token
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
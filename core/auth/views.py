@@ -3,7 +3,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.tokens import TokenError
+from core.auth.tokens import UserRefreshToken
 from core.users.models import User
 from core.users.serializers import UserSerializer
 from core.auth.serializers.register import RegisterSerializer
@@ -19,7 +20,7 @@ def register(request):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
         user_serializer = UserSerializer(user, context={'request':request})
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         res = {"access": str(refresh.access_token), "refresh": str(refresh)}
         return Response({"user": user_serializer.data, "access": res["access"], "refresh": res["refresh"]}, status=status.HTTP_201_CREATED)
 
@@ -41,7 +42,7 @@ def logout(request):
         if refresh_token is None:
             raise ValidationError({"detail":"A refresh token is required."})
         try:
-            token = RefreshToken(refresh_token)
+            token = UserRefreshToken(refresh_token)
             token.blacklist()
             return Response(status=status.HTTP_204_NO_CONTENT)
         except TokenError:
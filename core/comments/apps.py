@@ -1,7 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
 
 
 class CommentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core.comments'
     label = 'core_comments'
+
+    def ready(self):
+        from core.abstract.models import invalidate_deleted_object
+        from core.comments.models import Comment, count_deleted_comment
+
+        # The denormalized counters follow every deletion, including queryset and cascade deletes (see core.comments.models).
+        post_delete.connect(count_deleted_comment, sender=Comment, dispatch_uid="count_deleted_comment")
+        # So do the caches (see core.abstract.models).
+        post_delete.connect(invalidate_deleted_object, sender=Comment, dispatch_uid="invalidate_deleted_comment")
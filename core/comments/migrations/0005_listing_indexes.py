@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:57
+
+from django.conf import settings
+from django.db import migrations, models
+from core.abstract.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('core_comments', '0004_search_vector'),
+        ('core_posts', '0005_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='comment',
+            index=models.Index(fields=['post', '-updated', '-id'], name='comment_post_updated_idx'),
+        ),
+    ]
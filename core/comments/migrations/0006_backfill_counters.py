@@ -0,0 +1,23 @@
+from django.db import migrations
+from core.abstract.models import count_subquery, reconcile_counter
+
+
+def backfill_counters(apps, schema_editor):
+    # The counter was added with a default of 0: compute it from the likes that already exist.
+    Comment = apps.get_model("core_comments", "Comment")
+    likes = apps.get_model("core_users", "User")._meta.get_field("comments_liked").remote_field.through
+    reconcile_counter(Comment, "likes_count", count_subquery(likes.objects.all(), "comment"))
+
+
+class Migration(migrations.Migration):
+    # Each chunk of the backfill runs in its own transaction, so that it never locks the whole table.
+    atomic = False
+
+    dependencies = [
+        ('core_comments', '0005_listing_indexes'),
+        ('core_users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
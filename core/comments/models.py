@@ -1,17 +1,92 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import F
 from core.abstract.models import AbstractModel, AbstractManager
+from core.abstract.object_cache import invalidate_objects
+from core.abstract.signals import post_activity
+from core.abstract.search import update_search_index
 
 # Create your models here.
 class CommentManager(AbstractManager):
-    pass
+    def for_listing(self):
+        """
+        Return the list read path for comments. The like and author-post counts are stored on the rows themselves,
+        so joining the post and the author is all it takes to serialize a page of comments with a single query.
+        The search vectors are never part of a representation, so they aren't loaded.
+        """
+        return self.select_related("post", "author").defer("search_vector", "post__search_vector")
 
 class Comment(AbstractModel):
     post = models.ForeignKey("core_posts.Post", on_delete=models.CASCADE)
     author = models.ForeignKey("core_users.User", on_delete=models.CASCADE)
     body = models.TextField()
     edited = models.BooleanField(default=False)
+    # Denormalized counter kept up to date by the like code paths (see `reconcile_counters` to repair drift).
+    likes_count = models.PositiveIntegerField(default=0)
+    # Full-text search vector of the body, kept in sync on save (only filled in on PostgreSQL, see core.abstract.search).
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = CommentManager()
+    uncached_fields = ("search_vector",)
+    search_fields = ("body",)
+
+    def get_cache_namespaces(self, update_fields=None):
+        return [comments_cache_namespace(self.post_id)]
+
+    def get_validator_parts(self):
+        return super().get_validator_parts() + [self.likes_count] + self.author.get_validator_parts()
+
+    def get_last_modified(self):
+        return max(self.updated, self.author.get_last_modified())
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get("update_fields", None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                adjust_comments_count(self, 1)
+            if update_fields is None or "body" in update_fields:
+                update_search_index(self)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            update_search_index(self, deleted=True)
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return self.author.name
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="comment_search_vector_gin"),
+            # Composite index matching the comments of one post, newest first.
+            models.Index(fields=["post", "-updated", "-id"], name="comment_post_updated_idx"),
+        ]
+
+
+def comments_cache_namespace(post_id):
+    """Return the cache namespace of the comment listings of the post with primary key `post_id`."""
+    return f"comments:{post_id}"
+
+
+def count_deleted_comment(sender, instance, **kwargs):
+    """
+    Take a deleted comment back from the comment count of its post. As a post_delete receiver, this also runs for
+    comments deleted by a queryset or along with their author, which never go through `Comment.delete`.
+    """
+    adjust_comments_count(instance, -1)
+
+
+def adjust_comments_count(comment, delta):
+    """Atomically add `delta` to the stored comment count of the post `comment` belongs to."""
+    post_field = comment._meta.get_field("post")
+    post_field.related_model.objects.filter(pk=comment.post_id).update(comments_count=F("comments_count") + delta)
+    # The cached post listings read the comment count again on every hit (see core.abstract.conditional), only the cached post goes.
+    invalidate_objects(post_field.related_model, [comment.post_id])
+    # Comments feed the trending ranking of their post (see core.abstract.signals).
+    post_activity.send(sender=type(comment), post_ids=[comment.post_id], activity="comment", count=delta)
+    # Keep the post instance attached to the comment (if any) in step with the database.
+    if post_field.is_cached(comment):
+        comment.post.comments_count += delta
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from core.abstract.serializers import AbstractSerializer
-from core.users.serializers import UserSerializer
+from core.abstract.serializers import AbstractSerializer, AuthoredValuesSerializer, format_datetime, format_hex
+from core.users.like_buffer import buffered_like_deltas
+from core.users.loaders import AuthorLoader, AuthorListSerializer
+from core.users.serializers import UserValuesSerializer
 from core.users.models import User
 from core.posts.models import Post
 from core.comments.models import Comment
@@ -11,20 +13,22 @@ class CommentSerializer(AbstractSerializer):
     post = serializers.SlugRelatedField(queryset=Post.objects.all(), slug_field='public_id')
     # The Serializer class in Django provides ways to create the write_only values that will be sent on the response.
     liked = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
+    # The counter is stored on the comment and maintained by the like code paths, so reading it costs nothing.
+    likes_count = serializers.IntegerField(read_only=True)
     # In the preceding code, we are using the serializers.SerializerMethodField() field, which allows us to write a custom function that will return a value we want to attribute to this field.
     # The syntax of the method will be get_field, where field is the name of the field declared on the serializer.
-    # That is why for liked, we have the get_liked method, and for likes_count, we have the get_likes_count method.
+    # That is why for liked, we have the get_liked method.
 
     def get_liked(self, instance):
         request = self.context.get('request', None)
         if request is None or request.user.is_anonymous:
             return False
+        # The views that can't query per row (e.g. the async ones) look the likes of the whole page up beforehand.
+        liked_ids = self.context.get('liked_ids', None)
+        if liked_ids is not None:
+            return instance.pk in liked_ids
         return request.user.has_liked_comment(instance)
 
-    def get_likes_count(self, instance):
-        return instance.liked_by.count()
-
     def update(self, instance, validated_data):
         if not instance.edited:
             validated_data['edited'] = True
@@ -52,10 +56,11 @@ class CommentSerializer(AbstractSerializer):
         # The to_representation() method takes the object instance that requires serialization and returns a primitive representation.
         # This usually means returning a structure of built-in Python data types.
         # We update the representation of the serialized comment to represent the author field as a serialized user rather than a public id.
-        print("The comment serializer context is: ", self.context)
         representation = super().to_representation(instance)
-        author = User.objects.get_object_by_public_id(representation["author"])
-        representation["author"] = UserSerializer(author, context=self.context).data
+        # The author loader reuses the author joined onto the row (or loaded for the whole page) and serializes each distinct author once per request.
+        representation["author"] = AuthorLoader.for_context(self.context).represent(instance)
+        # Likes that are still buffered (see core.users.like_buffer) aren't in the stored counter yet.
+        representation["likes_count"] += buffered_like_deltas("comment", [instance.pk]).get(instance.pk, 0)
         return representation
 
     class Meta:
@@ -64,3 +69,25 @@ class CommentSerializer(AbstractSerializer):
         # request or a response
         fields = ['id', 'post', 'author', 'body', 'edited', 'liked', 'likes_count', 'created', 'updated']
         read_only_fields = ["edited"]
+        list_serializer_class = AuthorListSerializer
+
+
+class CommentValuesSerializer(AuthoredValuesSerializer):
+    """Fast path of `CommentSerializer` for listings, working on `.values()` rows (see core.abstract.serializers.AuthoredValuesSerializer)."""
+    fields = (
+        ('id', 'public_id', format_hex),
+        ('post', 'post__public_id', None),
+        ('author', 'author_id', 'get_author'),
+        ('body', 'body', None),
+        ('edited', 'edited', None),
+        ('liked', 'id', 'get_liked'),
+        ('likes_count', 'likes_count', 'get_likes_count'),
+        ('created', 'created', format_datetime),
+        ('updated', 'updated', format_datetime),
+    )
+    nested = {'author__': UserValuesSerializer}
+    volatile = ('liked', 'likes_count')
+    model = Comment
+    like_kind = 'comment'
+    # Likes that are still buffered (see core.users.like_buffer) aren't in the stored counters yet.
+    buffered_like_deltas = staticmethod(buffered_like_deltas)
@@ -0,0 +1,24 @@
+from django.test import TestCase
+from core.users.models import User
+from core.posts.models import Post
+from core.comments.models import Comment
+from core.comments.serializers import CommentSerializer
+
+
+class CommentSerializerTests(TestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.user2 = User.objects.create_user(email="otheruser@gmail.com", username="other_user", password="other_password", first_name="Other", last_name="User")
+        self.post = Post.objects.create(author=self.user1, body="Test Post Body")
+
+    def test_authors_are_loaded_once_per_page(self):
+        for index in range(10):
+            Comment.objects.create(author=self.user2 if index % 2 else self.user1, post=self.post, body=f"Comment Body {index}")
+        # the authors are deliberately left out of the join so that the serializer has to load them itself.
+        comments = Comment.objects.for_listing().select_related(None).select_related("post").filter(post=self.post).order_by("pk")
+        # one query loads the comments and one loads both distinct authors, whatever the number of comments.
+        with self.assertNumQueries(2):
+            data = CommentSerializer(comments, many=True, context={"request": None}).data
+        self.assertEqual(len(data), 10)
+        self.assertEqual({comment["author"]["username"] for comment in data}, {"test_user", "other_user"})
+        self.assertEqual(data[0]["author"]["posts_count"], 1)
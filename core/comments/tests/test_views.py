@@ -3,6 +3,7 @@ from rest_framework import status
 from core.users.models import User
 from core.posts.models import Post
 from core.comments.models import Comment
+from core.abstract.pagination import KeysetPagination
 
 
 class CommentsViewsTest(APITestCase):
@@ -17,13 +18,13 @@ class CommentsViewsTest(APITestCase):
         url = f'/api/core/posts/{self.post.public_id}/comment/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        # retrieve oldest comment in response data.
-        response_data = response.data[-1]
+        # retrieve oldest comment in the first page of the thread.
+        response_data = response.data['results'][-1]
         self.assertTrue('author' in response_data)
         self.assertTrue('post' in response_data)
         self.assertTrue('body' in response_data)
         # assert two comments exist on this post.
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_list_comments_for_authenticated_user(self):
         url = '/api/core/auth/token/'
@@ -37,13 +38,13 @@ class CommentsViewsTest(APITestCase):
         url = f'/api/core/posts/{self.post.public_id}/comment/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        # retrieve oldest comment in response data.
-        response_data = response.data[-1]
+        # retrieve oldest comment in the first page of the thread.
+        response_data = response.data['results'][-1]
         self.assertTrue('author' in response_data)
         self.assertTrue('post' in response_data)
         self.assertTrue('body' in response_data)
         # assert two comments exist on this post.
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_anonymous_user_cannot_create_comments(self):
         url = f'/api/core/posts/{self.post.public_id}/comment/'
@@ -205,3 +206,71 @@ class CommentsViewsTest(APITestCase):
         self.assertFalse(response.data['liked'])
         self.assertEqual(response.data['likes_count'], 0)
 
+    def test_reaction_likes_and_unlikes_a_comment_idempotently(self):
+        self.client.force_authenticate(user=self.user2)
+        url = f'/api/core/posts/{self.post.public_id}/comment/{self.user1_comment.public_id}/reaction/'
+        # the listing is cached before the like.
+        self.client.get(f'/api/core/posts/{self.post.public_id}/comment/')
+        for _ in range(2):
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, {'liked': True, 'likes_count': 1})
+        # the cached listing of the post's comments reads the like counts again.
+        response = self.client.get(f'/api/core/posts/{self.post.public_id}/comment/')
+        likes = {comment['id']: comment['likes_count'] for comment in response.data['results']}
+        self.assertEqual(likes[self.user1_comment.public_id.hex], 1)
+        for _ in range(2):
+            response = self.client.delete(url)
+            self.assertEqual(response.data, {'liked': False, 'likes_count': 0})
+        self.assertFalse(self.user2.comments_liked.contains(self.user1_comment))
+
+    def test_list_comments_query_count_does_not_grow_with_comment_count(self):
+        url = f'/api/core/posts/{self.post.public_id}/comment/'
+        # one query resolves the post and one loads the comments with their counts and authors.
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 2)
+        for index in range(10):
+            comment = Comment.objects.create(author=self.user2, post=self.post, body=f"Counted Comment Body {index}")
+            self.user1.like_comment(comment)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 12)
+        self.assertEqual(response.data['results'][0]['likes_count'], 1)
+
+    def test_list_comments_is_paginated_by_default(self):
+        for index in range(20):
+            Comment.objects.create(author=self.user2, post=self.post, body=f"Paginated Comment Body {index}")
+        response = self.client.get(f'/api/core/posts/{self.post.public_id}/comment/')
+        # a long thread is never returned in one go, but one page of the default size at a time.
+        self.assertEqual(len(response.data['results']), KeysetPagination.page_size)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_list_comments_with_cursor_pagination(self):
+        for index in range(3):
+            Comment.objects.create(author=self.user2, post=self.post, body=f"Paginated Comment Body {index}")
+        # comments of another post are left out.
+        Comment.objects.create(author=self.user2, post=Post.objects.create(author=self.user2, body="Other Post Body"), body="Other Comment Body")
+        expected_ids = [comment.public_id.hex for comment in Comment.objects.filter(post=self.post).order_by("-updated", "-id")]
+        url = f'/api/core/posts/{self.post.public_id}/comment/?page_size=2'
+        received_ids = []
+        # follow the "next" links until the last page is reached.
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(len(response.data["results"]) <= 2)
+            received_ids += [comment["id"] for comment in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(received_ids, expected_ids)
+
+    def test_list_comments_preview(self):
+        for index in range(5):
+            Comment.objects.create(author=self.user2, post=self.post, body=f"Previewed Comment Body {index}")
+        expected_ids = [comment.public_id.hex for comment in Comment.objects.filter(post=self.post).order_by("-updated", "-id")[:3]]
+        url = f'/api/core/posts/{self.post.public_id}/comment/?preview=3'
+        # one query resolves the post and one loads the previewed comments.
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual([comment["id"] for comment in response.data], expected_ids)
+        response = self.client.get(f'/api/core/posts/{self.post.public_id}/comment/?preview=many')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,42 +1,110 @@
+from asgiref.sync import sync_to_async
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
+from django.conf import settings
 from django.core.exceptions import ValidationError as DjangoValidationError
-from core.comments.models import Comment
+from core.abstract.asynchronous import async_api_view
+from core.abstract.conditional import aconditional_listing_response, conditional_listing_response, conditional_object_response
+from core.abstract.pagination import KeysetPagination, order_by_keyset
+from core.abstract.streaming import astreaming_export_response, check_export_throttle, requested_export_format, streaming_export_response
+from core.comments.models import Comment, comments_cache_namespace
 from core.posts.models import Post
 from core.users.models import User
-from core.comments.serializers import CommentSerializer
+from core.comments.serializers import CommentSerializer, CommentValuesSerializer
 from core.auth.permissions import UserPermission
-#from django.core.cache import cache
+
+def listing_rows(queryset):
+    """Return `queryset` as the `.values()` rows that listings are serialized from (see CommentValuesSerializer)."""
+    return CommentValuesSerializer.values(queryset)
+
+def requested_preview_size(request):
+    """Return the number of comments asked for with "?preview=N" (capped to COMMENT_PREVIEW_MAX_SIZE), or None without it."""
+    raw_size = request.query_params.get('preview', None)
+    if raw_size is None:
+        return None
+    try:
+        size = int(raw_size)
+    except ValueError:
+        raise ValidationError(f'{raw_size} is not a valid preview size')
+    if size < 0:
+        raise ValidationError(f'{raw_size} is not a valid preview size')
+    return min(size, settings.COMMENT_PREVIEW_MAX_SIZE)
+
+def load_comments(request, queryset):
+    """
+    Load the comments of a listing without serializing them: the N newest ones for "?preview=N", else one cursor-paginated
+    page (newest first, of "?page_size=" comments or the default page size), so a long thread is never returned in one go.
+    The preview and the pages are read through the `(post, updated, id)` index, so they cost the same whatever the size of the thread.
+    Return the `(comments, paginator)` pair, the paginator being None for a preview.
+    """
+    preview_size = requested_preview_size(request)
+    if preview_size is not None:
+        return list(order_by_keyset(queryset, ("updated", "id"))[:preview_size]), None
+    paginator = KeysetPagination()
+    return paginator.paginate_queryset(queryset, request), paginator
+
+def serialize_comments(request, loaded, liked_ids=None):
+    """Serialize comments loaded by `load_comments`, wrapping a page with its next/previous links."""
+    comments, paginator = loaded
+    data = CommentValuesSerializer({'request':request, 'liked_ids':liked_ids}).serialize(comments)
+    return data if paginator is None else paginator.get_paginated_data(data)
+
+def export_comments(request, queryset, export_format, asynchronous=False):
+    """
+    Stream every comment of `queryset` as JSON or NDJSON, serializing them one batch at a time.
+    The async views stream it from an async generator reading the rows through the async ORM.
+    """
+    def serialize_batch(comments):
+        # A serializer per batch, so that the authors of one batch aren't kept around for the next one.
+        return CommentValuesSerializer({'request':request}).serialize(comments)
+    streaming_response = astreaming_export_response if asynchronous else streaming_export_response
+    return streaming_response(listing_rows(queryset), serialize_batch, export_format)
 
 # Create your views here.
 @api_view(["GET", "POST"])
 @permission_classes([UserPermission])
 def get_or_create_comments(request, post_pk):
     if request.method == "GET":
+        # "?export=json" or "?export=ndjson" streams the whole listing instead of building it in memory.
+        export_format = requested_export_format(request)
         if request.user.is_superuser:
-            comments = Comment.objects.all().order_by('-updated')
-            serializer = CommentSerializer(comments, many=True, context={'request':request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            comments = Comment.objects.for_listing().order_by('-updated')
+            if export_format:
+                check_export_throttle(request)
+                return export_comments(request, comments, export_format)
+            return conditional_listing_response(
+                request,
+                lambda: load_comments(request, listing_rows(comments)),
+                lambda loaded: serialize_comments(request, loaded),
+                row_serializer=CommentValuesSerializer(),
+            )
 
         else:
             try:
                 post = Post.objects.get_object_by_public_id(post_pk)
+            except DjangoValidationError:
+                raise ValidationError(f'{post_pk} is not a valid UUID' )
             except Post.DoesNotExist:
                 raise ValidationError(f'There is no post with public id "{post_pk}"')
             else:
-                """check if cache contains comments.
-                comment_objects = cache.get("comment_objects")
-                if comment_objects is None:
-                    # get all comments of a particular post.
-                    comment_objects = Comment.objects.filter(post__public_id=post.public_id).order_by('-updated')
-                    # save comments to cache.
-                    cache.set("comment_objects", comment_objects)"""
-                comment_objects = Comment.objects.filter(post__public_id=post.public_id).order_by('-updated')
-                serializer = CommentSerializer(comment_objects, many=True, context={'request':request})
-                return Response(serializer.data, status=status.HTTP_200_OK)
+                # get the comments of a particular post, from the cache if possible.
+                # They are filtered on the key of the post we already resolved, which the comment index starts with.
+                # The listing is served from the cache until a comment of this post or one of the embedded authors changes.
+                comment_objects = Comment.objects.for_listing().filter(post_id=post.pk).order_by('-updated')
+                if export_format:
+                    check_export_throttle(request)
+                    return export_comments(request, comment_objects, export_format)
+                return conditional_listing_response(
+                    request,
+                    lambda: load_comments(request, listing_rows(comment_objects)),
+                    lambda loaded: serialize_comments(request, loaded),
+                    namespaces=[comments_cache_namespace(post.pk), "user"],
+                    label="comments",
+                    row_serializer=CommentValuesSerializer(),
+                )
 
     elif request.method == "POST":
         serializer = CommentSerializer(data=request.data, context={'request':request})
@@ -59,8 +127,8 @@ def comment_id(request, post_pk, comment_pk):
         raise ValidationError(f'There is no post with public id "{post_pk}"')
 
     if request.method == "GET":
-        serializer = CommentSerializer(comment, context={'request':request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # answer with a 304 when the client's copy is current, without serializing the comment.
+        return conditional_object_response(request, comment, lambda: CommentSerializer(comment, context={'request':request}).data)
 
     if request.method == "PUT":
         # check object permissions
@@ -79,6 +147,19 @@ def comment_id(request, post_pk, comment_pk):
         return Response(status=status.HTTP_403_FORBIDDEN)
 
 
+@api_view(["POST", "DELETE"])
+@permission_classes([IsAuthenticated])
+def comment_reaction(request, post_pk, comment_pk):
+    # POST likes the comment and DELETE removes the like. Both are idempotent and only return the new state of the like,
+    # with one write on the like table and one statement for the counter (see User._react).
+    try:
+        liked, likes_count = request.user.react_to_comment(comment_pk, liked=request.method == "POST")
+    except DjangoValidationError:
+        raise ValidationError(f'{comment_pk} is not a valid UUID' )
+    except Comment.DoesNotExist:
+        raise ValidationError(f'There is no comment with public id "{comment_pk}"')
+    return Response({"liked": liked, "likes_count": likes_count}, status=status.HTTP_200_OK)
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def like_comment(request, post_pk,comment_pk):
@@ -117,3 +198,61 @@ def unlike_comment(request, post_pk, comment_pk):
 
 
 
+
+
+# Native async counterparts of the read endpoints above, used when the project is served under ASGI (see core.abstract.asynchronous).
+async def aliked_comment_ids(request, comment_ids):
+    """Return the `comment_ids` liked by the requesting user (None for an anonymous one), with a single query."""
+    if request.user.is_anonymous:
+        return None
+    return await request.user.aliked_comment_ids(comment_ids)
+
+async def aload_comments(request, queryset):
+    """Async counterpart of `load_comments`."""
+    preview_size = requested_preview_size(request)
+    if preview_size is not None:
+        return [comment async for comment in order_by_keyset(queryset, ("updated", "id"))[:preview_size]], None
+    paginator = KeysetPagination()
+
+    async def fetch(position, reverse, limit):
+        return [comment async for comment in paginator.fetch_rows(queryset, position, reverse, limit)]
+    return await paginator.apaginate_rows(request, fetch), paginator
+
+async def aserialize_comments(request, loaded):
+    liked_ids = await aliked_comment_ids(request, [comment['id'] for comment in loaded[0]])
+    return serialize_comments(request, loaded, liked_ids)
+
+@async_api_view
+async def get_comments_async(request, post_pk):
+    # "?export=json" or "?export=ndjson" streams the whole listing from an async generator.
+    export_format = requested_export_format(request)
+    if request.user.is_superuser:
+        comments = Comment.objects.for_listing().order_by('-updated')
+        if export_format:
+            await sync_to_async(check_export_throttle)(request)
+            return export_comments(request, comments, export_format, asynchronous=True)
+        return await aconditional_listing_response(
+            request,
+            lambda: aload_comments(request, listing_rows(comments)),
+            lambda loaded: aserialize_comments(request, loaded),
+            row_serializer=CommentValuesSerializer(),
+        )
+    try:
+        post = await Post.objects.aget(public_id=post_pk)
+    except DjangoValidationError:
+        raise ValidationError(f'{post_pk} is not a valid UUID' )
+    except Post.DoesNotExist:
+        raise ValidationError(f'There is no post with public id "{post_pk}"')
+    # get the comments of a particular post, from the cache if possible.
+    comment_objects = Comment.objects.for_listing().filter(post_id=post.pk).order_by('-updated')
+    if export_format:
+        await sync_to_async(check_export_throttle)(request)
+        return export_comments(request, comment_objects, export_format, asynchronous=True)
+    return await aconditional_listing_response(
+        request,
+        lambda: aload_comments(request, listing_rows(comment_objects)),
+        lambda loaded: aserialize_comments(request, loaded),
+        namespaces=[comments_cache_namespace(post.pk), "user"],
+        label="comments",
+        row_serializer=CommentValuesSerializer(),
+    )
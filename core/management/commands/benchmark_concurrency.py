@@ -0,0 +1,51 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent GET requests to a running server and report its throughput and latency. "
+        "Run it against the server started with SERVER_MODE=wsgi and then SERVER_MODE=asgi, with the same number of workers, "
+        "to compare how many concurrent requests each mode sustains."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", help="URLs to request, e.g. http://localhost:8000/api/core/posts/?page_size=15")
+        parser.add_argument("--requests", type=int, default=500, help="Number of requests sent to each URL.")
+        parser.add_argument("--concurrency", type=int, default=50, help="Number of requests in flight at any time.")
+        parser.add_argument("--token", default=None, help="Access token sent as a Bearer Authorization header.")
+        parser.add_argument("--timeout", type=float, default=30, help="Timeout of each request, in seconds.")
+
+    def handle(self, *args, **options):
+        headers = {"Authorization": f"Bearer {options['token']}"} if options["token"] else {}
+        for url in options["urls"]:
+            self.benchmark(url, headers, options["requests"], options["concurrency"], options["timeout"])
+
+    def benchmark(self, url, headers, count, concurrency, timeout):
+        def send(_):
+            start = time.perf_counter()
+            try:
+                with urlopen(Request(url, headers=headers), timeout=timeout) as response:
+                    response.read()
+                    failed = response.status >= 400
+            except HTTPError as error:
+                failed = error.code >= 400
+            except (URLError, OSError):
+                failed = True
+            return (time.perf_counter() - start) * 1000, failed
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(send, range(count)))
+        elapsed = time.perf_counter() - start
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(failed for _, failed in results)
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(
+            f"{url}: {count} request(s), {concurrency} concurrent, {count / elapsed:.1f} req/s, "
+            f"p50 {percentiles[49]:.1f} ms, p95 {percentiles[94]:.1f} ms, p99 {percentiles[98]:.1f} ms, {errors} error(s)"
+        )
@@ -0,0 +1,60 @@
+import os
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.auth.hashing import PasswordHashingBusy, check_password_hash, run_password_hashing
+from core.auth.serializers.login import LoginSerializer
+from core.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Time logins through the login serializer, then the throughput of concurrent password checks through the "
+        "hashing pool, reported in logins per second per core. The seeded user is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=20, help="Number of logins timed.")
+        parser.add_argument("--concurrency", type=int, default=8, help="Number of logins in flight at once.")
+
+    def handle(self, *args, **options):
+        password = uuid.uuid4().hex
+        with transaction.atomic():
+            user = User.objects.create_user(email=f"{uuid.uuid4().hex}@bench.local", username=f"bench_{uuid.uuid4().hex}", password=password, first_name="Bench", last_name="User")
+            timings = []
+            for _ in range(max(options["logins"], 1)):
+                start = time.perf_counter()
+                serializer = LoginSerializer(data={"email": user.email, "password": password})
+                serializer.is_valid(raise_exception=True)
+                timings.append((time.perf_counter() - start) * 1000)
+            self.report("login", timings)
+            # Nothing seeded by the benchmark is kept.
+            transaction.set_rollback(True)
+        # The password checks of concurrent logins, without their queries (which would need one connection per thread).
+        # sched_getaffinity (the cores this process may run on) only exists on some platforms, e.g. not on macOS or Windows.
+        available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+        cores = min(settings.PASSWORD_HASHING_CONCURRENCY, settings.PASSWORD_HASHING_WORKERS, available or 1)
+        # Checks beyond the free hashing slots are rejected right away, as the login endpoint would answer them with a 429.
+        def check(_):
+            try:
+                run_password_hashing(check_password_hash, password, user.password)
+                return True
+            except PasswordHashingBusy:
+                return False
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(options["concurrency"], 1)) as executor:
+            checked = sum(executor.map(check, range(max(options["logins"], 1))))
+        rate = checked / (time.perf_counter() - start)
+        rejected = max(options["logins"], 1) - checked
+        self.stdout.write(
+            f"-- concurrent password checks: {rate:.1f} logins/s over {cores} core(s), {rate / cores:.1f} logins/s per core, "
+            f"{rejected} rejected while every hashing slot was taken"
+        )
+
+    def report(self, label, timings):
+        self.stdout.write(f"-- {label}: {len(timings)} run(s), min {min(timings):.2f} ms, median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms")
@@ -0,0 +1,81 @@
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from core.abstract.pagination import order_by_keyset
+from core.comments.models import Comment
+from core.posts.models import Post
+from core.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed posts and comments, then print the EXPLAIN plan and timings of the queries behind the post and comment listings. "
+        "The seeded rows are rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100, help="Number of users to seed.")
+        parser.add_argument("--posts", type=int, default=10000, help="Number of posts to seed.")
+        parser.add_argument("--comments", type=int, default=20000, help="Number of comments to seed.")
+        parser.add_argument("--repeat", type=int, default=20, help="Number of timed runs of each query.")
+        parser.add_argument("--page-size", type=int, default=15, help="Number of rows per listing page.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users, posts = self.seed(options["users"], options["posts"], options["comments"])
+            page = options["page_size"] + 1
+            author, post = users[0], posts[len(posts) // 2]
+            deep = Post.objects.order_by("-updated", "-id")[len(posts) // 2]
+            queries = [
+                ("posts: first page", order_by_keyset(Post.objects.for_listing(), ("updated", "id"))[:page]),
+                ("posts: deep page", order_by_keyset(Post.objects.for_listing(), ("updated", "id"), (deep.updated, deep.pk))[:page]),
+                (
+                    "posts by author: first page",
+                    order_by_keyset(Post.objects.for_listing().filter(author__public_id=author.public_id), ("updated", "id"))[:page],
+                ),
+                (
+                    "comments of post",
+                    Comment.objects.for_listing().filter(post__public_id=post.public_id).order_by("-updated", "-id"),
+                ),
+            ]
+            for label, queryset in queries:
+                self.report(label, queryset, options["repeat"])
+            # Nothing seeded by the benchmark is kept.
+            transaction.set_rollback(True)
+
+    def seed(self, user_count, post_count, comment_count):
+        users = User.objects.bulk_create(
+            User(username=f"bench_{uuid.uuid4().hex}", email=f"{uuid.uuid4().hex}@bench.local", first_name="Bench", last_name="User")
+            for _ in range(user_count)
+        )
+        posts = Post.objects.bulk_create(
+            (Post(author=users[index % user_count], body=f"Benchmark post {index}") for index in range(post_count)),
+            batch_size=1000,
+        )
+        Comment.objects.bulk_create(
+            (
+                Comment(author=users[index % user_count], post=posts[index % post_count], body=f"Benchmark comment {index}")
+                for index in range(comment_count)
+            ),
+            batch_size=1000,
+        )
+        if connection.vendor == "postgresql":
+            # Fresh statistics, so that the planner sees the seeded tables as they are.
+            with connection.cursor() as cursor:
+                for model in (User, Post, Comment):
+                    cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+        self.stdout.write(f"Seeded {user_count} user(s), {post_count} post(s) and {comment_count} comment(s)")
+        return users, posts
+
+    def report(self, label, queryset, repeat):
+        explain_options = {"analyze": True, "buffers": True} if connection.vendor == "postgresql" else {}
+        self.stdout.write(f"\n== {label}")
+        self.stdout.write(queryset.explain(**explain_options))
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(f"-- {len(timings)} run(s): min {min(timings):.2f} ms, median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms")
@@ -0,0 +1,66 @@
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from core.abstract import renderers
+from core.abstract.renderers import FastJSONRenderer, MessagePackRenderer
+from core.posts.models import Post
+from core.posts.serializers import PostValuesSerializer
+from core.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed posts, then time the rendering of a serialized page of them with DRF's JSONRenderer, the fast JSON renderer "
+        "and (when msgpack is installed) the MessagePack renderer. The seeded rows are rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50, help="Number of users to seed.")
+        parser.add_argument("--posts", type=int, default=500, help="Number of posts in the rendered payload.")
+        parser.add_argument("--repeat", type=int, default=20, help="Number of timed runs of each renderer.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options["users"], options["posts"])
+            request = Request(APIRequestFactory().get("/"))
+            rows = PostValuesSerializer.values(Post.objects.for_listing().order_by("-updated", "-id"))[:options["posts"]]
+            data = PostValuesSerializer({"request": request}).serialize(rows)
+            # Nothing seeded by the benchmark is kept.
+            transaction.set_rollback(True)
+        renderer_classes = [JSONRenderer, FastJSONRenderer]
+        if renderers.msgpack is not None:
+            renderer_classes.append(MessagePackRenderer)
+        else:
+            self.stdout.write("msgpack isn't installed, MessagePackRenderer is skipped")
+        encoder = "orjson" if renderers.orjson is not None else "stdlib json"
+        self.stdout.write(f"\n== rendering {len(data)} post(s), fast JSON encoder: {encoder}")
+        baseline = None
+        for renderer_class in renderer_classes:
+            renderer = renderer_class()
+            timings = []
+            for _ in range(max(options["repeat"], 1)):
+                start = time.perf_counter()
+                body = renderer.render(data, renderer.media_type, {})
+                timings.append((time.perf_counter() - start) * 1000)
+            median = statistics.median(timings)
+            baseline = baseline or median
+            self.stdout.write(
+                f"-- {renderer_class.__name__}: {len(body)} bytes, {len(timings)} run(s): min {min(timings):.2f} ms, "
+                f"median {median:.2f} ms, max {max(timings):.2f} ms, speedup {baseline / median:.1f}x"
+            )
+
+    def seed(self, user_count, post_count):
+        users = User.objects.bulk_create(
+            User(username=f"bench_{uuid.uuid4().hex}", email=f"{uuid.uuid4().hex}@bench.local", first_name="Bench", last_name="User")
+            for _ in range(user_count)
+        )
+        Post.objects.bulk_create(
+            (Post(author=users[index % user_count], body=f"Benchmark post {index} " * 10) for index in range(post_count)),
+            batch_size=1000,
+        )
+        self.stdout.write(f"Seeded {user_count} user(s) and {post_count} post(s)")
@@ -0,0 +1,89 @@
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.comments.models import Comment
+from core.comments.serializers import CommentSerializer, CommentValuesSerializer
+from core.posts.models import Post
+from core.posts.serializers import PostSerializer, PostValuesSerializer
+from core.users.models import User
+from core.users.serializers import UserSerializer, UserValuesSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed posts and comments, then time the serialization of a listing page with the model serializers "
+        "and with their .values() fast paths. The seeded rows are rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50, help="Number of users to seed.")
+        parser.add_argument("--rows", type=int, default=500, help="Number of posts (and comments) per serialized page.")
+        parser.add_argument("--repeat", type=int, default=10, help="Number of timed runs of each serializer.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = self.seed(options["users"], options["rows"])
+            # The serializers look up the likes of the requesting user, as they do behind the API.
+            request = APIRequestFactory().get("/")
+            force_authenticate(request, user=users[0])
+            request = Request(request)
+            benchmarks = [
+                ("posts", Post.objects.for_listing().order_by("-updated", "-id"), PostSerializer, PostValuesSerializer),
+                ("comments", Comment.objects.for_listing().order_by("-updated", "-id"), CommentSerializer, CommentValuesSerializer),
+                ("users", User.objects.order_by("-updated", "-id"), UserSerializer, UserValuesSerializer),
+            ]
+            for label, queryset, serializer_class, values_serializer_class in benchmarks:
+                queryset = queryset[:options["rows"]]
+                model_timings = self.time(
+                    lambda: serializer_class(list(queryset.all()), many=True, context={"request": request}).data, options["repeat"]
+                )
+                values_timings = self.time(
+                    lambda: values_serializer_class({"request": request}).serialize(values_serializer_class.values(queryset.all())),
+                    options["repeat"],
+                )
+                self.stdout.write(f"\n== {label}: {len(queryset)} row(s), query included")
+                self.report("model serializer", model_timings)
+                self.report("values serializer", values_timings)
+                self.stdout.write(f"-- speedup: {statistics.median(model_timings) / statistics.median(values_timings):.1f}x")
+            # Nothing seeded by the benchmark is kept.
+            transaction.set_rollback(True)
+
+    def seed(self, user_count, row_count):
+        users = User.objects.bulk_create(
+            User(username=f"bench_{uuid.uuid4().hex}", email=f"{uuid.uuid4().hex}@bench.local", first_name="Bench", last_name="User")
+            for _ in range(user_count)
+        )
+        posts = Post.objects.bulk_create(
+            (Post(author=users[index % user_count], body=f"Benchmark post {index}") for index in range(row_count)),
+            batch_size=1000,
+        )
+        Comment.objects.bulk_create(
+            (
+                Comment(author=users[index % user_count], post=posts[index % row_count], body=f"Benchmark comment {index}")
+                for index in range(row_count)
+            ),
+            batch_size=1000,
+        )
+        # Every other post is liked by the requesting user.
+        users[0].posts_liked.through.objects.bulk_create(
+            users[0].posts_liked.through(user_id=users[0].pk, post_id=post.pk) for post in posts[::2]
+        )
+        self.stdout.write(f"Seeded {user_count} user(s), {row_count} post(s) and {row_count} comment(s)")
+        return users
+
+    def time(self, serialize, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            serialize()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def report(self, label, timings):
+        self.stdout.write(
+            f"-- {label}: {len(timings)} run(s): min {min(timings):.2f} ms, median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms"
+        )
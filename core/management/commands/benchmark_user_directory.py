@@ -0,0 +1,71 @@
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.abstract.pagination import KeysetPagination
+from core.users.models import User
+from core.users.views import get_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users, then time the user directory endpoint on pages spread from the first to the last one, "
+        "whose latency should stay flat. The seeded rows are rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100000, help="Number of users to seed.")
+        parser.add_argument("--pages", type=int, default=5, help="Number of pages timed, spread evenly over the directory.")
+        parser.add_argument("--repeat", type=int, default=20, help="Number of timed runs of each page.")
+        parser.add_argument("--page-size", type=int, default=15, help="Number of users per page.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options["users"])
+            viewer = User.objects.order_by("pk").first()
+            ordered = User.objects.order_by("-updated", "-id").values_list("updated", "id")
+            total = len(ordered)
+            factory = APIRequestFactory()
+            paginator = KeysetPagination()
+            paginator.base_url = f"http://testserver/api/core/users/?page_size={options['page_size']}"
+            medians = []
+            for page in range(max(options["pages"], 1)):
+                # The first timed page has no cursor; the others start right after the user at their offset.
+                offset = (total - 1) * page // max(options["pages"] - 1, 1)
+                url = paginator.base_url if offset == 0 else paginator.encode_cursor(ordered[offset - 1], reverse=False)
+                timings = self.time(factory, url, viewer, options["repeat"])
+                medians.append(statistics.median(timings))
+                self.report(f"page at user {offset}", timings)
+            self.stdout.write(f"-- deepest/first page median ratio: {medians[-1] / medians[0]:.2f}")
+            # Nothing seeded by the benchmark is kept.
+            transaction.set_rollback(True)
+
+    def seed(self, user_count):
+        User.objects.bulk_create(
+            (
+                User(username=f"bench_{uuid.uuid4().hex}", email=f"{uuid.uuid4().hex}@bench.local", first_name="Bench", last_name="User")
+                for _ in range(user_count)
+            ),
+            batch_size=5000,
+        )
+        if connection.vendor == "postgresql":
+            # Fresh statistics, so that the planner sees the seeded table as it is.
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(User._meta.db_table)}")
+        self.stdout.write(f"Seeded {user_count} user(s)")
+
+    def time(self, factory, url, viewer, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            request = factory.get(url)
+            force_authenticate(request, user=viewer)
+            start = time.perf_counter()
+            response = get_users(request)
+            response.render()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def report(self, label, timings):
+        self.stdout.write(f"-- {label}: {len(timings)} run(s), min {min(timings):.2f} ms, median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms")
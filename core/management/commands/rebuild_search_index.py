@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from core.abstract.search import get_search_engine
+from core.comments.models import Comment
+from core.posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of posts and comments from their rows."
+
+    def handle(self, *args, **options):
+        engine = get_search_engine()
+        for model in (Post, Comment):
+            indexed = engine.rebuild(model)
+            self.stdout.write(f"{model._meta.label}: indexed {indexed} row(s)")
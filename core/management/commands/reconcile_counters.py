@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from core.abstract.models import count_subquery, reconcile_counter
+from core.abstract.object_cache import invalidate_objects
+from core.comments.models import Comment
+from core.posts.models import Post
+from core.users.models import User
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized like, comment and post counters and repair any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Number of rows updated per transaction.")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        # Each counter is recomputed from the rows it counts with a correlated subquery.
+        counters = [
+            (Post, "likes_count", count_subquery(User.posts_liked.through.objects.all(), "post")),
+            (Post, "comments_count", count_subquery(Comment.objects.all(), "post")),
+            (Comment, "likes_count", count_subquery(User.comments_liked.through.objects.all(), "comment")),
+            (User, "posts_count", count_subquery(Post.objects.all(), "author")),
+        ]
+        for model, field, expression in counters:
+            repaired = reconcile_counter(
+                model, field, expression, chunk_size,
+                # The repaired rows aren't known by key, so the cached objects of the whole chunk are dropped.
+                on_repaired=lambda start, stop, model=model: invalidate_objects(model, range(start, stop)),
+            )
+            self.stdout.write(f"{model._meta.label}.{field}: repaired {repaired} row(s)")
@@ -1,7 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
 
 
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core.posts'
     label = 'core_posts'
+
+    def ready(self):
+        from core.abstract.models import invalidate_deleted_object
+        from core.abstract.signals import post_activity
+        from core.posts.models import Post, count_deleted_post
+        from core.posts.trending import record_post_activity
+
+        # The denormalized counters follow every deletion, including queryset and cascade deletes (see core.posts.models).
+        post_delete.connect(count_deleted_post, sender=Post, dispatch_uid="count_deleted_post")
+        # So do the caches (see core.abstract.models).
+        post_delete.connect(invalidate_deleted_object, sender=Post, dispatch_uid="invalidate_deleted_post")
+        # New posts, likes and comments feed the trending ranking, whichever app they come from (see core.posts.trending).
+        post_activity.connect(record_post_activity, dispatch_uid="record_post_activity")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.posts.models import Post
+from core.posts.timeline import get_post_timeline
+
+
+class Command(BaseCommand):
+    help = "Backfill the materialized post timeline from the posts table."
+
+    def handle(self, *args, **options):
+        timeline = get_post_timeline()
+        # A process-local timeline would be filled here and never seen by the web processes.
+        if not timeline.store.shared:
+            raise CommandError("The timeline is stored in-process (see SORTED_SET_BACKEND), set REDIS_URL to share it.")
+        timeline.rebuild(Post.objects.all())
+        self.stdout.write(f"Timeline rebuilt with {len(timeline.store)} post(s)")
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from core.posts.models import Post
+from core.posts.trending import get_trending_posts
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold the likes, comments and posts recorded since the last refresh into the trending ranking. "
+        "Runs once, or forever every --interval seconds as a background job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0, help="Seconds between two refreshes (0 refreshes once).")
+
+    def handle(self, *args, **options):
+        trending = get_trending_posts()
+        # A process-local ranking would be refreshed here from activity that only the web processes ever record.
+        if not trending.store.shared:
+            raise CommandError("The trending ranking is stored in-process (see SORTED_SET_BACKEND), set REDIS_URL to share it.")
+        while True:
+            ranked = trending.refresh(Post.objects.all())
+            self.stdout.write(f"Trending ranking refreshed with {ranked} post(s)")
+            if options["interval"] <= 0:
+                return
+            time.sleep(options["interval"])
+            close_old_connections()
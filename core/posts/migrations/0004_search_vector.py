@@ -0,0 +1,45 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:54
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='post_search_vector_gin')
+
+
+def add_search_index(apps, schema_editor):
+    # The tsvector column is only filled in and indexed on PostgreSQL; other databases use the in-process search engine.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Post = apps.get_model('core_posts', 'Post')
+    Post.objects.update(
+        search_vector=django.contrib.postgres.search.SearchVector('body', config=settings.SEARCH_CONFIG)
+    )
+    schema_editor.add_index(Post, INDEX)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('core_posts', 'Post'), INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_posts', '0003_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='post', index=INDEX)],
+            database_operations=[migrations.RunPython(add_search_index, remove_search_index)],
+        ),
+    ]
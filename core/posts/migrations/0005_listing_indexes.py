@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:57
+
+from django.conf import settings
+from django.db import migrations, models
+from core.abstract.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('core_posts', '0004_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['-updated', '-id'], name='post_updated_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['author', '-updated', '-id'], name='post_author_updated_idx'),
+        ),
+    ]
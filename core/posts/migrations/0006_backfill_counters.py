@@ -0,0 +1,26 @@
+from django.db import migrations
+from core.abstract.models import count_subquery, reconcile_counter
+
+
+def backfill_counters(apps, schema_editor):
+    # The counters were added with a default of 0: compute them from the likes and comments that already exist.
+    Post = apps.get_model("core_posts", "Post")
+    Comment = apps.get_model("core_comments", "Comment")
+    likes = apps.get_model("core_users", "User")._meta.get_field("posts_liked").remote_field.through
+    reconcile_counter(Post, "likes_count", count_subquery(likes.objects.all(), "post"))
+    reconcile_counter(Post, "comments_count", count_subquery(Comment.objects.all(), "post"))
+
+
+class Migration(migrations.Migration):
+    # Each chunk of the backfill runs in its own transaction, so that it never locks the whole table.
+    atomic = False
+
+    dependencies = [
+        ('core_posts', '0005_listing_indexes'),
+        ('core_comments', '0003_counters'),
+        ('core_users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -1,19 +1,113 @@
-from django.db import models
+from collections import Counter
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import F
+from core.abstract.cache import invalidate_namespaces
 from core.abstract.models import AbstractModel, AbstractManager
+from core.abstract.search import update_search_index
+from core.abstract.signals import post_activity
+from core.posts.timeline import schedule_timeline_update
+from core.posts.trending import schedule_trending_update
 
 # Create your models here.
 class PostManager(AbstractManager):
-    pass
+    def for_listing(self):
+        """
+        Return the list read path for posts. The like, comment and author-post counts are stored on the rows themselves,
+        so joining the author is all it takes to serialize a page of posts with a single query.
+        The search vector is never part of a representation, so it isn't loaded.
+        """
+        return self.select_related("author").defer("search_vector")
+
+    def bulk_create_posts(self, posts):
+        """
+        Insert `posts` with a single `bulk_create` and apply the side effects `Post.save` would have had on each of them
+        (author post counters, timeline, cache invalidation) once for the whole batch.
+        """
+        with transaction.atomic():
+            posts = self.bulk_create(posts)
+            new_posts_per_author = Counter(post.author_id for post in posts)
+            for author_id, count in new_posts_per_author.items():
+                self.model._meta.get_field("author").related_model.objects.filter(pk=author_id).update(posts_count=F("posts_count") + count)
+            invalidate_namespaces("post")
+            schedule_timeline_update(*posts)
+            post_activity.send(sender=self.model, post_ids=[post.pk for post in posts], activity="post")
+            update_search_index(*posts)
+        return posts
 
 class Post(AbstractModel):
     author = models.ForeignKey(to="core_users.User", on_delete=models.CASCADE)
     body = models.TextField()
     edited = models.BooleanField(default=False)
+    # Denormalized counters kept up to date by the like/comment code paths (see `reconcile_counters` to repair drift).
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    # Full-text search vector of the body, kept in sync on save (only filled in on PostgreSQL, see core.abstract.search).
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = PostManager()
+    uncached_fields = ("search_vector",)
+    search_fields = ("body",)
+
+    def get_cache_namespaces(self, update_fields=None):
+        return ["post"]
+
+    def get_validator_parts(self):
+        return super().get_validator_parts() + [self.likes_count, self.comments_count] + self.author.get_validator_parts()
+
+    def get_last_modified(self):
+        return max(self.updated, self.author.get_last_modified())
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get("update_fields", None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                adjust_posts_count(self, 1)
+                post_activity.send(sender=type(self), post_ids=[self.pk], activity="post")
+            else:
+                schedule_trending_update(self.pk)
+            schedule_timeline_update(self)
+            if update_fields is None or "body" in update_fields:
+                update_search_index(self)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            schedule_timeline_update(self, deleted=True)
+            schedule_trending_update(self.pk, deleted=True)
+            update_search_index(self, deleted=True)
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"{self.author.name}"
 
     class Meta:
         db_table = "'core.posts'"
+        indexes = [
+            GinIndex(fields=["search_vector"], name="post_search_vector_gin"),
+            # Composite indexes matching the listings' keyset ordering on (updated, id), newest first,
+            # for the global feed and for the posts of one author.
+            models.Index(fields=["-updated", "-id"], name="post_updated_id_idx"),
+            models.Index(fields=["author", "-updated", "-id"], name="post_author_updated_idx"),
+        ]
+
+
+def count_deleted_post(sender, instance, **kwargs):
+    """
+    Take a deleted post back from the post count of its author. As a post_delete receiver, this also runs for posts
+    deleted by a queryset or along with something else, which never go through `Post.delete`.
+    """
+    adjust_posts_count(instance, -1)
+
+
+def adjust_posts_count(post, delta):
+    """Atomically add `delta` to the stored post count of the author of `post`."""
+    author_field = post._meta.get_field("author")
+    # The cached listings read the post count again on every hit (see core.abstract.conditional), only the cached author
+    # goes, which the update of the users takes care of (see core.users.models.UserQuerySet).
+    author_field.related_model.objects.filter(pk=post.author_id).update(posts_count=F("posts_count") + delta)
+    # Keep the author instance attached to the post (if any) in step with the database.
+    if author_field.is_cached(post):
+        post.author.posts_count += delta
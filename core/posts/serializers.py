@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from core.abstract.serializers import AbstractSerializer
+from core.abstract.serializers import AbstractSerializer, AuthoredValuesSerializer, format_datetime, format_hex
 from core.posts.models import Post
 from core.users.models import User
-from core.users.serializers import UserSerializer
+from core.users.like_buffer import buffered_like_deltas
+from core.users.loaders import AuthorLoader, AuthorListSerializer
+from core.users.serializers import UserValuesSerializer
 
 class PostSerializer(AbstractSerializer):
     # SlugRelatedField may be used to represent the target of the relationship using a field on the target.
@@ -11,24 +13,23 @@ class PostSerializer(AbstractSerializer):
     author = serializers.SlugRelatedField(queryset=User.objects.all(), slug_field='public_id')
     # The Serializer class in Django provides ways to create the write_only values that will be sent on the response.
     liked = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-    comments_count = serializers.SerializerMethodField()
+    # The counters are stored on the post and maintained by the like and comment code paths, so reading them costs nothing.
+    likes_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
     # In the preceding code, we are using the serializers.SerializerMethodField() field, which allows us to write a custom function that will return a value we want to attribute to this field.
     # The syntax of the method will be get_field, where field is the name of the field declared on the serializer.
-    # That is why for liked, we have the get_liked method, and for likes_count, we have the get_likes_count method.
+    # That is why for liked, we have the get_liked method.
 
     def get_liked(self, instance):
         request = self.context.get('request', None)
         if request is None or request.user.is_anonymous:
             return False
+        # The views that can't query per row (e.g. the async ones) look the likes of the whole page up beforehand.
+        liked_ids = self.context.get('liked_ids', None)
+        if liked_ids is not None:
+            return instance.pk in liked_ids
         return request.user.has_liked_post(instance)
 
-    def get_likes_count(self, instance):
-        return instance.liked_by.count()
-
-    def get_comments_count(self, instance):
-        return instance.comment_set.all().count()
-
     def update(self, instance, validated_data):
         # We update the validated data first to set edited as "True" before calling the base class which then marks the instance edited attribute as "True".
         if not instance.edited:
@@ -50,8 +51,10 @@ class PostSerializer(AbstractSerializer):
         # This usually means returning a structure of built-in Python data types.
         # We update the representation of the serialized post to represent the author field as a serialized user rather than a public id.
         representation = super().to_representation(instance)
-        author = User.objects.get_object_by_public_id(representation["author"])
-        representation["author"] = UserSerializer(author, context=self.context).data
+        # The author loader reuses the author joined onto the row (or loaded for the whole page) and serializes each distinct author once per request.
+        representation["author"] = AuthorLoader.for_context(self.context).represent(instance)
+        # Likes that are still buffered (see core.users.like_buffer) aren't in the stored counter yet.
+        representation["likes_count"] += buffered_like_deltas("post", [instance.pk]).get(instance.pk, 0)
         return representation
 
     class Meta:
@@ -60,3 +63,35 @@ class PostSerializer(AbstractSerializer):
         # request or a response
         fields = ['id', 'author', 'body', 'edited', 'liked', 'likes_count', 'comments_count', 'created', 'updated']
         read_only_fields = ["edited"]
+        list_serializer_class = AuthorListSerializer
+
+
+class PostValuesSerializer(AuthoredValuesSerializer):
+    """Fast path of `PostSerializer` for listings, working on `.values()` rows (see core.abstract.serializers.AuthoredValuesSerializer)."""
+    fields = (
+        ('id', 'public_id', format_hex),
+        ('author', 'author_id', 'get_author'),
+        ('body', 'body', None),
+        ('edited', 'edited', None),
+        ('liked', 'id', 'get_liked'),
+        ('likes_count', 'likes_count', 'get_likes_count'),
+        ('comments_count', 'comments_count', None),
+        ('created', 'created', format_datetime),
+        ('updated', 'updated', format_datetime),
+    )
+    nested = {'author__': UserValuesSerializer}
+    volatile = ('liked', 'likes_count', 'comments_count')
+    model = Post
+    like_kind = 'post'
+    # Likes that are still buffered (see core.users.like_buffer) aren't in the stored counters yet.
+    buffered_like_deltas = staticmethod(buffered_like_deltas)
+    counter_columns = ('likes_count', 'comments_count')
+
+
+class BulkPostSerializer(serializers.Serializer):
+    """
+    Validates one item of a bulk post creation without touching the database.
+    The authors are resolved for the whole batch at once by the view.
+    """
+    author = serializers.UUIDField()
+    body = serializers.CharField()
@@ -1,6 +1,7 @@
 from django.test import TestCase
 from core.users.models import User
 from core.posts.models import Post
+from core.comments.models import Comment
 
 # Create your tests here.
 class PostModelTests(TestCase):
@@ -12,3 +13,41 @@ class PostModelTests(TestCase):
         expected_username = "test_user"
         self.assertEqual(post.author.username, expected_username)
         self.assertEqual(post.body, "Test Post Body")
+
+    def test_post_counters_follow_likes_and_comments(self):
+        post = Post.objects.create(author=self.user, body="Test Post Body")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.posts_count, 1)
+        # liking twice only counts once.
+        self.user.like_post(post)
+        self.user.like_post(post)
+        self.assertEqual(post.likes_count, 1)
+        self.user.remove_liked_post(post)
+        self.user.remove_liked_post(post)
+        self.assertEqual(post.likes_count, 0)
+        comment = Comment.objects.create(author=self.user, post=post, body="Test Comment Body")
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.posts_count, 0)
+
+    def test_counters_follow_queryset_and_cascade_deletes(self):
+        other = User.objects.create_user(email="otheruser@gmail.com", username="other_user", password="other_password", first_name="Other", last_name="User")
+        post = Post.objects.create(author=self.user, body="Test Post Body")
+        comment = Comment.objects.create(author=self.user, post=post, body="Test Comment Body")
+        Comment.objects.create(author=other, post=post, body="Other Comment Body")
+        Post.objects.create(author=self.user, body="Other Post Body")
+        other.like_post(post)
+        other.like_comment(comment)
+        # deleting a user takes back their comments and likes from the counters of what survives.
+        other.delete()
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual((post.likes_count, post.comments_count, comment.likes_count), (0, 1, 0))
+        Post.objects.filter(pk=post.pk).delete()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.posts_count, 1)
@@ -0,0 +1,88 @@
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from core.abstract.sorted_sets import LocalSortedSet
+from core.users.models import User
+from core.posts.models import Post
+from core.posts.timeline import get_post_timeline
+
+
+class PostTimelineTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        get_post_timeline().store.clear()
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = [Post.objects.create(author=self.user, body=f"Test Post Body {index}") for index in range(5)]
+
+    def tearDown(self):
+        get_post_timeline().store.clear()
+
+    def list_post_ids(self, page_size):
+        url = f"/api/core/posts/?page_size={page_size}"
+        post_ids = []
+        while url:
+            response = self.client.get(url)
+            post_ids += [post["id"] for post in response.data["results"]]
+            url = response.data["next"]
+        return post_ids
+
+    def expected_post_ids(self):
+        return [post.public_id.hex for post in Post.objects.order_by("-updated", "-id")]
+
+    def test_timeline_is_only_used_once_built(self):
+        timeline = get_post_timeline()
+        self.assertFalse(timeline.is_built())
+        self.assertIsNone(timeline.fetch(Post.objects.all(), None, False, 2))
+        timeline.rebuild(Post.objects.all())
+        self.assertTrue(timeline.is_built())
+        self.assertEqual([post.pk for post in timeline.fetch(Post.objects.all(), None, False, 2)], [self.posts[4].pk, self.posts[3].pk])
+
+    def test_missing_timeline_falls_back_to_the_database(self):
+        timeline = get_post_timeline()
+        timeline.rebuild(Post.objects.all())
+        # the sorted set is evicted but the flag stays: new posts don't bring back a timeline holding only them.
+        timeline.store.replace([])
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.user, body="New Post Body")
+        self.assertFalse(timeline.is_built())
+        self.assertIsNone(timeline.fetch(Post.objects.all(), None, False, 2))
+
+    def test_timeline_breaks_ties_by_id(self):
+        Post.objects.update(updated=self.posts[0].updated)
+        get_post_timeline().rebuild(Post.objects.all())
+        self.assertEqual(self.list_post_ids(page_size=2), self.expected_post_ids())
+
+    def test_feed_pages_are_read_from_the_timeline(self):
+        get_post_timeline().rebuild(Post.objects.all())
+        self.assertEqual(self.list_post_ids(page_size=2), self.expected_post_ids())
+
+    def test_timeline_follows_post_writes(self):
+        timeline = get_post_timeline()
+        timeline.rebuild(Post.objects.all())
+        with self.captureOnCommitCallbacks(execute=True):
+            new_post = Post.objects.create(author=self.user, body="New Post Body")
+            self.posts[0].delete()
+        self.assertIsNotNone(timeline.store.score(new_post.pk))
+        self.assertIsNone(timeline.store.score(self.posts[0].pk))
+        self.assertEqual(self.list_post_ids(page_size=2), self.expected_post_ids())
+
+    @override_settings(POST_TIMELINE_SIZE=3)
+    def test_pages_past_the_capped_window_fall_back_to_the_database(self):
+        timeline = get_post_timeline()
+        timeline.rebuild(Post.objects.all())
+        self.assertEqual(len(timeline.store), 3)
+        self.assertEqual(self.list_post_ids(page_size=2), self.expected_post_ids())
+
+    def test_rebuild_timeline_command(self):
+        # the web processes couldn't see a process-local timeline filled by the command.
+        with self.assertRaises(CommandError):
+            call_command("rebuild_timeline", stdout=StringIO())
+        out = StringIO()
+        with mock.patch.object(LocalSortedSet, "shared", True):
+            call_command("rebuild_timeline", stdout=out)
+        self.assertIn("Timeline rebuilt with 5 post(s)", out.getvalue())
+        self.assertTrue(get_post_timeline().is_built())
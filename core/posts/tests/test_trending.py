@@ -0,0 +1,127 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from core.abstract.cache import get_cache_stats, reset_cache_stats
+from core.abstract.sorted_sets import LocalSortedSet
+from core.comments.models import Comment
+from core.users.models import User
+from core.posts.models import Post
+from core.posts.trending import get_trending_posts
+
+
+class TrendingPostsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.clear_trending()
+        self.user1 = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.user2 = User.objects.create_user(email="otheruser@gmail.com", username="other_user", password="other_password", first_name="Other", last_name="User")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = [Post.objects.create(author=self.user1, body=f"Test Post Body {index}") for index in range(3)]
+
+    def tearDown(self):
+        self.clear_trending()
+
+    def clear_trending(self):
+        trending = get_trending_posts()
+        trending.store.clear()
+        trending.activity.clear()
+        trending.retractions.clear()
+
+    def trending_post_ids(self, page_size=10):
+        response = self.client.get(f"/api/core/posts/trending/?page_size={page_size}")
+        return [post["id"] for post in response.data]
+
+    def test_posts_are_ranked_by_their_activity(self):
+        self.assertEqual(self.trending_post_ids(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user2.like_post(self.posts[1])
+            Comment.objects.create(author=self.user2, post=self.posts[2], body="Test Comment Body")
+        get_trending_posts().refresh(Post.objects.all())
+        # a comment weighs more than a like, and every new post has the weight of its creation.
+        self.assertEqual(self.trending_post_ids(), [self.posts[2].public_id.hex, self.posts[1].public_id.hex, self.posts[0].public_id.hex])
+        self.assertEqual(self.trending_post_ids(page_size=1), [self.posts[2].public_id.hex])
+        # the refresh consumed the pending activity.
+        self.assertEqual(len(get_trending_posts().activity), 0)
+
+    def test_older_activity_decays(self):
+        trending = get_trending_posts()
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(author=self.user2, post=self.posts[0], body="Test Comment Body")
+        trending.refresh(Post.objects.all(), now=0)
+        self.assertEqual(self.trending_post_ids(page_size=1), [self.posts[0].public_id.hex])
+        # a day later, two likes outweigh the decayed comment.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user1.like_post(self.posts[1])
+            self.user2.like_post(self.posts[1])
+        trending.refresh(Post.objects.all(), now=24 * 3600)
+        self.assertEqual(self.trending_post_ids(page_size=1), [self.posts[1].public_id.hex])
+
+    def test_unlikes_take_their_weight_back(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user2.like_post(self.posts[0])
+            self.user2.remove_liked_post(self.posts[0])
+        get_trending_posts().refresh(Post.objects.all())
+        self.assertEqual(get_trending_posts().store.score(self.posts[0].pk), 1)
+
+    def test_old_and_deleted_posts_drop_out(self):
+        Post.objects.filter(pk=self.posts[0].pk).update(created=timezone.now() - timedelta(days=30))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[1].delete()
+        get_trending_posts().refresh(Post.objects.all())
+        self.assertEqual(self.trending_post_ids(), [self.posts[2].public_id.hex])
+
+    def test_unlikes_are_not_trimmed_first(self):
+        trending = get_trending_posts()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user2.like_post(self.posts[0])
+        trending.refresh(Post.objects.all(), now=0)
+        # a single post with pending activity is kept, yet the unlike of an already ranked like still counts.
+        with override_settings(TRENDING_ACTIVITY_SIZE=1), self.captureOnCommitCallbacks(execute=True):
+            self.user1.like_post(self.posts[1])
+            self.user2.remove_liked_post(self.posts[0])
+        get_trending_posts().refresh(Post.objects.all(), now=0)
+        self.assertEqual(trending.store.score(self.posts[0].pk), 1)
+        self.assertEqual(trending.store.score(self.posts[1].pk), 2)
+
+    @override_settings(TRENDING_SIZE=1, TRENDING_CANDIDATES=3)
+    def test_posts_below_the_ranking_keep_their_score(self):
+        trending = get_trending_posts()
+        self.assertEqual(trending.refresh(Post.objects.all(), now=0), 1)
+        self.assertEqual(len(self.trending_post_ids()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(author=self.user2, post=self.posts[0], body="Test Comment Body")
+            Comment.objects.create(author=self.user2, post=self.posts[1], body="Test Comment Body")
+            self.user2.like_post(self.posts[1])
+        trending.refresh(Post.objects.all(), now=0)
+        # the post out of the served ranking kept the weight of its creation.
+        self.assertEqual(trending.store.score(self.posts[0].pk), 4)
+        self.assertEqual(self.trending_post_ids(), [self.posts[1].public_id.hex])
+
+    def test_cached_ranking_has_its_own_namespace(self):
+        get_trending_posts().refresh(Post.objects.all())
+        reset_cache_stats()
+        self.trending_post_ids()
+        # new posts don't drop the cached ranking, only the refreshes and the edits of ranked posts do.
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.user1, body="Test Post Body")
+        self.trending_post_ids()
+        self.assertEqual(get_cache_stats("trending")["trending"], {"hits": 1, "misses": 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[0].body = "Edited Post Body"
+            self.posts[0].save()
+        response = self.client.get("/api/core/posts/trending/")
+        self.assertIn("Edited Post Body", [post["body"] for post in response.data])
+
+    def test_refresh_trending_command(self):
+        # the activity recorded by the web processes never reaches a process-local ranking.
+        with self.assertRaises(CommandError):
+            call_command("refresh_trending", stdout=StringIO())
+        out = StringIO()
+        with mock.patch.object(LocalSortedSet, "shared", True):
+            call_command("refresh_trending", stdout=out)
+        self.assertIn("Trending ranking refreshed with 3 post(s)", out.getvalue())
@@ -1,3 +1,6 @@
+import uuid
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from rest_framework import status
 from core.users.models import User
@@ -280,3 +283,145 @@ class PostViewsTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertFalse(response.data["liked"])
         self.assertEqual(response.data["likes_count"], 0)
+
+    def test_reaction_likes_and_unlikes_a_post_idempotently(self):
+        self.client.force_authenticate(user=self.user2)
+        url = f"/api/core/posts/{self.post.public_id}/reaction/"
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            # only the new state of the like is returned.
+            self.assertEqual(response.data, {"liked": True, "likes_count": 1})
+            # one write on the like table and one statement for the counter (savepoints aside).
+            self.assertEqual(len([query for query in queries if "SAVEPOINT" not in query["sql"]]), 2)
+        self.assertTrue(self.user2.posts_liked.contains(self.post))
+        for _ in range(2):
+            response = self.client.delete(url)
+            self.assertEqual(response.data, {"liked": False, "likes_count": 0})
+        self.assertFalse(self.user2.posts_liked.contains(self.post))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_reaction_requires_post_or_delete(self):
+        self.client.force_authenticate(user=self.user2)
+        response = self.client.get(f"/api/core/posts/{self.post.public_id}/reaction/")
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_reaction_to_an_unknown_post(self):
+        self.client.force_authenticate(user=self.user2)
+        response = self.client.post(f"/api/core/posts/{uuid.uuid4()}/reaction/")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post("/api/core/posts/not-a-uuid/reaction/")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reaction_for_anonymous_user(self):
+        response = self.client.post(f"/api/core/posts/{self.post.public_id}/reaction/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_posts_with_cursor_pagination(self):
+        for index in range(3):
+            Post.objects.create(author=self.user2, body=f"Paginated Post Body {index}")
+        expected_ids = [post.public_id.hex for post in Post.objects.order_by("-updated", "-id")]
+        url = "/api/core/posts/?page_size=2"
+        received_ids = []
+        # follow the "next" links until the last page is reached.
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(len(response.data["results"]) <= 2)
+            received_ids += [post["id"] for post in response.data["results"]]
+            url = response.data["next"]
+        # assert every post was returned exactly once and in order.
+        self.assertEqual(received_ids, expected_ids)
+
+    def test_cursor_pagination_is_stable_when_new_posts_arrive(self):
+        for index in range(3):
+            Post.objects.create(author=self.user2, body=f"Paginated Post Body {index}")
+        response = self.client.get("/api/core/posts/?page_size=2")
+        first_page_ids = [post["id"] for post in response.data["results"]]
+        # a new post is created while the client is scrolling.
+        Post.objects.create(author=self.user2, body="New Post Body")
+        response = self.client.get(response.data["next"])
+        second_page_ids = [post["id"] for post in response.data["results"]]
+        # assert the second page neither repeats the first page nor contains the new post.
+        self.assertEqual(len(second_page_ids), 2)
+        self.assertFalse(set(first_page_ids) & set(second_page_ids))
+        # the previous link leads back to the first page.
+        response = self.client.get(response.data["previous"])
+        self.assertEqual([post["id"] for post in response.data["results"]], first_page_ids)
+
+    def test_list_posts_with_invalid_cursor(self):
+        url = "/api/core/posts/?cursor=INVALID_CURSOR"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_posts_query_count_does_not_grow_with_page_size(self):
+        for index in range(12):
+            post = Post.objects.create(author=self.user2, body=f"Counted Post Body {index}")
+            self.user1.like_post(post)
+        for page_size in (2, 10):
+            # the page of posts, their counts and their authors are all loaded by a single query.
+            with self.assertNumQueries(1):
+                response = self.client.get(f"/api/core/posts/?page_size={page_size}")
+            self.assertEqual(len(response.data["results"]), page_size)
+        self.assertEqual(response.data["results"][0]["likes_count"], 1)
+        self.assertEqual(response.data["results"][0]["author"]["posts_count"], 12)
+
+    def test_authenticated_user_can_bulk_create_posts(self):
+        self.client.force_authenticate(self.user1)
+        url = "/api/core/posts/bulk/"
+        posts_data = [
+            {"author": str(self.user1.public_id), "body": "Bulk Post Body 1"},
+            {"author": str(self.user2.public_id), "body": "Another User's Post Body"},
+            {"author": str(self.user1.public_id)},
+            {"author": str(self.user1.public_id), "body": "Bulk Post Body 2"},
+        ]
+        # the authors of the whole batch are resolved with a single query (the second author query reads the ids of the
+        # authors whose post counts are updated, to drop them from the caches).
+        with self.assertNumQueries(6):
+            response = self.client.post(url, data=posts_data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["created"]), 2)
+        # the invalid items are reported by index without aborting the batch.
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2])
+        self.assertTrue("body" in response.data["errors"][1]["errors"])
+        self.assertEqual(Post.objects.filter(author=self.user1).count(), 4)
+        self.user1.refresh_from_db()
+        self.assertEqual(self.user1.posts_count, 4)
+
+    def test_bulk_create_posts_rejects_a_batch_without_valid_posts(self):
+        self.client.force_authenticate(self.user1)
+        url = "/api/core/posts/bulk/"
+        response = self.client.post(url, data=[{"author": str(self.user2.public_id), "body": "Body"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["created"], [])
+        response = self.client.post(url, data={"author": str(self.user1.public_id), "body": "Body"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_anonymous_user_cannot_bulk_create_posts(self):
+        url = "/api/core/posts/bulk/"
+        response = self.client.post(url, data=[{"author": str(self.user1.public_id), "body": "Body"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_get_posts_by_ids(self):
+        missing_id = uuid.uuid4()
+        ids = ",".join(str(public_id) for public_id in [self.post2.public_id, missing_id, self.post.public_id])
+        url = f"/api/core/posts/?ids={ids}"
+        # the posts and their authors are fetched with a single query.
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the results follow the requested order, with a null for the missing post.
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0]["id"], self.post2.public_id.hex)
+        self.assertIsNone(response.data[1])
+        self.assertEqual(response.data[2]["id"], self.post.public_id.hex)
+
+    def test_get_posts_by_ids_rejects_invalid_or_too_many_ids(self):
+        response = self.client.get("/api/core/posts/?ids=not-a-uuid")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(MULTI_GET_MAX_IDS=1):
+            ids = f"{self.post.public_id},{self.post2.public_id}"
+            response = self.client.get(f"/api/core/posts/?ids={ids}")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.db import transaction
+from core.abstract.sorted_sets import get_sorted_set
+
+
+class PostTimeline:
+    """
+    Materialized home timeline: the ids of the most recently updated posts, kept in a capped sorted set scored by `updated`.
+    Posts are written into it when they are saved (fan-out on write), so reading a page of the feed is a range read
+    on the sorted set followed by a single `id__in` query, instead of a sort over the whole posts table.
+    The timeline is backfilled by the `rebuild_timeline` command, which needs a sorted set shared with the web processes
+    (i.e. Redis). A set that goes missing (e.g. evicted by Redis) isn't recreated by the writes: the feed is read from the
+    database until the next rebuild.
+    """
+    name = "timeline:posts"
+    built_flag = "built"
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    def __init__(self):
+        self.store = get_sorted_set(self.name, settings.POST_TIMELINE_SIZE)
+
+    @classmethod
+    def score(cls, updated):
+        # Whole microseconds since the epoch, which are exact below 2**53 (Redis scores are doubles), unlike a float timestamp.
+        # Posts with the same score are ordered by id, so the timeline follows the (updated, id) order of the database.
+        return (updated - cls.epoch) // timedelta(microseconds=1)
+
+    def add(self, post_id, updated):
+        self.store.add(post_id, self.score(updated), create=False)
+
+    def remove(self, *post_ids):
+        self.store.remove(*post_ids)
+
+    def is_built(self):
+        """Return True once the timeline has been backfilled from the posts table, and as long as it hasn't gone missing since."""
+        return self.store.has_flag(self.built_flag) and len(self.store) > 0
+
+    def rebuild(self, queryset):
+        """Replace the timeline with the most recently updated posts of `queryset`."""
+        latest = queryset.order_by("-updated", "-id").values_list("id", "updated")[:self.store.capacity]
+        self.store.replace((pk, self.score(updated)) for pk, updated in latest)
+        self.store.set_flag(self.built_flag)
+
+    def fetch(self, queryset, position, reverse, limit):
+        """
+        Return the posts of `queryset` that follow the `(updated, id)` position, read from the timeline and hydrated in one query.
+        Return None when the timeline can't answer: it hasn't been built yet, the page reaches past its capped window,
+        or it refers to posts that no longer exist.
+        """
+        if not self.is_built():
+            return None
+        store_position = None if position is None else (self.score(position[0]), position[1])
+        entries = self.store.page(store_position, reverse=reverse, limit=limit)
+        # Towards older posts, a short page from a full timeline may just mean that the rest was trimmed off.
+        if not reverse and len(entries) < limit and len(self.store) >= self.store.capacity:
+            return None
+        post_ids = [post_id for post_id, _ in entries]
+        # The queryset may yield `.values()` rows, which `in_bulk` doesn't support, so the rows are keyed by id here.
+        posts = {row["id"] if isinstance(row, dict) else row.pk: row for row in queryset.filter(pk__in=post_ids).order_by()}
+        if len(posts) < len(post_ids):
+            # Drop the stale ids (e.g. posts removed by a cascade) and let the database answer this time.
+            self.remove(*(post_id for post_id in post_ids if post_id not in posts))
+            return None
+        return [posts[post_id] for post_id in post_ids]
+
+
+def get_post_timeline():
+    return PostTimeline()
+
+
+def schedule_timeline_update(*posts, deleted=False):
+    """Write `posts` into (or remove them from) the timeline once the current transaction commits."""
+    entries = [(post.pk, post.updated) for post in posts]
+
+    def update():
+        timeline = get_post_timeline()
+        if deleted:
+            timeline.remove(*(post_id for post_id, _ in entries))
+        else:
+            for post_id, updated in entries:
+                timeline.add(post_id, updated)
+
+    transaction.on_commit(update)
@@ -0,0 +1,111 @@
+import time
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from core.abstract.cache import invalidate_namespaces
+from core.abstract.sorted_sets import get_sorted_set
+
+
+class TrendingPosts:
+    """
+    Precomputed "trending" ranking: the TRENDING_SIZE posts with the most time-decayed activity, kept in a capped sorted set.
+    Every new post, like and comment adds its weight to the pending activity of its post (a second sorted set, so that
+    recording an event is a single increment, and a third one for the weight taken back by unlikes and deleted comments),
+    and the ranking job (see the `refresh_trending` command) periodically folds it in: the scores already ranked are halved
+    every TRENDING_HALF_LIFE seconds since the previous refresh, the pending activity is added and the TRENDING_CANDIDATES
+    best scores are kept, of which the TRENDING_SIZE best are served. A refresh only touches the scored posts and the ones
+    with new activity, and reading the ranking is a range read on the sorted set followed by a single `id__in` query, like
+    the home timeline.
+    """
+    name = "trending:posts"
+    activity_name = "trending:activity"
+    retractions_name = "trending:retractions"
+    refreshed_key = "trending:posts:refreshed"
+    weights = {"post": 1, "like": 1, "comment": 3}
+
+    def __init__(self):
+        self.store = get_sorted_set(self.name, settings.TRENDING_CANDIDATES)
+        self.activity = get_sorted_set(self.activity_name, settings.TRENDING_ACTIVITY_SIZE)
+        # Taken back weights are kept apart: a capped sorted set drops its lowest scores first, which would otherwise
+        # always be the negative ones and leave the weight they cancel out in the ranking.
+        self.retractions = get_sorted_set(self.retractions_name, settings.TRENDING_ACTIVITY_SIZE)
+
+    def record(self, post_id, weight):
+        if weight >= 0:
+            self.activity.increment(post_id, weight)
+        else:
+            self.retractions.increment(post_id, -weight)
+
+    def refresh(self, queryset, now=None):
+        """
+        Fold the pending activity into the ranking of the posts of `queryset` and return the number of ranked posts.
+        Posts created more than TRENDING_WINDOW seconds ago, or that no longer exist, drop out of the ranking. The posts
+        scored just below the TRENDING_SIZE best ones keep their score, so that further activity can bring them back.
+        """
+        now = time.time() if now is None else now
+        refreshed = cache.get(self.refreshed_key)
+        decay = 1 if refreshed is None else 0.5 ** (max(0, now - refreshed) / settings.TRENDING_HALF_LIFE)
+        scores = Counter({post_id: score * decay for post_id, score in self.store.page(limit=self.store.capacity)})
+        for post_id, weight in self.activity.pop_all():
+            scores[post_id] += weight
+        for post_id, weight in self.retractions.pop_all():
+            scores[post_id] -= weight
+        # Unlikes and deleted comments take their weight back, so activity that cancels out leaves nothing to rank.
+        candidates = [post_id for post_id, score in scores.items() if score > 0]
+        since = timezone.now() - timedelta(seconds=settings.TRENDING_WINDOW)
+        recent = set(queryset.filter(pk__in=candidates, created__gte=since).values_list("pk", flat=True))
+        self.store.replace((post_id, scores[post_id]) for post_id in recent)
+        cache.set(self.refreshed_key, now, timeout=None)
+        invalidate_namespaces("trending")
+        return min(len(self.store), settings.TRENDING_SIZE)
+
+    def fetch(self, queryset, limit):
+        """Return the `limit` best ranked posts of `queryset` (at most TRENDING_SIZE), hydrated in one query, best first."""
+        post_ids = [post_id for post_id, _ in self.store.page(limit=min(limit, settings.TRENDING_SIZE))]
+        # The queryset may yield `.values()` rows, which `in_bulk` doesn't support, so the rows are keyed by id here.
+        posts = {row["id"] if isinstance(row, dict) else row.pk: row for row in queryset.filter(pk__in=post_ids).order_by()}
+        if len(posts) < len(post_ids):
+            # Drop the posts deleted since the last refresh.
+            self.store.remove(*(post_id for post_id in post_ids if post_id not in posts))
+        return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+
+def get_trending_posts():
+    return TrendingPosts()
+
+
+def record_post_activity(sender, post_ids, activity, count=1, **kwargs):
+    """
+    Add the weight of `count` times `activity` to the pending trending activity of each of `post_ids` once the current
+    transaction commits. Connected to the `post_activity` signal (see core.abstract.signals).
+    """
+    weight = count * TrendingPosts.weights[activity]
+    post_ids = list(post_ids)
+
+    def record():
+        trending = get_trending_posts()
+        for post_id in post_ids:
+            trending.record(post_id, weight)
+
+    transaction.on_commit(record)
+
+
+def schedule_trending_update(post_id, deleted=False):
+    """
+    Once the current transaction commits, drop the cached trending listings if the edited post is ranked, and remove
+    a deleted post from the ranking and its pending activity. The listings are otherwise only replaced by a refresh.
+    """
+
+    def update():
+        trending = get_trending_posts()
+        if trending.store.score(post_id) is not None:
+            invalidate_namespaces("trending")
+        if deleted:
+            trending.store.remove(post_id)
+            trending.activity.remove(post_id)
+            trending.retractions.remove(post_id)
+
+    transaction.on_commit(update)
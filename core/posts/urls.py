@@ -1,14 +1,19 @@
 from django.urls import path
-from .views import get_or_create_posts, post_id, like_post, unlike_post
-from core.comments.views import get_or_create_comments, comment_id, like_comment, unlike_comment
+from core.abstract.asynchronous import read_view
+from .views import get_or_create_posts, get_posts_async, trending_posts, trending_posts_async, bulk_create_posts, post_id, get_post_async, post_reaction, like_post, unlike_post
+from core.comments.views import get_or_create_comments, get_comments_async, comment_id, comment_reaction, like_comment, unlike_comment
 
 urlpatterns = [
-    path('', get_or_create_posts, name='posts'),
-    path('<post_id>/', post_id, name='post-detail'),
+    path('', read_view(get_or_create_posts, get_posts_async), name='posts'),
+    path('bulk/', bulk_create_posts, name='bulk-create-posts'),
+    path('trending/', read_view(trending_posts, trending_posts_async), name='trending-posts'),
+    path('<post_id>/', read_view(post_id, get_post_async), name='post-detail'),
+    path('<post_pk>/reaction/', post_reaction, name='post-reaction'),
     path('<post_pk>/like/', like_post, name='like-post'),
     path('<post_pk>/remove_like/', unlike_post, name='unlike-post'),
-    path('<post_pk>/comment/', get_or_create_comments, name='list-or-create-comments'),
+    path('<post_pk>/comment/', read_view(get_or_create_comments, get_comments_async), name='list-or-create-comments'),
     path('<post_pk>/comment/<comment_pk>/', comment_id, name='get-or-update-or-delete-comment'),
+    path('<post_pk>/comment/<comment_pk>/reaction/', comment_reaction, name='comment-reaction'),
     path('<post_pk>/comment/<comment_pk>/like/', like_comment, name='like-comment'),
     path('<post_pk>/comment/<comment_pk>/remove_like/', unlike_comment, name='unlike-comment'),
 ]
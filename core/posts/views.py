@@ -1,41 +1,138 @@
+import uuid
+from asgiref.sync import sync_to_async
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from django.conf import settings
 from django.core.exceptions import ValidationError as DjangoValidationError
 from core.auth.permissions import UserPermission
+from core.abstract.asynchronous import async_api_view
+from core.abstract.conditional import aconditional_listing_response, conditional_listing_response, conditional_object_response
+from core.abstract.pagination import KeysetPagination
+from core.abstract.streaming import astreaming_export_response, check_export_throttle, requested_export_format, streaming_export_response
 from .models import Post
-from .serializers import PostSerializer
+from .serializers import PostSerializer, PostValuesSerializer, BulkPostSerializer
+from .timeline import get_post_timeline
+from .trending import get_trending_posts
 from core.users.models import User
-#from django.core.cache import cache
+
+def listing_rows(queryset):
+    """Return `queryset` as the `.values()` rows that listings are serialized from (see PostValuesSerializer)."""
+    return PostValuesSerializer.values(queryset)
+
+def load_posts(request, queryset, timeline=None):
+    """
+    Load the posts of a listing without serializing them: one cursor-paginated page (newest first) when the client asked for it,
+    else the whole queryset. Pages are read from the materialized `timeline` when one is given and it can answer.
+    Return the `(posts, paginator)` pair, the paginator being None for an unpaginated listing.
+    """
+    if not KeysetPagination.is_requested(request):
+        return list(queryset), None
+    paginator = KeysetPagination()
+    if timeline is None:
+        return paginator.paginate_queryset(queryset, request), paginator
+
+    def fetch(position, reverse, limit):
+        posts = timeline.fetch(queryset, position, reverse, limit)
+        return paginator.fetch_rows(queryset, position, reverse, limit) if posts is None else posts
+    return paginator.paginate_rows(request, fetch), paginator
+
+def serialize_posts(request, loaded, liked_ids=None):
+    """Serialize posts loaded by `load_posts`, wrapping a page with its next/previous links."""
+    posts, paginator = loaded
+    data = PostValuesSerializer({'request':request, 'liked_ids':liked_ids}).serialize(posts)
+    return data if paginator is None else paginator.get_paginated_data(data)
+
+def parse_public_ids(raw_ids):
+    """Return the list of public ids in `raw_ids` ("a,b,c"), raising a ValidationError if one is invalid or there are too many."""
+    public_ids = []
+    for raw_id in raw_ids.split(','):
+        raw_id = raw_id.strip()
+        try:
+            public_ids.append(uuid.UUID(raw_id))
+        except ValueError:
+            raise ValidationError(f'{raw_id} is not a valid UUID')
+    if len(public_ids) > settings.MULTI_GET_MAX_IDS:
+        raise ValidationError(f"At most {settings.MULTI_GET_MAX_IDS} ids can be requested at once.")
+    return public_ids
+
+def serialize_posts_by_ids(request, public_ids, posts, liked_ids=None):
+    """Serialize the `posts` rows in the order of `public_ids`, with a null in place of every id that doesn't match one of them."""
+    # the found posts are serialized together so that their authors are serialized once for the whole batch.
+    data = PostValuesSerializer({'request':request, 'liked_ids':liked_ids}).serialize(posts)
+    representations = {post['public_id']: representation for post, representation in zip(posts, data)}
+    return [representations.get(public_id) for public_id in public_ids]
+
+def get_posts_by_ids(request, raw_ids):
+    """
+    Serialize the posts whose public ids are listed in `raw_ids` ("a,b,c"), fetched with a single query and returned in the
+    requested order, with a null in place of every id that doesn't match a post.
+    """
+    public_ids = parse_public_ids(raw_ids)
+    posts = list(listing_rows(Post.objects.for_listing().filter(public_id__in=set(public_ids))))
+    return serialize_posts_by_ids(request, public_ids, posts)
+
+def export_posts(request, queryset, export_format, asynchronous=False):
+    """
+    Stream every post of `queryset` as JSON or NDJSON, serializing them one batch at a time.
+    The async views stream it from an async generator reading the rows through the async ORM.
+    """
+    def serialize_batch(posts):
+        # A serializer per batch, so that the authors of one batch aren't kept around for the next one.
+        return PostValuesSerializer({'request':request}).serialize(posts)
+    streaming_response = astreaming_export_response if asynchronous else streaming_export_response
+    return streaming_response(listing_rows(queryset), serialize_batch, export_format)
 
 # Create your views here.
 @api_view(["GET", "POST"])
 @permission_classes([UserPermission])
 def get_or_create_posts(request):
     if request.method == "GET":
+        # "?export=json" or "?export=ndjson" streams the whole listing instead of building it in memory.
+        export_format = requested_export_format(request)
+        # "?ids=a,b,c" fetches several posts by public id in one round trip.
+        if bool(request.query_params.get('ids', None)):
+            return Response(get_posts_by_ids(request, request.query_params.get('ids')), status=status.HTTP_200_OK)
         # get posts by a specific user/author.
         if bool(request.query_params.get('author_public_id', None)):
             author_id = request.query_params.get('author_public_id')
-            author_posts = Post.objects.filter(author__public_id=author_id)
+            author_posts = Post.objects.for_listing().filter(author__public_id=author_id)
             post = author_posts.first()
             if post:
                 permission = UserPermission()
                 permission.has_object_permission(request, post) # raises an exception if object permission-check fails
-            serializer = PostSerializer(author_posts, many=True, context={'request':request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            if export_format:
+                check_export_throttle(request)
+                return export_posts(request, author_posts.order_by('-updated'), export_format)
+            # the listing is served from the cache until a post or one of the embedded authors changes.
+            return conditional_listing_response(
+                request,
+                lambda: load_posts(request, listing_rows(author_posts)),
+                lambda loaded: serialize_posts(request, loaded),
+                namespaces=["post", "user"],
+                label="post",
+                row_serializer=PostValuesSerializer(),
+            )
         else:
-            """check if cache contains posts.
-            post_objects = cache.get("post_objects")
-            if post_objects is None:
-                # get posts by all users.
-                post_objects = Post.objects.all().order_by('-updated')
-                # save posts to cache.
-                cache.set("post_objects", post_objects)"""
-            post_objects = Post.objects.all().order_by('-updated')
-            serializer = PostSerializer(post_objects, many=True, context={'request':request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            # get posts by all users, from the cache if possible.
+            post_objects = Post.objects.for_listing().order_by('-updated')
+            if export_format:
+                # the whole posts table is only exported for staff members.
+                if not request.user.is_staff:
+                    raise PermissionDenied("Only staff members can export every post.")
+                check_export_throttle(request)
+                return export_posts(request, post_objects, export_format)
+            timeline = get_post_timeline()
+            return conditional_listing_response(
+                request,
+                lambda: load_posts(request, listing_rows(post_objects), timeline),
+                lambda loaded: serialize_posts(request, loaded),
+                namespaces=["post", "user"],
+                label="post",
+                row_serializer=PostValuesSerializer(),
+            )
     elif request.method == "POST":
         serializer = PostSerializer(data=request.data, context={'request':request})
         # return response if serializer is valid, else raise an exception.
@@ -43,6 +140,61 @@ def get_or_create_posts(request):
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+@api_view(["GET"])
+@permission_classes([UserPermission])
+def trending_posts(request):
+    # The ranking is precomputed (see core.posts.trending), so a request reads its best "?page_size=" posts and hydrates
+    # them with a single query, like a page of the timeline. Scores move on every refresh, so there is no cursor. The cached
+    # listing has its own namespace, replaced by each refresh and by edits of ranked posts, so that new posts don't drop it.
+    trending = get_trending_posts()
+    limit = KeysetPagination().get_page_size(request)
+    return conditional_listing_response(
+        request,
+        lambda: (trending.fetch(listing_rows(Post.objects.for_listing()), limit), None),
+        lambda loaded: serialize_posts(request, loaded),
+        namespaces=["trending"],
+        label="trending",
+        row_serializer=PostValuesSerializer(),
+    )
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def bulk_create_posts(request):
+    if request.method == "POST":
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError("Expected a non-empty list of posts.")
+        if len(items) > settings.BULK_CREATE_MAX_POSTS:
+            raise ValidationError(f"A batch can contain at most {settings.BULK_CREATE_MAX_POSTS} posts.")
+        # invalid items are reported by index without aborting the rest of the batch.
+        errors = {}
+        valid_items = []
+        for index, item in enumerate(items):
+            serializer = BulkPostSerializer(data=item)
+            if serializer.is_valid():
+                valid_items.append((index, serializer.validated_data))
+            else:
+                errors[index] = serializer.errors
+        # resolve the authors of every item with a single query.
+        authors = User.objects.in_bulk({data["author"] for _, data in valid_items}, field_name="public_id")
+        posts = []
+        for index, data in valid_items:
+            author = authors.get(data["author"])
+            if author is None:
+                errors[index] = {"author": [f'There is no user with public id "{data["author"]}"']}
+            elif author != request.user:
+                errors[index] = {"author": ["You can't create a post for another user."]}
+            else:
+                posts.append(Post(author=author, body=data["body"]))
+        created_posts = Post.objects.bulk_create_posts(posts) if posts else []
+        return Response(
+            {
+                "created": [post.public_id.hex for post in created_posts],
+                "errors": [{"index": index, "errors": item_errors} for index, item_errors in sorted(errors.items())],
+            },
+            status=status.HTTP_201_CREATED if created_posts else status.HTTP_400_BAD_REQUEST,
+        )
+
 @api_view(["GET", "PUT", "DELETE"])
 @permission_classes([UserPermission])
 def post_id(request, post_id):
@@ -54,8 +206,8 @@ def post_id(request, post_id):
         raise ValidationError(f'There is no post with public id "{post_id}"')
 
     if request.method == "GET":
-        serializer = PostSerializer(post, context={'request':request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # answer with a 304 when the client's copy is current, without serializing the post.
+        return conditional_object_response(request, post, lambda: PostSerializer(post, context={'request':request}).data)
     elif request.method == "PUT":
         serializer = PostSerializer(post, data=request.data, context={'request':request})
         # check object permissions
@@ -72,6 +224,19 @@ def post_id(request, post_id):
         post.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+@api_view(["POST", "DELETE"])
+@permission_classes([IsAuthenticated])
+def post_reaction(request, post_pk):
+    # POST likes the post and DELETE removes the like. Both are idempotent and only return the new state of the like,
+    # with one write on the like table and one statement for the counter (see User._react).
+    try:
+        liked, likes_count = request.user.react_to_post(post_pk, liked=request.method == "POST")
+    except DjangoValidationError:
+        raise ValidationError(f'{post_pk} is not a valid UUID' )
+    except Post.DoesNotExist:
+        raise ValidationError(f'There is no post with public id "{post_pk}"')
+    return Response({"liked": liked, "likes_count": likes_count}, status=status.HTTP_200_OK)
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def like_post(request, post_pk):
@@ -105,3 +270,96 @@ def unlike_post(request, post_pk):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+
+
+# Native async counterparts of the read endpoints above, used when the project is served under ASGI (see core.abstract.asynchronous).
+async def aload_posts(request, queryset, timeline=None):
+    """Async counterpart of `load_posts`."""
+    if not KeysetPagination.is_requested(request):
+        return [post async for post in queryset], None
+    paginator = KeysetPagination()
+
+    async def fetch(position, reverse, limit):
+        if timeline is not None:
+            posts = await sync_to_async(timeline.fetch)(queryset, position, reverse, limit)
+            if posts is not None:
+                return posts
+        return [post async for post in paginator.fetch_rows(queryset, position, reverse, limit)]
+    return await paginator.apaginate_rows(request, fetch), paginator
+
+async def aliked_post_ids(request, post_ids):
+    """Return the `post_ids` liked by the requesting user (None for an anonymous one), with a single query."""
+    if request.user.is_anonymous:
+        return None
+    return await request.user.aliked_post_ids(post_ids)
+
+async def aserialize_posts(request, loaded):
+    """Async counterpart of `serialize_posts`: the likes of the requesting user are looked up for the whole page first."""
+    return serialize_posts(request, loaded, await aliked_post_ids(request, [post['id'] for post in loaded[0]]))
+
+@async_api_view
+async def get_posts_async(request):
+    # "?export=json" or "?export=ndjson" streams the whole listing from an async generator.
+    export_format = requested_export_format(request)
+    # "?ids=a,b,c" fetches several posts by public id in one round trip.
+    if bool(request.query_params.get('ids', None)):
+        public_ids = parse_public_ids(request.query_params.get('ids'))
+        posts = [post async for post in listing_rows(Post.objects.for_listing().filter(public_id__in=set(public_ids)))]
+        data = serialize_posts_by_ids(request, public_ids, posts, await aliked_post_ids(request, [post['id'] for post in posts]))
+        return Response(data, status=status.HTTP_200_OK)
+    # get posts by a specific user/author.
+    if bool(request.query_params.get('author_public_id', None)):
+        author_id = request.query_params.get('author_public_id')
+        posts, timeline = Post.objects.for_listing().filter(author__public_id=author_id), None
+        post = await posts.afirst()
+        if post:
+            permission = UserPermission()
+            permission.has_object_permission(request, post) # raises an exception if object permission-check fails
+        if export_format:
+            await sync_to_async(check_export_throttle)(request)
+            return export_posts(request, posts.order_by('-updated'), export_format, asynchronous=True)
+    else:
+        # get posts by all users.
+        posts, timeline = Post.objects.for_listing().order_by('-updated'), get_post_timeline()
+        if export_format:
+            # the whole posts table is only exported for staff members.
+            if not request.user.is_staff:
+                raise PermissionDenied("Only staff members can export every post.")
+            await sync_to_async(check_export_throttle)(request)
+            return export_posts(request, posts, export_format, asynchronous=True)
+    return await aconditional_listing_response(
+        request,
+        lambda: aload_posts(request, listing_rows(posts), timeline),
+        lambda loaded: aserialize_posts(request, loaded),
+        namespaces=["post", "user"],
+        label="post",
+        row_serializer=PostValuesSerializer(),
+    )
+
+@async_api_view
+async def trending_posts_async(request):
+    trending = get_trending_posts()
+    limit = KeysetPagination().get_page_size(request)
+
+    async def load():
+        return await sync_to_async(trending.fetch)(listing_rows(Post.objects.for_listing()), limit), None
+    return await aconditional_listing_response(
+        request,
+        load,
+        lambda loaded: aserialize_posts(request, loaded),
+        namespaces=["trending"],
+        label="trending",
+        row_serializer=PostValuesSerializer(),
+    )
+
+@async_api_view
+async def get_post_async(request, post_id):
+    try:
+        post = await Post.objects.for_listing().aget(public_id=post_id)
+    except DjangoValidationError:
+        raise ValidationError(f'{post_id} is not a valid UUID' )
+    except Post.DoesNotExist:
+        raise ValidationError(f'There is no post with public id "{post_id}"')
+    liked_ids = await aliked_post_ids(request, [post.pk])
+    # answer with a 304 when the client's copy is current, without serializing the post.
+    return conditional_object_response(request, post, lambda: PostSerializer(post, context={'request':request, 'liked_ids':liked_ids}).data)
@@ -0,0 +1,37 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from core.auth.permissions import UserPermission
+from core.abstract.pagination import RankedKeysetPagination
+from core.abstract.search import get_search_engine
+from core.comments.models import Comment
+from core.comments.serializers import CommentSerializer
+from core.posts.models import Post
+from core.posts.serializers import PostSerializer
+
+# The searchable listings, by the value of the "type" query parameter.
+SEARCHABLE_TYPES = {
+    "posts": (Post, PostSerializer),
+    "comments": (Comment, CommentSerializer),
+}
+
+# Create your views here.
+@api_view(["GET"])
+@permission_classes([UserPermission])
+def search(request):
+    terms = request.query_params.get('q', '').strip()
+    if not terms:
+        raise ValidationError('A search query is required (e.g. "?q=hello").')
+    search_type = request.query_params.get('type', 'posts')
+    if search_type not in SEARCHABLE_TYPES:
+        raise ValidationError(f'"{search_type}" is not a valid search type, expected one of: {", ".join(SEARCHABLE_TYPES)}')
+    model, serializer_class = SEARCHABLE_TYPES[search_type]
+    queryset = model.objects.for_listing()
+    engine = get_search_engine()
+    # the results are ranked by relevance and paginated on (rank, id), so a deep page costs the same as the first one.
+    paginator = RankedKeysetPagination()
+    results = paginator.paginate_rows(
+        request,
+        lambda position, reverse, limit: engine.search(queryset, terms, position, reverse, limit),
+    )
+    data = serializer_class(results, many=True, context={'request':request}).data
+    return paginator.get_paginated_response(data)
@@ -0,0 +1,125 @@
+import json
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from core.abstract.asynchronous import dispatch_by_method
+from core.comments.models import Comment
+from core.comments.views import get_comments_async
+from core.posts.models import Post
+from core.posts.views import get_post_async, get_posts_async
+from core.users.models import User
+from core.users.views import get_user_async
+
+
+class AsyncReadViewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.user1 = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.user2 = User.objects.create_user(email="otheruser@gmail.com", username="other_user", password="other_password", first_name="Other", last_name="User")
+        self.superuser = User.objects.create_superuser(email="admin@gmail.com", username="admin_user", password="admin_password", first_name="Admin", last_name="User")
+        self.post = Post.objects.create(author=self.user1, body="Test Post Body")
+        self.post2 = Post.objects.create(author=self.user1, body="Test Post Body 2")
+        self.comment = Comment.objects.create(author=self.user2, post=self.post, body="Test Comment Body")
+        self.user1.like_post(self.post)
+
+    def get(self, path, user=None, **headers):
+        if user is not None:
+            headers["Authorization"] = f"Bearer {AccessToken.for_user(user)}"
+        return self.factory.get(path, headers=headers)
+
+    def render(self, response):
+        response.render()
+        return json.loads(response.content)
+
+    async def test_list_posts(self):
+        response = await get_posts_async(self.get("/api/core/posts/?page_size=1", user=self.user1))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = self.render(response)
+        self.assertEqual([post["id"] for post in data["results"]], [self.post2.public_id.hex])
+        self.assertIsNotNone(data["next"])
+        response = await get_posts_async(self.get(data["next"], user=self.user1))
+        data = self.render(response)
+        self.assertEqual([post["id"] for post in data["results"]], [self.post.public_id.hex])
+        # the likes of the requesting user are looked up for the whole page.
+        self.assertTrue(data["results"][0]["liked"])
+
+    async def test_list_posts_of_another_author_is_forbidden(self):
+        response = await get_posts_async(self.get(f"/api/core/posts/?author_public_id={self.user1.public_id}", user=self.user2))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_list_posts_by_ids(self):
+        response = await get_posts_async(self.get(f"/api/core/posts/?ids={self.post.public_id},{self.post2.public_id}"))
+        data = self.render(response)
+        self.assertEqual([post["id"] for post in data], [self.post.public_id.hex, self.post2.public_id.hex])
+        self.assertFalse(data[0]["liked"])
+
+    async def test_retrieve_post_honours_conditional_requests(self):
+        response = await get_post_async(self.get("/", user=self.user1), str(self.post.public_id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.render(response)["liked"])
+        response = await get_post_async(self.get("/", user=self.user1, **{"If-None-Match": response["ETag"]}), str(self.post.public_id))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_retrieve_missing_post(self):
+        response = await get_post_async(self.get("/"), "not-a-uuid")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_list_comments(self):
+        response = await get_comments_async(self.get("/", user=self.user2), str(self.post.public_id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([comment["id"] for comment in self.render(response)["results"]], [self.comment.public_id.hex])
+
+    async def test_list_comments_with_cursor_pagination_and_preview(self):
+        newer = await Comment.objects.acreate(author=self.user1, post=self.post, body="Newer Comment Body")
+        response = await get_comments_async(self.get("/?page_size=1", user=self.user2), str(self.post.public_id))
+        data = self.render(response)
+        self.assertEqual([comment["id"] for comment in data["results"]], [newer.public_id.hex])
+        response = await get_comments_async(self.get(data["next"], user=self.user2), str(self.post.public_id))
+        self.assertEqual([comment["id"] for comment in self.render(response)["results"]], [self.comment.public_id.hex])
+        response = await get_comments_async(self.get("/?preview=1", user=self.user2), str(self.post.public_id))
+        self.assertEqual([comment["id"] for comment in self.render(response)], [newer.public_id.hex])
+
+    async def read(self, response):
+        return b"".join([chunk async for chunk in response.streaming_content]).decode("utf-8")
+
+    async def test_export_posts_streams_from_an_async_generator(self):
+        response = await get_posts_async(self.get("/api/core/posts/?export=ndjson", user=self.user1))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = await get_posts_async(self.get("/api/core/posts/?export=ndjson", user=self.superuser))
+        # Django would buffer a sync iterator in full under ASGI.
+        self.assertTrue(response.is_async)
+        posts = [json.loads(line) for line in (await self.read(response)).splitlines()]
+        self.assertEqual([post["id"] for post in posts], [self.post2.public_id.hex, self.post.public_id.hex])
+
+    async def test_export_comments_streams_from_an_async_generator(self):
+        response = await get_comments_async(self.get("/?export=json", user=self.user2), str(self.post.public_id))
+        self.assertTrue(response.is_async)
+        comments = json.loads(await self.read(response))
+        self.assertEqual([comment["id"] for comment in comments], [self.comment.public_id.hex])
+
+    async def test_retrieve_user_requires_authentication(self):
+        response = await get_user_async(self.get("/"), str(self.user1.public_id))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await get_user_async(self.get("/", user=self.user2), str(self.user1.public_id))
+        self.assertEqual(self.render(response)["username"], "test_user")
+
+    async def test_invalid_token_is_rejected(self):
+        response = await get_posts_async(self.get("/api/core/posts/", Authorization="Bearer invalid"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("Bearer", response["WWW-Authenticate"])
+
+    async def test_dispatch_by_method(self):
+        calls = []
+
+        def sync_view(request):
+            calls.append("sync")
+
+        async def async_view(request):
+            calls.append("async")
+
+        view = dispatch_by_method(sync_view, async_view)
+        await view(self.factory.get("/"))
+        await view(self.factory.post("/"))
+        self.assertEqual(calls, ["async", "sync"])
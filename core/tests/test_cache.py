@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from core.abstract.cache import get_cache_stats, get_namespace_versions, reset_cache_stats
+from core.users.models import User
+from core.posts.models import Post
+from core.comments.models import Comment, comments_cache_namespace
+
+
+class ListingCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.post = Post.objects.create(author=self.user, body="Test Post Body")
+        self.other_post = Post.objects.create(author=self.user, body="Other Post Body")
+        self.comment = Comment.objects.create(author=self.user, post=self.post, body="Test Comment Body")
+
+    def test_post_listing_is_served_from_cache_until_a_post_changes(self):
+        url = "/api/core/posts/"
+        response = self.client.get(url)
+        self.assertEqual(len(response.data), 2)
+        # the second read only refreshes the counters of the cached page, by primary key.
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(get_cache_stats("post"), {"post": {"hits": 1, "misses": 1}})
+        # a new post bumps the "post" namespace, so the next read is a miss that sees it.
+        Post.objects.create(author=self.user, body="New Post Body")
+        response = self.client.get(url)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(get_cache_stats("post"), {"post": {"hits": 1, "misses": 2}})
+
+    def test_likes_and_comments_are_merged_into_the_cached_post_listing(self):
+        url = "/api/core/posts/"
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(url)
+        etag = response["ETag"]
+        versions = get_namespace_versions(["post", "user"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.like_post(self.post)
+            Comment.objects.create(author=self.user, post=self.other_post, body="New Comment Body")
+        # neither the like nor the comment invalidates the listing, whose counters and like states are read again on a hit.
+        self.assertEqual(get_namespace_versions(["post", "user"]), versions)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        posts = {post["id"]: post for post in response.data}
+        self.assertEqual(posts[self.post.public_id.hex]["likes_count"], 1)
+        self.assertTrue(posts[self.post.public_id.hex]["liked"])
+        self.assertFalse(posts[self.other_post.public_id.hex]["liked"])
+        self.assertEqual(posts[self.other_post.public_id.hex]["comments_count"], 1)
+        self.assertEqual(posts[self.post.public_id.hex]["author"]["posts_count"], 2)
+        self.assertEqual(get_cache_stats("post"), {"post": {"hits": 1, "misses": 1}})
+        # the ETag of a hit is current, so the client's copy is now up to date.
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_writes_only_invalidate_their_post_comments(self):
+        namespaces = [comments_cache_namespace(self.post.pk), comments_cache_namespace(self.other_post.pk)]
+        versions = get_namespace_versions(namespaces)
+        # a like only moves a counter, which cached listings read again on every hit.
+        self.user.like_comment(self.comment)
+        self.assertEqual(get_namespace_versions(namespaces), versions)
+        Comment.objects.create(author=self.user, post=self.post, body="Other Comment Body")
+        new_versions = get_namespace_versions(namespaces)
+        self.assertNotEqual(versions[namespaces[0]], new_versions[namespaces[0]])
+        self.assertEqual(versions[namespaces[1]], new_versions[namespaces[1]])
+        url = f"/api/core/posts/{self.post.public_id}/comment/"
+        self.client.get(url)
+        Comment.objects.create(author=self.user, post=self.post, body="New Comment Body")
+        response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertEqual(get_cache_stats("comments"), {"comments": {"hits": 0, "misses": 2}})
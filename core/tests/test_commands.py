@@ -0,0 +1,113 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from core.users.models import User
+from core.posts.models import Post
+from core.comments.models import Comment
+
+
+class ReconcileCountersCommandTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.posts = [Post.objects.create(author=self.user, body=f"Test Post Body {index}") for index in range(3)]
+        self.comment = Comment.objects.create(author=self.user, post=self.posts[0], body="Test Comment Body")
+        self.user.like_post(self.posts[0])
+        self.user.like_comment(self.comment)
+
+    def test_reconcile_counters_repairs_drift(self):
+        # corrupt every counter behind the models' back.
+        Post.objects.update(likes_count=7, comments_count=7)
+        Comment.objects.update(likes_count=7)
+        User.objects.update(posts_count=7)
+        out = StringIO()
+        call_command("reconcile_counters", chunk_size=2, stdout=out)
+        self.assertEqual(list(Post.objects.order_by("pk").values_list("likes_count", "comments_count")), [(1, 1), (0, 0), (0, 0)])
+        self.assertEqual(Comment.objects.get().likes_count, 1)
+        self.assertEqual(User.objects.get().posts_count, 3)
+        self.assertIn("core_posts.Post.likes_count: repaired 3 row(s)", out.getvalue())
+        # a second run finds nothing left to repair.
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("core_users.User.posts_count: repaired 0 row(s)", out.getvalue())
+
+
+class BenchmarkCommandTests(TestCase):
+    # Each benchmark seeds its rows in a transaction it rolls back: the command, its options, the patterns its output
+    # must match (with the number of times, when it matters) and the models left empty.
+    benchmarks = [
+        (
+            "benchmark_queries",
+            {"users": 3, "posts": 30, "comments": 60, "repeat": 2},
+            # the listing queries are answered through the composite indexes.
+            [r"== posts: first page", r"== posts: deep page", r"== posts by author: first page", r"== comments of post",
+             (r"2 run\(s\)", 4), r"post_updated_id_idx", r"comment_post_updated_idx"],
+            [Post, User],
+        ),
+        (
+            "benchmark_serializers",
+            {"users": 3, "rows": 20, "repeat": 2},
+            [r"== posts", r"== comments", r"== users", (r"model serializer: 2 run\(s\)", 3),
+             (r"values serializer: 2 run\(s\)", 3), (r"-- speedup:", 3)],
+            [Post, User],
+        ),
+        (
+            "benchmark_renderers",
+            {"users": 3, "posts": 20, "repeat": 2},
+            [r"== rendering 20 post\(s\)", r"-- JSONRenderer: \d+ bytes, 2 run\(s\)", r"-- FastJSONRenderer: \d+ bytes, 2 run\(s\)"],
+            [Post],
+        ),
+        (
+            "benchmark_user_directory",
+            {"users": 30, "pages": 3, "repeat": 2, "page_size": 5},
+            [r"Seeded 30 user\(s\)", r"-- page at user 0: 2 run\(s\)", r"-- page at user 14: 2 run\(s\)",
+             r"-- page at user 29: 2 run\(s\)", r"-- deepest/first page median ratio:"],
+            [User],
+        ),
+        (
+            "benchmark_logins",
+            {"logins": 2, "concurrency": 2},
+            [r"-- login: 2 run\(s\)", r"logins/s per core, \d+ rejected"],
+            [User],
+        ),
+    ]
+
+    def test_benchmarks_report_their_timings_and_roll_back_their_rows(self):
+        for command, options, patterns, models in self.benchmarks:
+            with self.subTest(command=command):
+                out = StringIO()
+                call_command(command, stdout=out, **options)
+                output = out.getvalue()
+                for pattern in patterns:
+                    pattern, count = pattern if isinstance(pattern, tuple) else (pattern, None)
+                    self.assertRegex(output, pattern)
+                    if count is not None:
+                        self.assertEqual(len(re.findall(pattern, output)), count, pattern)
+                for model in models:
+                    self.assertEqual(model.objects.count(), 0)
+
+
+class BenchmarkConcurrencyCommandTests(TestCase):
+    def test_benchmark_concurrency_reports_throughput_and_latency(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200 if self.path == "/ok" else 500)
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        out = StringIO()
+        call_command("benchmark_concurrency", f"{base_url}/ok", f"{base_url}/fail", requests=20, concurrency=4, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertIn("/ok: 20 request(s), 4 concurrent", lines[0])
+        self.assertTrue(lines[0].endswith("0 error(s)"))
+        self.assertTrue(lines[1].endswith("20 error(s)"))
@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.users.models import User
+from core.posts.models import Post
+from core.comments.models import Comment
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.post = Post.objects.create(author=self.user, body="Test Post Body")
+        self.comment = Comment.objects.create(author=self.user, post=self.post, body="Test Comment Body")
+
+    def test_post_detail_answers_304_until_the_post_changes(self):
+        url = f"/api/core/posts/{self.post.public_id}/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.has_header("ETag"))
+        self.assertTrue(response.has_header("Last-Modified"))
+        etag = response["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        # a like changes the counters, hence the ETag.
+        self.user.like_post(self.post)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["likes_count"], 1)
+
+    def test_etag_depends_on_the_rendered_media_type(self):
+        for url in (f"/api/core/posts/{self.post.public_id}/", "/api/core/posts/?page_size=10"):
+            json_response = self.client.get(url, HTTP_ACCEPT="application/json")
+            indented_response = self.client.get(url, HTTP_ACCEPT="application/json; indent=4")
+            self.assertNotEqual(json_response["ETag"], indented_response["ETag"])
+            # the JSON body's ETag doesn't validate the cached copy of another representation.
+            response = self.client.get(url, HTTP_ACCEPT="application/json; indent=4", HTTP_IF_NONE_MATCH=json_response["ETag"])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.get(url, HTTP_ACCEPT="application/json; indent=4", HTTP_IF_NONE_MATCH=indented_response["ETag"])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_post_detail_honours_if_modified_since(self):
+        url = f"/api/core/posts/{self.post.public_id}/"
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_comment_detail_answers_304(self):
+        url = f"/api/core/posts/{self.post.public_id}/comment/{self.comment.public_id}/"
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_user_detail_answers_304(self):
+        self.client.force_authenticate(self.user)
+        url = f"/api/core/users/{self.user.public_id}/"
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_post_listing_answers_304_from_the_cache(self):
+        url = "/api/core/posts/?page_size=10"
+        response = self.client.get(url)
+        etag = response["ETag"]
+        # the validators are cached with the page, so the 304 only reads the current counters of its rows.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # a new post changes the page and its validators.
+        Post.objects.create(author=self.user, body="New Post Body")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_listing_validators_depend_on_the_viewer(self):
+        url = "/api/core/posts/"
+        anonymous_etag = self.client.get(url)["ETag"]
+        self.client.force_authenticate(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], anonymous_etag)
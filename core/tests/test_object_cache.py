@@ -0,0 +1,107 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from core.abstract.object_cache import (
+    OBJECT_KEY, LocalObjectCache, get_local_object_cache, get_object_cache_stats, invalidate_objects, reset_object_cache_stats,
+)
+from core.comments.models import Comment
+from core.posts.models import Post
+from core.users.models import User
+
+
+@override_settings(OBJECT_CACHE=True)
+class ObjectCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        get_local_object_cache().clear()
+        reset_object_cache_stats()
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.post = Post.objects.create(author=self.user, body="Test Post Body")
+
+    def test_repeated_lookups_dont_query_the_database(self):
+        with self.assertNumQueries(1):
+            Post.objects.get_object_by_public_id(self.post.public_id)
+        with self.assertNumQueries(0):
+            post = Post.objects.get_object_by_public_id(self.post.public_id.hex)
+        self.assertEqual(post, self.post)
+        # the shared cache answers once the entry of this process is gone.
+        get_local_object_cache().clear()
+        with self.assertNumQueries(0):
+            Post.objects.get_object_by_public_id(self.post.public_id)
+        self.assertEqual(
+            get_object_cache_stats()["core_posts.Post"], {"local_hits": 1, "shared_hits": 1, "misses": 1, "hit_rate": 2 / 3}
+        )
+
+    def test_saves_and_counter_updates_invalidate_the_object(self):
+        Post.objects.get_object_by_public_id(self.post.public_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.body = "Edited Post Body"
+            self.post.save()
+        self.assertEqual(Post.objects.get_object_by_public_id(self.post.public_id).body, "Edited Post Body")
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(author=self.user, post=self.post, body="Test Comment Body")
+            self.user.like_post(self.post)
+        post = Post.objects.get_object_by_public_id(self.post.public_id)
+        self.assertEqual((post.comments_count, post.likes_count), (1, 1))
+        self.assertEqual(User.objects.get_object_by_public_id(self.user.public_id).posts_count, 1)
+
+    def test_deleted_and_invalid_objects_are_not_found(self):
+        Post.objects.get_object_by_public_id(self.post.public_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.delete()
+        with self.assertRaises(Post.DoesNotExist):
+            Post.objects.get_object_by_public_id(self.post.public_id)
+        # invalid ids still fail the way they do without the cache.
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get("/api/core/posts/not-a-uuid/").status_code, 400)
+
+    def test_cascade_deletes_invalidate_the_objects(self):
+        comment = Comment.objects.create(author=self.user, post=self.post, body="Test Comment Body")
+        Post.objects.get_object_by_public_id(self.post.public_id)
+        Comment.objects.get_object_by_public_id(comment.public_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).delete()
+        with self.assertRaises(Post.DoesNotExist):
+            Post.objects.get_object_by_public_id(self.post.public_id)
+        with self.assertRaises(Comment.DoesNotExist):
+            Comment.objects.get_object_by_public_id(comment.public_id)
+
+    def test_objects_invalidated_while_loading_are_not_kept(self):
+        get = Post.objects.get
+
+        def get_then_write(**kwargs):
+            post = get(**kwargs)
+            # a write commits and invalidates the post before the lookup stores what it read.
+            invalidate_objects(Post, [post.pk])
+            return post
+
+        for _ in range(2):
+            with mock.patch.object(Post.objects, "get", side_effect=get_then_write):
+                Post.objects.get_object_by_public_id(self.post.public_id)
+        # the first lookup checks the generation of the model, the second one that of the post, whose id is known by then.
+        with self.assertNumQueries(1):
+            Post.objects.get_object_by_public_id(self.post.public_id)
+
+    def test_cached_objects_leave_their_uncached_fields_out(self):
+        User.objects.get_object_by_public_id(self.user.public_id)
+        data = cache.get(OBJECT_KEY.format(label="core_users.User", pk=self.user.pk))
+        self.assertNotIn(self.user.password.encode(), data)
+        with self.assertNumQueries(0):
+            user = User.objects.get_object_by_public_id(self.user.public_id)
+        self.assertEqual((user.pk, user.email, user.posts_count), (self.user.pk, self.user.email, 1))
+        self.assertEqual(user.get_deferred_fields(), {"password"})
+        # the password is read from the database when it is needed.
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password("test_password"))
+
+    def test_the_local_cache_is_a_bounded_lru_with_a_ttl(self):
+        local_cache = LocalObjectCache(size=2, timeout=5)
+        with mock.patch("core.abstract.object_cache.time.monotonic", return_value=100):
+            local_cache.set("a", 1)
+            local_cache.set("b", 2)
+            local_cache.get("a")
+            local_cache.set("c", 3)
+            self.assertEqual((local_cache.get("a"), local_cache.get("b"), local_cache.get("c")), (1, None, 3))
+        with mock.patch("core.abstract.object_cache.time.monotonic", return_value=106):
+            self.assertIsNone(local_cache.get("a"))
@@ -0,0 +1,101 @@
+import datetime
+import decimal
+import json
+import unittest
+import uuid
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.test import AsyncRequestFactory
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework.utils.serializer_helpers import ReturnDict
+from core.abstract import renderers
+from core.abstract.renderers import FastJSONRenderer, MessagePackRenderer, encode_json
+from core.posts.models import Post
+from core.posts.views import get_posts_async
+from core.users.models import User
+
+
+class FastJSONRendererTests(unittest.TestCase):
+    def setUp(self):
+        self.data = [
+            ReturnDict(
+                {
+                    "id": uuid.uuid4(),
+                    "created": timezone.now(),
+                    "naive": datetime.datetime(2024, 1, 2, 3, 4, 5, 678901),
+                    "day": datetime.date(2024, 1, 2),
+                    "amount": decimal.Decimal("1.5"),
+                    "label": gettext_lazy("Hello"),
+                    "body": "Ünïcode \u2028 separators \u2029",
+                    "nested": {"values": [1, 2.5, None, True]},
+                },
+                serializer=None,
+            )
+        ]
+
+    def test_renders_like_the_drf_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_falls_back_to_the_stdlib_encoder_without_orjson(self):
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_falls_back_to_the_stdlib_encoder_for_values_orjson_rejects(self):
+        data = {"big": 2 ** 70}
+        self.assertEqual(encode_json(data), JSONRenderer().render(data))
+
+    def test_indented_output_is_left_to_the_drf_renderer(self):
+        media_type = "application/json; indent=4"
+        self.assertEqual(FastJSONRenderer().render(self.data, media_type, {}), JSONRenderer().render(self.data, media_type, {}))
+
+    def test_renders_nothing_for_no_data(self):
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    @unittest.skipIf(renderers.msgpack is not None, "msgpack is installed")
+    def test_message_pack_requires_msgpack(self):
+        with self.assertRaises(ImproperlyConfigured):
+            MessagePackRenderer().render(self.data)
+
+    @unittest.skipIf(renderers.msgpack is None, "msgpack isn't installed")
+    def test_message_pack_carries_the_json_values(self):
+        unpacked = renderers.msgpack.unpackb(MessagePackRenderer().render(self.data), raw=False)
+        self.assertEqual(unpacked, json.loads(JSONRenderer().render(self.data)))
+
+
+class RendererNegotiationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.post = Post.objects.create(author=self.user, body="Test Post Body")
+
+    def test_json_by_default(self):
+        response = self.client.get("/api/core/posts/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.json()[0]["id"], self.post.public_id.hex)
+        # the body depends on the negotiated format, so caches must key it on Accept.
+        self.assertIn("Accept", response["Vary"])
+
+    @unittest.skipIf(renderers.msgpack is None, "msgpack isn't installed")
+    def test_message_pack_through_accept(self):
+        response = self.client.get("/api/core/posts/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(renderers.msgpack.unpackb(response.content, raw=False)[0]["id"], self.post.public_id.hex)
+
+    @unittest.skipIf(renderers.msgpack is not None, "msgpack is installed")
+    def test_message_pack_is_not_offered_without_msgpack(self):
+        response = self.client.get("/api/core/posts/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+    async def test_async_views_negotiate_the_format(self):
+        factory = AsyncRequestFactory()
+        response = await get_posts_async(factory.get("/api/core/posts/", headers={"Accept": "application/json"}))
+        response.render()
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(response.content)[0]["id"], self.post.public_id.hex)
+        response = await get_posts_async(factory.get("/api/core/posts/", headers={"Accept": "application/xml"}))
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
@@ -0,0 +1,89 @@
+import re
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.abstract.search import InvertedIndexSearchEngine, PostgresSearchEngine, tokenize
+from core.comments.models import Comment
+from core.posts.models import Post
+from core.users.models import User
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        # the in-process index outlives the test transactions, so every test starts from an empty one.
+        self.engine = InvertedIndexSearchEngine()
+        self.engine.clear()
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.post1 = Post.objects.create(author=self.user, body="Django tips: caching and more caching")
+        self.post2 = Post.objects.create(author=self.user, body="A long post about gardening that mentions caching only once in passing")
+        self.post3 = Post.objects.create(author=self.user, body="Nothing relevant here")
+        self.comment = Comment.objects.create(author=self.user, post=self.post3, body="Caching saved my weekend")
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Hello, World! hello"), ["hello", "world", "hello"])
+
+    def test_search_posts_ranks_results_by_relevance(self):
+        response = self.client.get("/api/core/search/?q=caching")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post["id"] for post in response.data["results"]], [self.post1.public_id.hex, self.post2.public_id.hex])
+        # every term has to match.
+        response = self.client.get("/api/core/search/?q=caching gardening")
+        self.assertEqual([post["id"] for post in response.data["results"]], [self.post2.public_id.hex])
+
+    def test_search_comments(self):
+        response = self.client.get("/api/core/search/?q=weekend&type=comments")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([comment["id"] for comment in response.data["results"]], [self.comment.public_id.hex])
+
+    def test_search_results_are_cursor_paginated(self):
+        for index in range(5):
+            Post.objects.create(author=self.user, body=f"caching note {index}")
+        ids = []
+        url = "/api/core/search/?q=caching&page_size=3"
+        while url:
+            response = self.client.get(url)
+            ids.extend(post["id"] for post in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(len(set(ids)), 7)
+        # the previous link leads back to the page we came from.
+        first_page = self.client.get("/api/core/search/?q=caching&page_size=3")
+        second_page = self.client.get(first_page.data["next"])
+        previous_page = self.client.get(second_page.data["previous"])
+        self.assertEqual(previous_page.data["results"], first_page.data["results"])
+
+    def test_search_never_scans_the_table_with_like(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get("/api/core/search/?q=caching")
+            self.client.get("/api/core/search/?q=caching")
+        self.assertFalse(any(re.search(r"\bLIKE\b", query["sql"], re.IGNORECASE) for query in context.captured_queries))
+
+    def test_index_follows_saves_and_deletes(self):
+        self.client.get("/api/core/search/?q=caching")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post3.body = "Now about caching too"
+            self.post3.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post1.delete()
+        response = self.client.get("/api/core/search/?q=caching")
+        self.assertEqual({post["id"] for post in response.data["results"]}, {self.post2.public_id.hex, self.post3.public_id.hex})
+
+    def test_search_requires_a_valid_query_and_type(self):
+        self.assertEqual(self.client.get("/api/core/search/").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get("/api/core/search/?q=caching&type=users").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_postgres_engine_matches_through_the_search_vector(self):
+        queryset = PostgresSearchEngine().filter(Post.objects.all(), "caching")
+        sql = str(queryset.query)
+        self.assertIn("@@", sql)
+        self.assertIn("websearch_to_tsquery", sql)
+        self.assertIsNone(re.search(r"\bLIKE\b", sql, re.IGNORECASE))
+
+    def test_rebuild_search_index_command(self):
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("core_posts.Post: indexed 3 row(s)", out.getvalue())
+        self.assertIn("core_comments.Comment: indexed 1 row(s)", out.getvalue())
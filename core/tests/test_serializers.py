@@ -0,0 +1,86 @@
+import json
+from django.test import TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.utils.encoders import JSONEncoder
+from core.abstract.conditional import compute_validators
+from core.comments.models import Comment
+from core.comments.serializers import CommentSerializer, CommentValuesSerializer
+from core.posts.models import Post
+from core.posts.serializers import PostSerializer, PostValuesSerializer
+from core.users.models import User
+from core.users.serializers import UserSerializer, UserValuesSerializer
+
+
+class ValuesSerializerEquivalenceTests(TestCase):
+    """The `.values()` fast paths must render exactly what the model serializers they stand in for render."""
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.user2 = User.objects.create_user(email="otheruser@gmail.com", username="other_user", password="other_password", first_name="Other", last_name="User", bio="Hello")
+        # the avatar only needs a stored name to be represented, no file is written.
+        User.objects.filter(pk=self.user2.pk).update(avatar="user_2/avatar.png")
+        self.posts = [
+            Post.objects.create(author=self.user1, body="Test Post Body"),
+            Post.objects.create(author=self.user2, body="Other Post Body"),
+            Post.objects.create(author=self.user1, body="Test Post Body 2"),
+        ]
+        self.comments = [
+            Comment.objects.create(author=self.user2, post=self.posts[0], body="Test Comment Body"),
+            Comment.objects.create(author=self.user1, post=self.posts[1], body="Other Comment Body"),
+        ]
+        self.user1.like_post(self.posts[1])
+        self.user1.like_comment(self.comments[0])
+
+    def get_request(self, user=None):
+        request = APIRequestFactory().get("/api/core/posts/")
+        if user is not None:
+            force_authenticate(request, user=user)
+        return Request(request)
+
+    def render(self, data):
+        return json.loads(JSONEncoder().encode(data))
+
+    def assert_equivalent(self, serializer_class, values_serializer_class, queryset, user=None):
+        request = self.get_request(user)
+        expected = serializer_class(list(queryset), many=True, context={"request": request}).data
+        rows = list(values_serializer_class.values(queryset))
+        actual = values_serializer_class({"request": request}).serialize(rows)
+        self.assertEqual(self.render(actual), self.render(expected))
+        # the validators of the rows are those of the instances, so the ETags don't change with the serializer.
+        self.assertEqual(
+            compute_validators(request, rows, row_serializer=values_serializer_class()),
+            compute_validators(request, list(queryset)),
+        )
+
+    def test_posts(self):
+        queryset = Post.objects.for_listing().order_by("pk")
+        self.assert_equivalent(PostSerializer, PostValuesSerializer, queryset)
+        self.assert_equivalent(PostSerializer, PostValuesSerializer, queryset, user=self.user1)
+
+    def test_comments(self):
+        queryset = Comment.objects.for_listing().order_by("pk")
+        self.assert_equivalent(CommentSerializer, CommentValuesSerializer, queryset)
+        self.assert_equivalent(CommentSerializer, CommentValuesSerializer, queryset, user=self.user1)
+
+    def test_users(self):
+        queryset = User.objects.order_by("pk")
+        self.assert_equivalent(UserSerializer, UserValuesSerializer, queryset, user=self.user1)
+
+    @override_settings(DEBUG=True)
+    def test_users_in_debug(self):
+        queryset = User.objects.order_by("pk")
+        self.assert_equivalent(UserSerializer, UserValuesSerializer, queryset, user=self.user1)
+
+    @override_settings(DEBUG=True)
+    def test_users_in_debug_without_a_request(self):
+        rows = list(UserValuesSerializer.values(User.objects.order_by("pk")))
+        data = UserValuesSerializer().serialize(rows)
+        self.assertEqual(data[1]["avatar"], "/media/user_2/avatar.png")
+
+    def test_likes_are_looked_up_with_a_single_query(self):
+        request = self.get_request(self.user1)
+        rows = list(PostValuesSerializer.values(Post.objects.for_listing().order_by("pk")))
+        with self.assertNumQueries(1):
+            data = PostValuesSerializer({"request": request}).serialize(rows)
+        self.assertEqual([post["liked"] for post in data], [False, True, False])
@@ -0,0 +1,69 @@
+import json
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.users.models import User
+from core.posts.models import Post
+from core.comments.models import Comment
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class StreamingExportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.superuser = User.objects.create_superuser(email="admin@gmail.com", username="admin_user", password="admin_password", first_name="Admin", last_name="User")
+        self.client.force_authenticate(self.superuser)
+        self.posts = [Post.objects.create(author=self.user, body=f"Test Post Body {index}") for index in range(5)]
+        for post in self.posts:
+            Comment.objects.create(author=self.user, post=post, body="Test Comment Body")
+
+    def read(self, response):
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_export_posts_as_ndjson(self):
+        response = self.client.get("/api/core/posts/?export=ndjson")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        posts = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([post["id"] for post in posts], [post.public_id.hex for post in reversed(self.posts)])
+        self.assertEqual(posts[0]["author"]["username"], "test_user")
+
+    def test_export_posts_as_json(self):
+        response = self.client.get("/api/core/posts/?export=json")
+        self.assertEqual(response["Content-Type"], "application/json")
+        posts = json.loads(self.read(response))
+        self.assertEqual(len(posts), 5)
+
+    def test_export_with_invalid_format(self):
+        response = self.client.get("/api/core/posts/?export=xml")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_every_comment_as_superuser(self):
+        response = self.client.get(f"/api/core/posts/{self.posts[0].public_id}/comment/?export=json")
+        comments = json.loads(self.read(response))
+        self.assertEqual(len(comments), 5)
+
+    def test_export_every_post_is_staff_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/core/posts/?export=json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(None)
+        response = self.client.get("/api/core/posts/?export=json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        # authors can still export their own posts.
+        self.client.force_authenticate(self.user)
+        response = self.client.get(f"/api/core/posts/?author_public_id={self.user.public_id}&export=json")
+        self.assertEqual(len(json.loads(self.read(response))), 5)
+
+    def test_exports_are_rate_limited(self):
+        url = f"/api/core/posts/?author_public_id={self.user.public_id}&export=ndjson"
+        self.client.force_authenticate(self.user)
+        for _ in range(10):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # the listing itself isn't limited.
+        response = self.client.get(f"/api/core/posts/?author_public_id={self.user.public_id}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -4,4 +4,5 @@ urlpatterns = [
     path('core/users/', include('core.users.urls')),
     path('core/auth/', include('core.auth.urls')),
     path('core/posts/', include('core.posts.urls')),
+    path('core/search/', include('core.search.urls')),
 ]
@@ -1,7 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, pre_delete
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core.users'
     label = 'core_users'
+
+    def ready(self):
+        from core.abstract.conditional import register_validator_version
+        from core.abstract.models import invalidate_deleted_object
+        from core.users.like_buffer import buffered_likes_version
+        from core.users.models import User, release_likes
+
+        # The denormalized counters follow every deletion, including queryset and cascade deletes (see core.users.models).
+        pre_delete.connect(release_likes, sender=User, dispatch_uid="release_likes")
+        # So do the caches, including the cached authenticated user (see core.abstract.models).
+        post_delete.connect(invalidate_deleted_object, sender=User, dispatch_uid="invalidate_deleted_user")
+        # Buffered likes change like counts and states without touching the rows, so they are part of the ETags.
+        register_validator_version(buffered_likes_version)
@@ -0,0 +1,435 @@
+import atexit
+import logging
+import threading
+import uuid
+from collections import Counter, defaultdict
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+from core.abstract.object_cache import invalidate_objects
+
+
+logger = logging.getLogger(__name__)
+
+# Write-behind likes. When LIKE_WRITE_BEHIND is on, liking or unliking only records the new state of the (user, target)
+# pair in a buffer, together with the change it makes to the target's counter, instead of writing to the like table and
+# the counter of the target, which every fan of a viral post would otherwise be contending for. Reads overlay the buffer
+# on the database, so a like is seen as soon as it is recorded. A flusher periodically folds the buffered states into
+# the like tables and the counters with a few batched statements.
+# Buffered likes are keyed by their kind, the name of the liked model ("post" or "comment"), mapped here to the
+# many-to-many field of the user that stores them.
+LIKE_RELATIONS = {"post": "posts_liked", "comment": "comments_liked"}
+
+
+class LocalLikeBuffer:
+    """
+    In-process stand-in for the Redis like buffer, used in tests and single-process development.
+    Every instance shares the same data. States are recorded into a pending layer, which a flush moves into a flushing
+    layer while it writes it to the database; reads look at both, so nothing disappears from them during a flush.
+    """
+    _data = {"pending": {}, "deltas": Counter(), "flushing": {}, "flushing_deltas": Counter(), "version": 0}
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+
+    def record(self, kind, user_id, target_id, liked, stored=None):
+        """
+        Record that the user likes (or doesn't like) the target and return True if this changes the state seen by readers
+        (which then moves the target's pending counter delta). The previous state is the buffered one, or else `stored`,
+        the state found in the database: when neither is known, nothing is recorded and None is returned, so that the
+        caller reads the database and records again. The database is only read once the buffer is known to be silent on
+        the pair, so a flush writing it in between can't make the new state be compared with a stale one.
+        """
+        key = (kind, user_id, target_id)
+        with self._lock:
+            previous = self._data["pending"].get(key, self._data["flushing"].get(key, stored))
+            if previous is None:
+                return None
+            self._data["pending"][key] = liked
+            if previous == liked:
+                return False
+            self._data["deltas"][(kind, target_id)] += 1 if liked else -1
+            self._data["version"] += 1
+            return True
+
+    def states(self, kind, user_id, target_ids):
+        """Return the buffered like states of the user on `target_ids`, by target id."""
+        states = {}
+        with self._lock:
+            for target_id in target_ids:
+                key = (kind, user_id, target_id)
+                if key in self._data["pending"]:
+                    states[target_id] = self._data["pending"][key]
+                elif key in self._data["flushing"]:
+                    states[target_id] = self._data["flushing"][key]
+        return states
+
+    def deltas(self, kind, target_ids):
+        """Return the buffered changes to the counters of `target_ids`, by target id (targets without any are left out)."""
+        deltas = {}
+        with self._lock:
+            for target_id in target_ids:
+                delta = self._data["deltas"][(kind, target_id)] + self._data["flushing_deltas"][(kind, target_id)]
+                if delta:
+                    deltas[target_id] = delta
+        return deltas
+
+    def version(self):
+        """Return a number that changes whenever the buffered states do, so that it can be part of an ETag."""
+        return self._data["version"]
+
+    def take(self):
+        """
+        Move the pending states into the flushing layer (unless an interrupted flush left it non-empty, in which case
+        it is flushed again) and return them as `(kind, user_id, target_id, liked)` tuples.
+        """
+        with self._lock:
+            if not self._data["flushing"]:
+                self._data.update(
+                    flushing=self._data["pending"], flushing_deltas=self._data["deltas"], pending={}, deltas=Counter()
+                )
+            return [(*key, liked) for key, liked in self._data["flushing"].items()]
+
+    def release(self):
+        """Drop the flushing layer, once it has been written to the database."""
+        with self._lock:
+            self._data.update(flushing={}, flushing_deltas=Counter())
+            self._data["version"] += 1
+
+    def acquire_flush(self):
+        """Return True if the caller may flush the buffer, i.e. no other flush is running."""
+        return self._flush_lock.acquire(blocking=False)
+
+    def release_flush(self):
+        self._flush_lock.release()
+
+    def __len__(self):
+        return len(self._data["pending"]) + len(self._data["flushing"])
+
+    def clear(self):
+        with self._lock:
+            self._data.update(pending={}, deltas=Counter(), flushing={}, flushing_deltas=Counter())
+
+
+class RedisLikeBuffer:
+    """
+    Like buffer stored in Redis (through the django-redis connection of the default cache), shared by every web process.
+    The states and the counter deltas of each layer are two hashes, updated together by Lua scripts so that a flush
+    always takes the deltas that go with the states it writes.
+    """
+    prefix = "like_buffer"
+    record_script = """
+        local previous = redis.call('HGET', KEYS[1], ARGV[1])
+        if not previous then previous = redis.call('HGET', KEYS[2], ARGV[1]) end
+        if not previous then
+            if ARGV[3] == '' then return -1 end
+            previous = ARGV[3]
+        end
+        redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+        if previous == ARGV[2] then return 0 end
+        redis.call('HINCRBY', KEYS[3], ARGV[4], ARGV[2] == '1' and 1 or -1)
+        redis.call('INCR', KEYS[4])
+        return 1
+    """
+    release_flush_script = """
+        if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+        return 0
+    """
+    take_script = """
+        if redis.call('EXISTS', KEYS[3]) == 0 then
+            if redis.call('EXISTS', KEYS[1]) == 1 then redis.call('RENAME', KEYS[1], KEYS[3]) end
+            if redis.call('EXISTS', KEYS[2]) == 1 then redis.call('RENAME', KEYS[2], KEYS[4]) end
+        end
+        return redis.call('HGETALL', KEYS[3])
+    """
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection("default")
+        self.keys = {
+            name: f"{self.prefix}:{name}" for name in ("pending", "deltas", "flushing", "flushing_deltas", "version", "flush_lock")
+        }
+
+    def record(self, kind, user_id, target_id, liked, stored=None):
+        keys = self.keys
+        changed = self.client.eval(
+            self.record_script,
+            4,
+            keys["pending"], keys["flushing"], keys["deltas"], keys["version"],
+            f"{kind}:{user_id}:{target_id}", int(liked), "" if stored is None else int(stored), f"{kind}:{target_id}",
+        )
+        return None if changed == -1 else bool(changed)
+
+    def states(self, kind, user_id, target_ids):
+        target_ids = list(target_ids)
+        if not target_ids:
+            return {}
+        fields = [f"{kind}:{user_id}:{target_id}" for target_id in target_ids]
+        pipeline = self.client.pipeline()
+        pipeline.hmget(self.keys["pending"], fields)
+        pipeline.hmget(self.keys["flushing"], fields)
+        pending, flushing = pipeline.execute()
+        states = {}
+        for target_id, pending_state, flushing_state in zip(target_ids, pending, flushing):
+            state = pending_state if pending_state is not None else flushing_state
+            if state is not None:
+                states[target_id] = state == b"1"
+        return states
+
+    def deltas(self, kind, target_ids):
+        target_ids = list(target_ids)
+        if not target_ids:
+            return {}
+        fields = [f"{kind}:{target_id}" for target_id in target_ids]
+        pipeline = self.client.pipeline()
+        pipeline.hmget(self.keys["deltas"], fields)
+        pipeline.hmget(self.keys["flushing_deltas"], fields)
+        pending, flushing = pipeline.execute()
+        deltas = {}
+        for target_id, pending_delta, flushing_delta in zip(target_ids, pending, flushing):
+            delta = int(pending_delta or 0) + int(flushing_delta or 0)
+            if delta:
+                deltas[target_id] = delta
+        return deltas
+
+    def version(self):
+        return int(self.client.get(self.keys["version"]) or 0)
+
+    def take(self):
+        keys = self.keys
+        flat = self.client.eval(self.take_script, 4, keys["pending"], keys["deltas"], keys["flushing"], keys["flushing_deltas"])
+        events = []
+        for field, state in zip(flat[::2], flat[1::2]):
+            kind, user_id, target_id = field.decode().split(":")
+            events.append((kind, int(user_id), int(target_id), state == b"1"))
+        return events
+
+    def release(self):
+        pipeline = self.client.pipeline()
+        pipeline.delete(self.keys["flushing"], self.keys["flushing_deltas"])
+        pipeline.incr(self.keys["version"])
+        pipeline.execute()
+
+    def acquire_flush(self):
+        # The lock expires on its own, so a flusher that died holding it doesn't stop the others for good. It holds a
+        # token of its owner, so that a flush outliving it can't release the lock another flusher took since.
+        token = uuid.uuid4().hex
+        if not self.client.set(self.keys["flush_lock"], token, nx=True, ex=settings.LIKE_FLUSH_LOCK_TIMEOUT):
+            return False
+        self.flush_token = token
+        return True
+
+    def release_flush(self):
+        self.client.eval(self.release_flush_script, 1, self.keys["flush_lock"], self.flush_token)
+
+    def __len__(self):
+        return self.client.hlen(self.keys["pending"]) + self.client.hlen(self.keys["flushing"])
+
+    def clear(self):
+        self.client.delete(*(self.keys[name] for name in ("pending", "deltas", "flushing", "flushing_deltas")))
+
+
+def get_like_table(kind):
+    """Return the like table of `kind` (its through model), the liked model, and the columns of the user and of the target."""
+    field = apps.get_model("core_users", "User")._meta.get_field(LIKE_RELATIONS[kind])
+    through = field.remote_field.through
+    user_attname = through._meta.get_field(field.m2m_field_name()).attname
+    target_attname = through._meta.get_field(field.m2m_reverse_field_name()).attname
+    return through, field.related_model, user_attname, target_attname
+
+
+def get_like_buffer():
+    """Return the like buffer of the backend selected by the LIKE_BUFFER_BACKEND setting."""
+    return import_string(settings.LIKE_BUFFER_BACKEND)()
+
+
+def buffered_like_states(kind, user_id, target_ids):
+    """Return the buffered like states of the user on `target_ids` by target id (nothing when likes aren't buffered)."""
+    if not settings.LIKE_WRITE_BEHIND:
+        return {}
+    return get_like_buffer().states(kind, user_id, target_ids)
+
+
+def buffered_like_deltas(kind, target_ids):
+    """Return the buffered changes to the like counters of `target_ids` by target id (nothing when likes aren't buffered)."""
+    if not settings.LIKE_WRITE_BEHIND:
+        return {}
+    return get_like_buffer().deltas(kind, target_ids)
+
+
+def buffered_likes_version():
+    """Return the version of the buffered likes, or None when likes aren't buffered."""
+    if not settings.LIKE_WRITE_BEHIND:
+        return None
+    return get_like_buffer().version()
+
+
+def flush_like_buffer(batch_size=None):
+    """
+    Fold the buffered likes into the like tables and the like counters, in a single transaction, and return the number of
+    buffered states written. Nothing is done (and 0 returned) while another process is flushing.
+    """
+    buffer = get_like_buffer()
+    if not buffer.acquire_flush():
+        return 0
+    try:
+        events = buffer.take()
+        if events:
+            with transaction.atomic():
+                write_likes(events, batch_size or settings.LIKE_FLUSH_BATCH_SIZE)
+        # The flushed states stay visible to readers until they can be read from the database.
+        buffer.release()
+        return len(events)
+    finally:
+        buffer.release_flush()
+
+
+def write_likes(events, batch_size):
+    """
+    Write the `(kind, user_id, target_id, liked)` states of `events` to the like tables, `batch_size` pairs at a time,
+    with one SELECT of the existing likes, one INSERT and one DELETE per batch, then move the counters of the targets
+    by the rows actually inserted or deleted (with one UPDATE per distinct change) and invalidate the cached targets.
+    """
+    # core.users.liked_sets reads the like tables through this module.
+    from core.users.liked_sets import update_liked_set
+
+    states_by_kind = defaultdict(dict)
+    for kind, user_id, target_id, liked in events:
+        states_by_kind[kind][(user_id, target_id)] = liked
+    for kind, states in states_by_kind.items():
+        through, target_model, user_attname, target_attname = get_like_table(kind)
+        changes = Counter()
+        items = list(states.items())
+        for start in range(0, len(items), batch_size):
+            batch = dict(items[start:start + batch_size])
+            existing = {
+                (user_id, target_id): pk
+                for pk, user_id, target_id in through.objects.filter(
+                    **{f"{user_attname}__in": {user_id for user_id, _ in batch}, f"{target_attname}__in": {target_id for _, target_id in batch}}
+                ).values_list("pk", user_attname, target_attname)
+                if (user_id, target_id) in batch
+            }
+            # Only the rows the statements report as inserted or deleted move the counters, whatever happened concurrently.
+            inserted = insert_likes(
+                through, user_attname, target_attname, [pair for pair, liked in batch.items() if liked and pair not in existing]
+            )
+            deleted = delete_likes(
+                through, user_attname, target_attname, [existing[pair] for pair, liked in batch.items() if not liked and pair in existing]
+            )
+            changes.update(target_id for _, target_id in inserted)
+            changes.subtract(target_id for _, target_id in deleted)
+            for pairs, liked in ((inserted, True), (deleted, False)):
+                target_ids_by_user = defaultdict(list)
+                for user_id, target_id in pairs:
+                    target_ids_by_user[user_id].append(target_id)
+                for user_id, target_ids in target_ids_by_user.items():
+                    update_liked_set(kind, user_id, target_ids, liked)
+        targets_by_change = defaultdict(list)
+        for target_id, change in changes.items():
+            if change:
+                targets_by_change[change].append(target_id)
+        for change, target_ids in targets_by_change.items():
+            target_model.objects.filter(pk__in=target_ids).update(likes_count=F("likes_count") + change)
+        invalidate_like_targets(target_model, [target_id for target_ids in targets_by_change.values() for target_id in target_ids])
+
+
+def insert_likes(through, user_attname, target_attname, pairs):
+    """
+    Insert the `(user_id, target_id)` likes of `pairs` into the like table `through` with a single INSERT ... SELECT ...
+    ON CONFLICT DO NOTHING, and return the pairs that were actually inserted (those liked concurrently are left out).
+    The pairs whose user or target was deleted since they were buffered are left out too: their rows would break the
+    foreign keys, failing the whole flush, and every later one with it since the flushing layer is flushed again.
+    """
+    if not pairs:
+        return []
+    quote = connection.ops.quote_name
+    columns = {field.attname: quote(field.column) for field in through._meta.concrete_fields}
+    exists = [
+        f"EXISTS (SELECT 1 FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} = pairs.{column})"
+        for model, column in (
+            (through._meta.get_field(user_attname).related_model, "column1"),
+            (through._meta.get_field(target_attname).related_model, "column2"),
+        )
+    ]
+    placeholders = ", ".join(["(%s, %s)"] * len(pairs))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(through._meta.db_table)} ({columns[user_attname]}, {columns[target_attname]}) "
+            f"SELECT pairs.column1, pairs.column2 FROM (VALUES {placeholders}) AS pairs WHERE {' AND '.join(exists)} "
+            f"ON CONFLICT DO NOTHING RETURNING {columns[user_attname]}, {columns[target_attname]}",
+            [value for pair in pairs for value in pair],
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def delete_likes(through, user_attname, target_attname, pks):
+    """
+    Delete the likes with primary keys `pks` from the like table `through` with a single DELETE, and return the
+    `(user_id, target_id)` pairs that were actually deleted (those unliked concurrently are left out).
+    """
+    if not pks:
+        return []
+    quote = connection.ops.quote_name
+    columns = {field.attname: quote(field.column) for field in through._meta.concrete_fields}
+    placeholders = ", ".join(["%s"] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote(through._meta.db_table)} WHERE {columns[through._meta.pk.attname]} IN ({placeholders}) "
+            f"RETURNING {columns[user_attname]}, {columns[target_attname]}",
+            list(pks),
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def invalidate_like_targets(target_model, target_ids):
+    """
+    Invalidate the cached objects of the `target_ids` of `target_model` whose like counters moved. The cached listings
+    read the counters and the `liked` states again on every hit (see core.abstract.conditional), so they stay.
+    """
+    if target_ids:
+        invalidate_objects(target_model, target_ids)
+
+
+class LikeBufferFlusher(threading.Thread):
+    """Background thread of a web process that flushes the like buffer every `interval` seconds, and once more on exit."""
+
+    def __init__(self, interval):
+        super().__init__(name="like-buffer-flusher", daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        try:
+            flush_like_buffer()
+        except Exception:
+            # The states stay in the flushing layer and are written by the next flush.
+            logger.exception("Flushing the like buffer failed")
+        finally:
+            close_old_connections()
+
+    def stop(self):
+        self.stopped.set()
+        self.flush()
+
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def ensure_like_buffer_flusher():
+    """Start the flusher thread of this process, unless it is running already or disabled with LIKE_FLUSH_INTERVAL = 0."""
+    global _flusher
+    if settings.LIKE_FLUSH_INTERVAL <= 0 or _flusher is not None:
+        return
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = LikeBufferFlusher(settings.LIKE_FLUSH_INTERVAL)
+            _flusher.start()
+            # Whatever is still buffered when the process exits is written before it goes.
+            atexit.register(_flusher.stop)
@@ -0,0 +1,292 @@
+import bisect
+import threading
+import time
+from array import array
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from core.abstract.bloom import BloomFilter, bloom_hashes
+from core.users.like_buffer import LIKE_RELATIONS, get_like_table
+
+# Liked sets. The ids of the posts (or comments) a user has liked are cached per user, so that the `liked` field of a
+# page of rows is answered by a single lookup in the cache instead of a query. A liked set is loaded lazily, with one
+# query, the first time it is needed, and kept up to date as the user likes and unlikes (after the change is committed).
+# Users who liked more than LIKED_SET_MAX_SIZE targets get a Bloom filter of their likes instead of the exact set: it
+# tells most targets apart without a query, and only the few ids it may contain are checked against the like table.
+# Every change to a liked set moves its generation, and a set loaded from the database is only stored if its generation
+# didn't move meanwhile, so a like committed during the load can't be lost.
+# Only likes written to the database are cached; buffered ones (see core.users.like_buffer) are overlaid by the readers.
+
+
+class LocalLikedSets:
+    """
+    In-process stand-in for the Redis liked sets, used in tests and single-process development.
+    Every instance shares the same data. An exact set is a sorted array of ids, looked up by bisection.
+    """
+    _data = {"entries": {}, "generations": {}}
+    _lock = threading.Lock()
+
+    def _entry(self, key):
+        entry = self._data["entries"].get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._data["entries"][key]
+            return None
+        return entry
+
+    def generation(self, kind, user_id):
+        """Return the generation of the liked set of the user, which every change to it moves."""
+        return self._data["generations"].get((kind, user_id), 0)
+
+    def store(self, kind, user_id, generation, ids=None, bloom=None):
+        """
+        Store the exact set of `ids` liked by the user, or the `bloom` filter of them, unless the set changed since
+        `generation` was read. Return True if it was stored.
+        """
+        key = (kind, user_id)
+        with self._lock:
+            if self._data["generations"].get(key, 0) != generation:
+                return False
+            members = array("q", sorted(ids)) if bloom is None else bloom
+            self._data["entries"][key] = (time.monotonic() + settings.LIKED_SET_TIMEOUT, members)
+            return True
+
+    def lookup(self, kind, user_id, target_ids):
+        """
+        Return None if the liked set of the user isn't loaded. Otherwise, return the `target_ids` it contains, and
+        the ones it may contain (when it is a Bloom filter), as two sets.
+        """
+        with self._lock:
+            entry = self._entry((kind, user_id))
+            if entry is None:
+                return None
+            members = entry[1]
+            if isinstance(members, BloomFilter):
+                return set(), {target_id for target_id in target_ids if target_id in members}
+            liked_ids = set()
+            for target_id in target_ids:
+                index = bisect.bisect_left(members, target_id)
+                if index < len(members) and members[index] == target_id:
+                    liked_ids.add(target_id)
+            return liked_ids, set()
+
+    def add(self, kind, user_id, target_ids):
+        self._change(kind, user_id, target_ids, True)
+
+    def discard(self, kind, user_id, target_ids):
+        self._change(kind, user_id, target_ids, False)
+
+    def _change(self, kind, user_id, target_ids, liked):
+        key = (kind, user_id)
+        with self._lock:
+            self._data["generations"][key] = self._data["generations"].get(key, 0) + 1
+            entry = self._entry(key)
+            if entry is None:
+                return
+            members = entry[1]
+            for target_id in target_ids:
+                if isinstance(members, BloomFilter):
+                    # Ids can't be removed from a Bloom filter: an unliked id is one more false positive.
+                    if liked:
+                        members.add(target_id)
+                    continue
+                index = bisect.bisect_left(members, target_id)
+                present = index < len(members) and members[index] == target_id
+                if liked and not present:
+                    members.insert(index, target_id)
+                elif not liked and present:
+                    del members[index]
+
+    def forget(self, kind, user_id):
+        """Drop the liked set of the user, which is loaded again when it is next needed."""
+        key = (kind, user_id)
+        with self._lock:
+            self._data["generations"][key] = self._data["generations"].get(key, 0) + 1
+            self._data["entries"].pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data["entries"].clear()
+
+
+class RedisLikedSets:
+    """
+    Liked sets stored in Redis (through the django-redis connection of the default cache), shared by every web process.
+    An exact set is a Redis set (with a 0 sentinel, so that a user without likes still has one), a Bloom filter a string
+    of bits whose positions are computed by the Lua scripts from the two hashes of every id, so that each operation is a
+    single round trip.
+    """
+    prefix = "liked_set"
+    lookup_script = """
+        local found = {}
+        if redis.call('EXISTS', KEYS[1]) == 1 then
+            for index = 2, #ARGV, 3 do
+                table.insert(found, redis.call('SISMEMBER', KEYS[1], ARGV[index]))
+            end
+            return {1, found}
+        end
+        local size = redis.call('STRLEN', KEYS[2]) * 8
+        if size == 0 then return {0, found} end
+        for index = 2, #ARGV, 3 do
+            local first, second, member = tonumber(ARGV[index + 1]), tonumber(ARGV[index + 2]), 1
+            for hash = 0, tonumber(ARGV[1]) - 1 do
+                if redis.call('GETBIT', KEYS[2], (first + hash * second) % size) == 0 then
+                    member = 0
+                    break
+                end
+            end
+            table.insert(found, member)
+        end
+        return {2, found}
+    """
+    store_script = """
+        if tonumber(redis.call('GET', KEYS[3]) or '0') ~= tonumber(ARGV[2]) then return 0 end
+        redis.call('DEL', KEYS[1], KEYS[2])
+        if ARGV[3] == 'bloom' then
+            redis.call('SET', KEYS[2], ARGV[4], 'EX', ARGV[1])
+            return 1
+        end
+        redis.call('SADD', KEYS[1], 0)
+        for start = 4, #ARGV, 1000 do
+            redis.call('SADD', KEYS[1], unpack(ARGV, start, math.min(start + 999, #ARGV)))
+        end
+        redis.call('EXPIRE', KEYS[1], ARGV[1])
+        return 1
+    """
+    change_script = """
+        redis.call('INCR', KEYS[3])
+        redis.call('EXPIRE', KEYS[3], ARGV[1])
+        if redis.call('EXISTS', KEYS[1]) == 1 then
+            for index = 4, #ARGV, 3 do
+                if ARGV[2] == '1' then
+                    redis.call('SADD', KEYS[1], ARGV[index])
+                else
+                    redis.call('SREM', KEYS[1], ARGV[index])
+                end
+            end
+        elseif ARGV[2] == '1' and redis.call('EXISTS', KEYS[2]) == 1 then
+            local size = redis.call('STRLEN', KEYS[2]) * 8
+            for index = 4, #ARGV, 3 do
+                local first, second = tonumber(ARGV[index + 1]), tonumber(ARGV[index + 2])
+                for hash = 0, tonumber(ARGV[3]) - 1 do
+                    redis.call('SETBIT', KEYS[2], (first + hash * second) % size, 1)
+                end
+            end
+        end
+    """
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection("default")
+        self.num_hashes = bloom_hashes(settings.LIKED_SET_BLOOM_ERROR_RATE)
+
+    def keys(self, kind, user_id):
+        return [f"{self.prefix}:{kind}:{user_id}:{name}" for name in ("ids", "bloom", "generation")]
+
+    def members(self, target_ids):
+        """Return the `id, first hash, second hash` arguments of the scripts for `target_ids`."""
+        return [value for target_id in target_ids for value in (target_id, *BloomFilter.hashes(target_id))]
+
+    def generation(self, kind, user_id):
+        return int(self.client.get(self.keys(kind, user_id)[2]) or 0)
+
+    def store(self, kind, user_id, generation, ids=None, bloom=None):
+        arguments = ["bloom", bytes(bloom.bits)] if bloom is not None else ["ids", *ids]
+        stored = self.client.eval(
+            self.store_script, 3, *self.keys(kind, user_id), settings.LIKED_SET_TIMEOUT, generation, *arguments
+        )
+        return bool(stored)
+
+    def lookup(self, kind, user_id, target_ids):
+        target_ids = list(target_ids)
+        mode, found = self.client.eval(
+            self.lookup_script, 2, *self.keys(kind, user_id)[:2], self.num_hashes, *self.members(target_ids)
+        )
+        if mode == 0:
+            return None
+        found_ids = {target_id for target_id, member in zip(target_ids, found) if member}
+        return (found_ids, set()) if mode == 1 else (set(), found_ids)
+
+    def add(self, kind, user_id, target_ids):
+        self._change(kind, user_id, target_ids, True)
+
+    def discard(self, kind, user_id, target_ids):
+        self._change(kind, user_id, target_ids, False)
+
+    def _change(self, kind, user_id, target_ids, liked):
+        self.client.eval(
+            self.change_script, 3, *self.keys(kind, user_id),
+            settings.LIKED_SET_TIMEOUT, int(liked), self.num_hashes, *self.members(target_ids),
+        )
+
+    def forget(self, kind, user_id):
+        ids_key, bloom_key, generation_key = self.keys(kind, user_id)
+        pipeline = self.client.pipeline()
+        pipeline.incr(generation_key)
+        pipeline.expire(generation_key, settings.LIKED_SET_TIMEOUT)
+        pipeline.delete(ids_key, bloom_key)
+        pipeline.execute()
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(key)
+
+
+def get_liked_sets():
+    """Return the liked sets of the backend selected by the LIKED_SET_BACKEND setting."""
+    return import_string(settings.LIKED_SET_BACKEND)()
+
+
+def load_liked_set(liked_sets, kind, user_id):
+    """
+    Load the ids of every target of `kind` the user has liked with one query, cache them (as a Bloom filter past
+    LIKED_SET_MAX_SIZE ids) and return them.
+    """
+    through, _, user_attname, target_attname = get_like_table(kind)
+    generation = liked_sets.generation(kind, user_id)
+    ids = set(through.objects.filter(**{user_attname: user_id}).values_list(target_attname, flat=True))
+    if len(ids) > settings.LIKED_SET_MAX_SIZE:
+        # The filter is sized for twice the current likes, so that those added later don't degrade it too fast.
+        bloom = BloomFilter.for_capacity(2 * len(ids), settings.LIKED_SET_BLOOM_ERROR_RATE)
+        for target_id in ids:
+            bloom.add(target_id)
+        liked_sets.store(kind, user_id, generation, bloom=bloom)
+    else:
+        liked_sets.store(kind, user_id, generation, ids=ids)
+    return ids
+
+
+def liked_target_ids(kind, user_id, target_ids):
+    """
+    Return the set of the `target_ids` of `kind` the user has liked in the database, with a single lookup in their liked
+    set, plus one query when it must be loaded or when its Bloom filter may contain some of them.
+    """
+    target_ids = set(target_ids)
+    if not target_ids:
+        return set()
+    liked_sets = get_liked_sets()
+    found = liked_sets.lookup(kind, user_id, target_ids)
+    if found is None:
+        return load_liked_set(liked_sets, kind, user_id) & target_ids
+    liked_ids, candidate_ids = found
+    if candidate_ids:
+        through, _, user_attname, target_attname = get_like_table(kind)
+        likes = through.objects.filter(**{user_attname: user_id, f"{target_attname}__in": candidate_ids})
+        liked_ids |= set(likes.values_list(target_attname, flat=True))
+    return liked_ids
+
+
+def update_liked_set(kind, user_id, target_ids, liked):
+    """Add `target_ids` to the liked set of the user (or remove them when `liked` is False) once the change is committed."""
+    target_ids = list(target_ids)
+    if target_ids:
+        transaction.on_commit(
+            lambda: (get_liked_sets().add if liked else get_liked_sets().discard)(kind, user_id, target_ids)
+        )
+
+
+def forget_liked_sets(user_id):
+    """Drop every liked set of the user."""
+    liked_sets = get_liked_sets()
+    for kind in LIKE_RELATIONS:
+        liked_sets.forget(kind, user_id)
@@ -0,0 +1,77 @@
+from rest_framework import serializers
+from core.users.models import User
+from core.users.serializers import UserSerializer
+
+
+class AuthorLoader:
+    """
+    Request-scoped identity map for the authors embedded in serialized posts and comments.
+    Authors that weren't joined onto their rows are fetched for a whole page in one query,
+    and each distinct author is serialized only once however many rows they wrote.
+    """
+    context_attribute = "_author_loader"
+
+    def __init__(self, context):
+        self.context = context
+        self._authors = {}
+        self._representations = {}
+
+    @classmethod
+    def for_context(cls, context):
+        """Return the loader shared by every serializer of the current request (or of this context when there is no request)."""
+        request = context.get("request", None)
+        if request is None:
+            return context.setdefault(cls.context_attribute, cls(context))
+        loader = getattr(request, cls.context_attribute, None)
+        if loader is None:
+            loader = cls(context)
+            setattr(request, cls.context_attribute, loader)
+        return loader
+
+    @classmethod
+    def release(cls, context):
+        """Drop the loader of the current request, e.g. between the batches of a streamed export, to bound its memory."""
+        request = context.get("request", None)
+        if request is None:
+            context.pop(cls.context_attribute, None)
+        elif hasattr(request, cls.context_attribute):
+            delattr(request, cls.context_attribute)
+
+    def prime(self, instances):
+        """Load, in a single query, the authors of `instances` that are neither joined onto their rows nor already known."""
+        pending = []
+        for instance in instances:
+            if instance._meta.get_field("author").is_cached(instance):
+                self._authors.setdefault(instance.author_id, instance.author)
+            else:
+                pending.append(instance)
+        missing_ids = {instance.author_id for instance in pending} - self._authors.keys()
+        if missing_ids:
+            self._authors.update(User.objects.in_bulk(missing_ids))
+        # We attach the loaded authors to their rows so that the `author` slug field doesn't fetch them again one by one.
+        for instance in pending:
+            author = self._authors.get(instance.author_id)
+            if author is not None:
+                instance._meta.get_field("author").set_cached_value(instance, author)
+
+    def get_author(self, instance):
+        author = self._authors.get(instance.author_id)
+        if author is None:
+            author = self._authors[instance.author_id] = instance.author
+        return author
+
+    def represent(self, instance):
+        """Return the serialized author of `instance`, serializing each distinct author at most once."""
+        if instance.author_id not in self._representations:
+            self._representations[instance.author_id] = UserSerializer(self.get_author(instance), context=self.context).data
+        return self._representations[instance.author_id]
+
+
+
+class AuthorListSerializer(serializers.ListSerializer):
+    """List serializer that primes the request's `AuthorLoader` with the whole page before serializing its rows."""
+
+    def to_representation(self, data):
+        instances = list(data.all() if hasattr(data, "all") else data)
+        AuthorLoader.for_context(self.context).prime(instances)
+        return super().to_representation(instances)
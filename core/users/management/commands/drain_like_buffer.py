@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.users.like_buffer import flush_like_buffer, get_like_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Write every buffered like to the like tables and counters, e.g. before shutting the web processes down. "
+        "Waits for a flush already running elsewhere to finish."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Number of buffered likes written per batch of statements.")
+        parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for the buffer to be empty.")
+
+    def handle(self, *args, **options):
+        buffer = get_like_buffer()
+        deadline = time.monotonic() + options["timeout"]
+        drained = 0
+        # Likes recorded while we flush are drained as well, until the buffer is empty.
+        while len(buffer):
+            flushed = flush_like_buffer(options["batch_size"])
+            drained += flushed
+            if not flushed:
+                if time.monotonic() > deadline:
+                    raise CommandError(f"The like buffer still holds {len(buffer)} like(s) after {options['timeout']}s")
+                # Another process is flushing: let it finish.
+                time.sleep(0.1)
+        self.stdout.write(f"Drained {drained} buffered like(s)")
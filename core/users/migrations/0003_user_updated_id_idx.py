@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:20
+
+from django.db import migrations, models
+from core.abstract.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('core_users', '0002_counters'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['-updated', '-id'], name='user_updated_id_idx'),
+        ),
+    ]
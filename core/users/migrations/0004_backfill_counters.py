@@ -0,0 +1,23 @@
+from django.db import migrations
+from core.abstract.models import count_subquery, reconcile_counter
+
+
+def backfill_counters(apps, schema_editor):
+    # The counter was added with a default of 0: compute it from the posts that already exist.
+    User = apps.get_model("core_users", "User")
+    Post = apps.get_model("core_posts", "Post")
+    reconcile_counter(User, "posts_count", count_subquery(Post.objects.all(), "author"))
+
+
+class Migration(migrations.Migration):
+    # Each chunk of the backfill runs in its own transaction, so that it never locks the whole table.
+    atomic = False
+
+    dependencies = [
+        ('core_users', '0003_user_updated_id_idx'),
+        ('core_posts', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
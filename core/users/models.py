@@ -1,13 +1,26 @@
+from asgiref.sync import sync_to_async
 from django.db import models
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
+from django.db import connection, transaction
+from django.db.models import F
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import Http404
 import uuid
+from django.conf import settings
 from core.abstract.models import AbstractModel, AbstractManager
+from core.abstract.object_cache import invalidate_objects
+from core.abstract.signals import post_activity
+from core.auth.cache import forget_authenticated_user
+from core.auth.hashing import hash_password
+from core.users.like_buffer import (
+    LIKE_RELATIONS, buffered_like_deltas, buffered_like_states, ensure_like_buffer_flusher, get_like_buffer, get_like_table,
+    invalidate_like_targets,
+)
+from core.users.liked_sets import forget_liked_sets, liked_target_ids, update_liked_set
 
 
 def user_directory_path(instance, filename):
@@ -22,7 +35,24 @@ def user_directory_path(instance, filename):
 #   To use a custom manager, you must subclass the "models.Manager" class. The "BaseUserManager" also does this by default.
 #   Thus both "BaseUserManager" and AbstractManager subclass it in our code.
 #   However, BaseUserManager has two methods that are important. We use one here i.e "normalize_email".
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        Update the users as `QuerySet.update` does, then drop them from the caches `save` would have invalidated (the
+        cached authenticated users and objects), which deactivations and counter updates made this way never reach.
+        """
+        with transaction.atomic(using=self.db, savepoint=False):
+            user_ids = list(self.values_list("pk", flat=True))
+            updated = super().update(**kwargs)
+            forget_authenticated_user(*user_ids)
+            invalidate_objects(self.model, user_ids)
+        return updated
+
+
 class UserManager(BaseUserManager, AbstractManager):
+    def get_queryset(self):
+        return UserQuerySet(self.model, using=self._db)
+
     def create_user(self, email, username, password=None, **kwargs):
         """Create and return a `User` with an email, phone
         number, username and password."""
@@ -35,7 +65,8 @@ class UserManager(BaseUserManager, AbstractManager):
         user = self.model(
             username=username, email=self.normalize_email(email), **kwargs
         )  # Manager methods can access self.model to get the model class to which they’re attached.
-        user.set_password(password)
+        # The password is hashed in the bounded hashing pool (see core.auth.hashing), so registrations can't take every core.
+        user.password = hash_password(password)
         user.save(using=self._db)
 
         return user
@@ -79,6 +110,8 @@ class User(AbstractModel, AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_superuser = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
+    # Denormalized counter kept up to date when posts are created or deleted (see `reconcile_counters` to repair drift).
+    posts_count = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = "email"  # this means the email field will be used as the "unique identifier" of this custom user model as opposed to the default username field.
     REQUIRED_FIELDS = [
@@ -86,32 +119,204 @@ class User(AbstractModel, AbstractBaseUser, PermissionsMixin):
     ]  # list of the field names that will be prompted for when creating a user via the createsuperuser management command.
 
     objects = UserManager()
+    uncached_fields = ("password",)
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        # The cached authenticated user is dropped once the row is written (see invalidate_cached_objects).
+        super().save(*args, **kwargs)
+        if adding:
+            # A new account has no likes, whatever liked sets may still be cached under its id (e.g. after a database restore).
+            forget_liked_sets(self.pk)
+
+    def invalidate_cached_objects(self, update_fields=None):
+        super().invalidate_cached_objects(update_fields)
+        # Every save reaches the cached authenticated user, whose password and active state matter even when nothing else changed.
+        if self.pk is not None:
+            forget_authenticated_user(self.pk)
+
+    def get_cache_namespaces(self, update_fields=None):
+        # Logging in only touches columns that aren't part of the user representation, so it doesn't need to invalidate anything.
+        if update_fields is not None and set(update_fields) <= {"last_login", "password"}:
+            return []
+        return ["user"]
+
+    def get_validator_parts(self):
+        return super().get_validator_parts() + [self.posts_count]
 
     def like_post(self, post):
         """Like `post` if it hasn't been done yet"""
-        return self.posts_liked.add(post)
+        self._add_like(self.posts_liked, post, "post_id")
 
     def remove_liked_post(self, post):
         """Remove a like from a `post`"""
-        return self.posts_liked.remove(post)
+        self._remove_like(self.posts_liked, post, "post_id")
+
+    def react_to_post(self, public_id, liked):
+        """Like (or unlike, when `liked` is False) the post with `public_id` and return its `(liked, likes_count)` state"""
+        return self._react(self.posts_liked, public_id, liked)
 
     def has_liked_post(self, post):
         """Return True if the user has liked a `post`;
         else False"""
-        return self.posts_liked.filter(pk=post.pk).exists()
+        return self._has_liked(self.posts_liked, post)
+
+    def liked_post_ids(self, post_ids):
+        """Return the set of the `post_ids` the user has liked, found with a single lookup in their liked set."""
+        return self._liked_ids(self.posts_liked, post_ids)
+
+    async def aliked_post_ids(self, post_ids):
+        """Async counterpart of `liked_post_ids`."""
+        return await sync_to_async(self._liked_ids)(self.posts_liked, post_ids)
 
     def like_comment(self, comment):
         """Like `comment` if it hasn't been done yet"""
-        return self.comments_liked.add(comment)
+        self._add_like(self.comments_liked, comment, "comment_id")
 
     def remove_liked_comment(self, comment):
         """Remove a like from a `comment`"""
-        return self.comments_liked.remove(comment)
+        self._remove_like(self.comments_liked, comment, "comment_id")
+
+    def react_to_comment(self, public_id, liked):
+        """Like (or unlike, when `liked` is False) the comment with `public_id` and return its `(liked, likes_count)` state"""
+        return self._react(self.comments_liked, public_id, liked)
 
     def has_liked_comment(self, comment):
         """Return True if the user has liked a `comment`;
         else False"""
-        return self.comments_liked.filter(pk=comment.pk).exists()
+        return self._has_liked(self.comments_liked, comment)
+
+    def liked_comment_ids(self, comment_ids):
+        """Return the set of the `comment_ids` the user has liked, found with a single lookup in their liked set."""
+        return self._liked_ids(self.comments_liked, comment_ids)
+
+    async def aliked_comment_ids(self, comment_ids):
+        """Async counterpart of `liked_comment_ids`."""
+        return await sync_to_async(self._liked_ids)(self.comments_liked, comment_ids)
+
+    def _has_liked(self, related_manager, target):
+        return target.pk in self._liked_ids(related_manager, [target.pk])
+
+    def _liked_ids(self, related_manager, target_ids):
+        # The liked set of the user (see core.users.liked_sets) holds the likes written to the like table.
+        liked_ids = liked_target_ids(related_manager.target_field_name, self.pk, target_ids)
+        return self._apply_buffered_likes(related_manager, target_ids, liked_ids)
+
+    def _apply_buffered_likes(self, related_manager, target_ids, liked_ids):
+        """Overlay the buffered likes of the user on `target_ids` (see core.users.like_buffer) onto the `liked_ids` found in the like table."""
+        for target_id, liked in buffered_like_states(related_manager.target_field_name, self.pk, target_ids).items():
+            if liked:
+                liked_ids.add(target_id)
+            else:
+                liked_ids.discard(target_id)
+        return liked_ids
+
+    def _buffer_like(self, related_manager, target, liked):
+        """
+        Record the like (or unlike) of `target` in the like buffer instead of the like table, and return the like count
+        of the target as readers now see it. The cached target is invalidated when its state changes.
+        """
+        kind = related_manager.target_field_name
+        buffer = get_like_buffer()
+        changed = buffer.record(kind, self.pk, target.pk, liked)
+        if changed is None:
+            # Nothing is buffered for the pair, so the like table has its latest state.
+            stored = target.pk in liked_target_ids(kind, self.pk, [target.pk])
+            changed = buffer.record(kind, self.pk, target.pk, liked, stored)
+        if changed:
+            invalidate_like_targets(type(target), [target.pk])
+            self._record_like_activity(related_manager, target.pk, liked)
+        ensure_like_buffer_flusher()
+        return target.likes_count + buffered_like_deltas(kind, [target.pk]).get(target.pk, 0)
+
+    def _record_like_activity(self, related_manager, target_id, liked):
+        # Likes of posts (and unlikes, which take their weight back) feed the trending ranking (see core.abstract.signals).
+        if related_manager.target_field_name == "post":
+            post_activity.send(sender=type(self), post_ids=[target_id], activity="like", count=1 if liked else -1)
+
+    def _add_like(self, related_manager, target, target_field):
+        if settings.LIKE_WRITE_BEHIND:
+            self._buffer_like(related_manager, target, True)
+            return
+        # The counter is only incremented when a row was actually inserted, which keeps repeated likes idempotent.
+        with transaction.atomic():
+            _, created = related_manager.through.objects.get_or_create(user_id=self.pk, **{target_field: target.pk})
+            if created:
+                type(target).objects.filter(pk=target.pk).update(likes_count=F("likes_count") + 1)
+                invalidate_like_targets(type(target), [target.pk])
+                update_liked_set(related_manager.target_field_name, self.pk, [target.pk], True)
+                self._record_like_activity(related_manager, target.pk, True)
+        target.refresh_from_db(fields=["likes_count"])
+
+    def _remove_like(self, related_manager, target, target_field):
+        if settings.LIKE_WRITE_BEHIND:
+            self._buffer_like(related_manager, target, False)
+            return
+        with transaction.atomic():
+            deleted, _ = related_manager.through.objects.filter(user_id=self.pk, **{target_field: target.pk}).delete()
+            if deleted:
+                type(target).objects.filter(pk=target.pk).update(likes_count=F("likes_count") - deleted)
+                invalidate_like_targets(type(target), [target.pk])
+                update_liked_set(related_manager.target_field_name, self.pk, [target.pk], False)
+                self._record_like_activity(related_manager, target.pk, False)
+        target.refresh_from_db(fields=["likes_count"])
+
+    def _react(self, related_manager, public_id, liked):
+        """
+        Set the like of the user on the target with `public_id` in two statements: an INSERT ... ON CONFLICT DO NOTHING
+        (or a DELETE) on the like table, then an UPDATE moving the counter when a like row actually changed (or a plain SELECT
+        when it didn't) that reads the counter back. Nothing else is loaded, and repeating a reaction changes nothing.
+        Raise the target model's DoesNotExist if there is no target with `public_id`, and a ValidationError if it isn't a UUID.
+        With write-behind likes, the reaction is buffered instead (see `_buffer_like`).
+        """
+        target_model, through = related_manager.model, related_manager.through
+        # The key and the counter are all that is read back from the target.
+        fields = [field for field in target_model._meta.concrete_fields if field.primary_key or field.name == "likes_count"]
+        if settings.LIKE_WRITE_BEHIND:
+            target = target_model.objects.only(*[field.name for field in fields]).get(public_id=public_id)
+            return liked, self._buffer_like(related_manager, target, liked)
+        public_id_field = target_model._meta.get_field("public_id")
+        public_id = public_id_field.get_db_prep_value(public_id_field.to_python(public_id), connection)
+        quote = connection.ops.quote_name
+        like_table, target_table = quote(through._meta.db_table), quote(target_model._meta.db_table)
+        user_column = quote(through._meta.get_field(related_manager.source_field_name).column)
+        target_column = quote(through._meta.get_field(related_manager.target_field_name).column)
+        pk_column, public_id_column = quote(target_model._meta.pk.column), quote(public_id_field.column)
+        columns = ", ".join(quote(field.column) for field in fields)
+        likes_count_column = quote(target_model._meta.get_field("likes_count").column)
+        with transaction.atomic(), connection.cursor() as cursor:
+            if liked:
+                cursor.execute(
+                    f"INSERT INTO {like_table} ({user_column}, {target_column}) "
+                    f"SELECT %s, {pk_column} FROM {target_table} WHERE {public_id_column} = %s "
+                    f"ON CONFLICT DO NOTHING RETURNING {target_column}",
+                    [self.pk, public_id],
+                )
+            else:
+                cursor.execute(
+                    f"DELETE FROM {like_table} WHERE {user_column} = %s "
+                    f"AND {target_column} = (SELECT {pk_column} FROM {target_table} WHERE {public_id_column} = %s) "
+                    f"RETURNING {target_column}",
+                    [self.pk, public_id],
+                )
+            changed = cursor.fetchone() is not None
+            if changed:
+                cursor.execute(
+                    f"UPDATE {target_table} SET {likes_count_column} = {likes_count_column} {'+' if liked else '-'} 1 "
+                    f"WHERE {public_id_column} = %s RETURNING {columns}",
+                    [public_id],
+                )
+            else:
+                cursor.execute(f"SELECT {columns} FROM {target_table} WHERE {public_id_column} = %s", [public_id])
+            row = cursor.fetchone()
+            if row is None:
+                raise target_model.DoesNotExist(f"There is no {target_model._meta.verbose_name} with public id {public_id}")
+            target = target_model.from_db(connection.alias, [field.attname for field in fields], row)
+            if changed:
+                invalidate_like_targets(type(target), [target.pk])
+                update_liked_set(related_manager.target_field_name, self.pk, [target.pk], liked)
+                self._record_like_activity(related_manager, target.pk, liked)
+        return liked, target.likes_count
 
     def __str__(self):
         return f"{self.email}"
@@ -119,3 +324,22 @@ class User(AbstractModel, AbstractBaseUser, PermissionsMixin):
     @property
     def name(self):
         return f"{self.first_name} {self.last_name}"
+
+    class Meta:
+        indexes = [
+            # Composite index matching the keyset ordering of the user directory on (updated, id), newest first.
+            models.Index(fields=["-updated", "-id"], name="user_updated_id_idx"),
+        ]
+
+
+def release_likes(sender, instance, **kwargs):
+    """
+    Take the likes of a user about to be deleted back from the like counters of the posts and comments they liked:
+    their like rows are deleted along with them, which sends no signal of its own.
+    """
+    for kind in LIKE_RELATIONS:
+        through, target_model, user_attname, target_attname = get_like_table(kind)
+        target_ids = list(through.objects.filter(**{user_attname: instance.pk}).values_list(target_attname, flat=True))
+        if target_ids:
+            target_model.objects.filter(pk__in=target_ids).update(likes_count=F("likes_count") - 1)
+            invalidate_like_targets(target_model, target_ids)
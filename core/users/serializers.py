@@ -1,15 +1,12 @@
 from rest_framework import serializers
 from core.users.models import User
-from core.abstract.serializers import AbstractSerializer
+from core.abstract.serializers import AbstractSerializer, ValuesSerializer, format_datetime, format_hex
 from django.conf import settings
 
 class UserSerializer(AbstractSerializer):
 
-    posts_count = serializers.SerializerMethodField()
-
-    def get_posts_count(self, instance):
-        """Return the number of posts a user has created."""
-        return instance.post_set.all().count()
+    # The number of posts a user has created is stored on the user and maintained when posts are created or deleted.
+    posts_count = serializers.IntegerField(read_only=True)
 
     def to_representation(self, instance):
         """
@@ -32,3 +29,58 @@ class UserSerializer(AbstractSerializer):
         model = User
         fields = ['id', 'public_id', 'username', 'first_name', 'last_name', 'name', 'bio', 'avatar', 'email', 'is_active', 'created', 'updated', 'posts_count']
         read_only_field = ['is_active']
+
+
+class UserValuesSerializer(ValuesSerializer):
+    """Fast path of `UserSerializer` for listings, working on `.values()` rows (see core.abstract.serializers.ValuesSerializer)."""
+    fields = (
+        ('id', 'public_id', format_hex),
+        ('public_id', 'public_id', str),
+        ('username', 'username', None),
+        ('first_name', 'first_name', None),
+        ('last_name', 'last_name', None),
+        ('name', None, 'get_name'),
+        ('bio', 'bio', None),
+        ('avatar', 'avatar', 'get_avatar'),
+        ('email', 'email', None),
+        ('is_active', 'is_active', None),
+        ('created', 'created', format_datetime),
+        ('updated', 'updated', format_datetime),
+        ('posts_count', 'posts_count', None),
+    )
+    volatile = ('posts_count',)
+    model = User
+
+    def __init__(self, context=None, prefix=""):
+        super().__init__(context, prefix)
+        self.storage = User._meta.get_field('avatar').storage
+        self.request = self.context.get('request')
+        # The scheme and host of the request are worked out once, instead of once per avatar URL.
+        self.root_uri = None if self.request is None else self.request.build_absolute_uri('/')[:-1]
+
+    def build_absolute_uri(self, location):
+        # Same result as `request.build_absolute_uri(location)` for the URLs a storage returns.
+        if location.startswith('/') and not location.startswith('//'):
+            return self.root_uri + location
+        if '://' in location:
+            return location
+        return self.request.build_absolute_uri(location)
+
+    def get_name(self, row):
+        return f"{row[self.prefix + 'first_name']} {row[self.prefix + 'last_name']}"
+
+    def get_avatar(self, row):
+        # Same steps as the ImageField of the model serializer followed by `UserSerializer.to_representation`.
+        avatar = row[self.prefix + 'avatar']
+        if avatar:
+            avatar = self.storage.url(avatar)
+            if self.request is not None:
+                avatar = self.build_absolute_uri(avatar)
+        else:
+            avatar = settings.DEFAULT_AVATAR_URL
+        if settings.DEBUG and self.request is not None: # debug enabled for dev
+            avatar = self.build_absolute_uri(avatar)
+        return avatar
+
+    def get_validator_parts(self, row):
+        return super().get_validator_parts(row) + [row[self.prefix + 'posts_count']]
@@ -0,0 +1,150 @@
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.comments.models import Comment
+from core.posts.models import Post
+from core.users.like_buffer import LikeBufferFlusher, flush_like_buffer, get_like_buffer, get_like_table, insert_likes
+from core.users.models import User
+
+
+@override_settings(LIKE_WRITE_BEHIND=True, LIKE_FLUSH_INTERVAL=0)
+class WriteBehindLikesTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        get_like_buffer().clear()
+        self.user1 = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.user2 = User.objects.create_user(email="otheruser@gmail.com", username="other_user", password="other_password", first_name="Other", last_name="User")
+        self.post = Post.objects.create(author=self.user1, body="Test Post Body")
+        self.comment = Comment.objects.create(author=self.user1, post=self.post, body="Test Comment Body")
+        self.client.force_authenticate(user=self.user2)
+
+    def tearDown(self):
+        get_like_buffer().clear()
+
+    def get_listed_post(self):
+        return self.client.get("/api/core/posts/").data[0]
+
+    def test_buffered_like_is_read_immediately_and_written_on_flush(self):
+        self.get_listed_post()
+        response = self.client.post(f"/api/core/posts/{self.post.public_id}/reaction/")
+        self.assertEqual(response.data, {"liked": True, "likes_count": 1})
+        # nothing has been written yet...
+        self.assertFalse(self.user2.posts_liked.exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        # ...but readers (and the cached listing) already see the like.
+        post = self.get_listed_post()
+        self.assertTrue(post["liked"])
+        self.assertEqual(post["likes_count"], 1)
+        self.assertTrue(self.user2.has_liked_post(self.post))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_like_buffer(), 1)
+        self.assertTrue(self.user2.posts_liked.contains(self.post))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(len(get_like_buffer()), 0)
+        # the flushed like isn't counted twice.
+        post = self.get_listed_post()
+        self.assertTrue(post["liked"])
+        self.assertEqual(post["likes_count"], 1)
+
+    def test_like_then_unlike_before_a_flush_writes_nothing(self):
+        self.client.post(f"/api/core/posts/{self.post.public_id}/reaction/")
+        response = self.client.delete(f"/api/core/posts/{self.post.public_id}/reaction/")
+        self.assertEqual(response.data, {"liked": False, "likes_count": 0})
+        flush_like_buffer()
+        self.assertFalse(self.user2.posts_liked.exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_buffered_unlike_of_a_stored_like(self):
+        with self.settings(LIKE_WRITE_BEHIND=False):
+            self.user2.like_comment(self.comment)
+        url = f"/api/core/posts/{self.post.public_id}/comment/{self.comment.public_id}/reaction/"
+        response = self.client.delete(url)
+        self.assertEqual(response.data, {"liked": False, "likes_count": 0})
+        # repeating the unlike changes nothing.
+        response = self.client.delete(url)
+        self.assertEqual(response.data, {"liked": False, "likes_count": 0})
+        comment = self.client.get(f"/api/core/posts/{self.post.public_id}/comment/").data["results"][0]
+        self.assertFalse(comment["liked"])
+        self.assertEqual(comment["likes_count"], 0)
+        flush_like_buffer()
+        self.assertFalse(self.user2.comments_liked.exists())
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.likes_count, 0)
+
+    def test_stored_state_is_only_used_when_nothing_is_buffered(self):
+        buffer = get_like_buffer()
+        # with nothing buffered for the pair, the caller has to read the like table and record again.
+        self.assertIsNone(buffer.record("post", self.user2.pk, self.post.pk, True))
+        self.assertTrue(buffer.record("post", self.user2.pk, self.post.pk, True, False))
+        # once buffered, the state is compared with the buffered one, even after the flush took it.
+        buffer.take()
+        self.assertTrue(buffer.record("post", self.user2.pk, self.post.pk, False))
+
+    def test_only_the_likes_actually_inserted_are_counted(self):
+        self.user2.posts_liked.add(self.post)
+        through, _, user_attname, target_attname = get_like_table("post")
+        inserted = insert_likes(through, user_attname, target_attname, [(self.user2.pk, self.post.pk), (self.user1.pk, self.post.pk)])
+        self.assertEqual(inserted, [(self.user1.pk, self.post.pk)])
+
+    def test_likes_of_deleted_targets_and_users_are_dropped_on_flush(self):
+        other_post = Post.objects.create(author=self.user1, body="Other Post Body")
+        fan = User.objects.create_user(email="fan@gmail.com", username="fan_user", password="fan_password", first_name="Fan", last_name="User")
+        self.user2.like_post(self.post)
+        self.user2.like_post(other_post)
+        fan.like_post(other_post)
+        self.post.delete()
+        fan.delete()
+        self.assertEqual(flush_like_buffer(), 3)
+        # the like rows of the deleted post and user would break the foreign keys, and with them every later flush.
+        connection.check_constraints()
+        other_post.refresh_from_db()
+        self.assertEqual(other_post.likes_count, 1)
+        self.assertEqual(list(User.posts_liked.through.objects.values_list("user_id", "post_id")), [(self.user2.pk, other_post.pk)])
+        self.assertEqual(len(get_like_buffer()), 0)
+
+    def test_buffered_like_changes_the_listing_etag(self):
+        response = self.client.get("/api/core/posts/")
+        etag = response["ETag"]
+        self.client.post(f"/api/core/posts/{self.post.public_id}/reaction/")
+        response = self.client.get("/api/core/posts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_likes_of_several_users_are_flushed_in_batches(self):
+        users = [
+            User.objects.create_user(email=f"fan{index}@gmail.com", username=f"fan_{index}", password="fan_password", first_name="Fan", last_name="User")
+            for index in range(5)
+        ]
+        for user in users:
+            user.like_post(self.post)
+        users[0].remove_liked_post(self.post)
+        self.assertEqual(self.get_listed_post()["likes_count"], 4)
+        # a SELECT of the existing likes and an INSERT per batch of 3 (there is nothing to delete) and one UPDATE of the counter,
+        # within a savepoint.
+        with self.assertNumQueries(7):
+            flush_like_buffer(batch_size=3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 4)
+        self.assertEqual(User.posts_liked.through.objects.filter(post=self.post).count(), 4)
+
+    def test_drain_command_empties_the_buffer(self):
+        self.user2.like_post(self.post)
+        self.user2.like_comment(self.comment)
+        out = StringIO()
+        call_command("drain_like_buffer", stdout=out)
+        self.assertIn("Drained 2 buffered like(s)", out.getvalue())
+        self.assertEqual(len(get_like_buffer()), 0)
+        self.assertTrue(self.user2.posts_liked.contains(self.post))
+        self.assertTrue(self.user2.comments_liked.contains(self.comment))
+
+    def test_flusher_flushes_once_more_when_stopped(self):
+        self.user2.like_post(self.post)
+        LikeBufferFlusher(interval=60).stop()
+        self.assertEqual(len(get_like_buffer()), 0)
+        self.assertTrue(self.user2.posts_liked.contains(self.post))
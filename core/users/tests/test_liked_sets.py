@@ -0,0 +1,69 @@
+from django.test import TestCase, override_settings
+from core.posts.models import Post
+from core.abstract.bloom import BloomFilter
+from core.users.liked_sets import get_liked_sets, load_liked_set
+from core.users.models import User
+
+
+class BloomFilterTests(TestCase):
+    def test_never_misses_an_added_id_and_rarely_matches_others(self):
+        bloom = BloomFilter.for_capacity(1000, 0.01)
+        for member in range(1, 2001, 2):
+            bloom.add(member)
+        self.assertTrue(all(member in bloom for member in range(1, 2001, 2)))
+        false_positives = sum(member in bloom for member in range(2, 20002, 2))
+        self.assertLess(false_positives, 300)
+
+
+class LikedSetTests(TestCase):
+    def setUp(self):
+        get_liked_sets().clear()
+        self.user = User.objects.create_user(email="test@gmail.com", username="test_user", password="test_password", first_name="Test", last_name="User")
+        self.posts = [Post.objects.create(author=self.user, body=f"Test Post Body {index}") for index in range(4)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.like_post(self.posts[0])
+            self.user.like_post(self.posts[2])
+        self.post_ids = [post.pk for post in self.posts]
+
+    def tearDown(self):
+        get_liked_sets().clear()
+
+    def test_a_page_is_resolved_without_queries_once_the_set_is_loaded(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.user.liked_post_ids(self.post_ids), {self.posts[0].pk, self.posts[2].pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.user.liked_post_ids(self.post_ids), {self.posts[0].pk, self.posts[2].pk})
+            self.assertTrue(self.user.has_liked_post(self.posts[0]))
+            self.assertFalse(self.user.has_liked_post(self.posts[1]))
+
+    def test_likes_and_unlikes_keep_the_loaded_set_up_to_date(self):
+        self.user.liked_post_ids(self.post_ids)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.like_post(self.posts[1])
+            self.user.remove_liked_post(self.posts[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.react_to_post(self.posts[3].public_id, liked=True)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.user.liked_post_ids(self.post_ids), {self.posts[1].pk, self.posts[2].pk, self.posts[3].pk})
+
+    def test_a_set_loaded_while_it_changes_isnt_stored(self):
+        liked_sets = get_liked_sets()
+        generation = liked_sets.generation("post", self.user.pk)
+        liked_sets.add("post", self.user.pk, [self.posts[1].pk])
+        self.assertFalse(liked_sets.store("post", self.user.pk, generation, ids={self.posts[0].pk}))
+        self.assertIsNone(liked_sets.lookup("post", self.user.pk, self.post_ids))
+
+    @override_settings(LIKED_SET_MAX_SIZE=1)
+    def test_large_like_histories_are_cached_as_a_bloom_filter(self):
+        load_liked_set(get_liked_sets(), "post", self.user.pk)
+        liked_ids, candidate_ids = get_liked_sets().lookup("post", self.user.pk, self.post_ids)
+        self.assertEqual(liked_ids, set())
+        self.assertLessEqual({self.posts[0].pk, self.posts[2].pk}, candidate_ids)
+        # only the ids the filter may contain are checked, with one query.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.user.liked_post_ids(self.post_ids), {self.posts[0].pk, self.posts[2].pk})
+        # unliked targets stay in the filter, but are told apart by that query.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.remove_liked_post(self.posts[0])
+            self.user.like_post(self.posts[1])
+        self.assertEqual(self.user.liked_post_ids(self.post_ids), {self.posts[1].pk, self.posts[2].pk})
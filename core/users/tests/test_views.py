@@ -25,14 +25,33 @@ class UserViewsTests(APITestCase):
         url = '/api/core/users/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        # retrieve oldest comment in response data.
-        response_data = response.data[-1]
+        # the directory is always paginated: both users fit in the first page.
+        self.assertIsNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+        # retrieve oldest user in response data.
+        response_data = response.data['results'][-1]
         self.assertTrue('first_name' in response_data)
         self.assertTrue('last_name' in response_data)
         self.assertTrue('username' in response_data)
         self.assertEqual(response_data['username'], 'test_user')
         # assert two users exist.
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_list_users_with_cursor_pagination(self):
+        for index in range(3):
+            User.objects.create_user(email=f"listed{index}@gmail.com", username=f"listed_user_{index}", password="listed_password", first_name="Listed", last_name="User")
+        expected_ids = [user.public_id.hex for user in User.objects.order_by("-updated", "-id")]
+        self.client.force_authenticate(user=self.user1)
+        url = '/api/core/users/?page_size=2'
+        received_ids = []
+        # follow the "next" links until the last page is reached, with one query per page.
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertTrue(len(response.data["results"]) <= 2)
+            received_ids += [user["id"] for user in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(received_ids, expected_ids)
 
     def test_hide_user_for_anonymous_user(self):
         url = f'/api/core/users/{self.user1.public_id}/'
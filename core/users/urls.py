@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import get_users, get_user
+from core.abstract.asynchronous import read_view
+from .views import get_users, get_user, get_user_async
 
 urlpatterns = [
     path('', get_users, name='users'),
-    path('<public_id>/', get_user, name='user-detail'),
+    path('<public_id>/', read_view(get_user, get_user_async), name='user-detail'),
 ]
@@ -3,11 +3,13 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import LimitOffsetPagination
 from django.core.exceptions import ValidationError as DjangoValidationError
+from core.abstract.asynchronous import async_api_view
+from core.abstract.conditional import conditional_listing_response, conditional_object_response
+from core.abstract.pagination import KeysetPagination
 from core.auth.permissions import UserPermission
 from core.users.models import User
-from core.users.serializers import UserSerializer
+from core.users.serializers import UserSerializer, UserValuesSerializer
 
 
 # Create your views here.
@@ -15,15 +17,18 @@ from core.users.serializers import UserSerializer
 @permission_classes([IsAuthenticated])
 def get_users(request):
     if request.method == "GET":
-        users = User.objects.all().order_by('-updated')
-        if bool(request.query_params.get("limit", None)):
-            paginator = LimitOffsetPagination()
-            results = paginator.paginate_queryset(users, request)
-            serializer = UserSerializer(results, many=True, context={'request':request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        else:
-            serializer = UserSerializer(users, many=True, context={'request':request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        # only the columns of the representation are read, as plain rows (see UserValuesSerializer), plus the key the
+        # cursor is built from. The post count is stored on the user, so a page is a single query.
+        users = User.objects.values('id', *UserValuesSerializer.get_columns())
+        # The directory is always cursor-paginated on (updated, id), newest first, through the matching index, so that
+        # a deep page costs the same as the first one whatever the number of users.
+        paginator = KeysetPagination()
+        return conditional_listing_response(
+            request,
+            lambda: (paginator.paginate_queryset(users, request), paginator),
+            lambda loaded: paginator.get_paginated_data(UserValuesSerializer({'request':request}).serialize(loaded[0])),
+            row_serializer=UserValuesSerializer(),
+        )
 
 @api_view(["GET", "PATCH"])
 @permission_classes([UserPermission])
@@ -37,8 +42,8 @@ def get_user(request, public_id):
 
     if request.method == "GET":
         if not request.user.is_anonymous:
-            serializer = UserSerializer(user, context={'request':request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            # answer with a 304 when the client's copy is current, without serializing the user.
+            return conditional_object_response(request, user, lambda: UserSerializer(user, context={'request':request}).data)
         return Response(status=status.HTTP_401_UNAUTHORIZED)
 
     elif request.method == "PATCH":
@@ -50,3 +55,18 @@ def get_user(request, public_id):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Native async counterpart of the GET branch of `get_user`, used when the project is served under ASGI (see core.abstract.asynchronous).
+@async_api_view
+async def get_user_async(request, public_id):
+    try:
+        user = await User.objects.aget(public_id=public_id)
+    except DjangoValidationError:
+        raise ValidationError(f'{public_id} is not a valid UUID' )
+    except User.DoesNotExist:
+        raise ValidationError("There is no user with this public id!")
+    if not request.user.is_anonymous:
+        # answer with a 304 when the client's copy is current, without serializing the user.
+        return conditional_object_response(request, user, lambda: UserSerializer(user, context={'request':request}).data)
+    return Response(status=status.HTTP_401_UNAUTHORIZED)